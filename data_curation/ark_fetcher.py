@@ -7,18 +7,32 @@ access to the Noemi service.
 
 from __future__ import annotations
 
+import bz2
 import csv
+import gzip
+import hashlib
 import json
+import lzma
+import mmap
+import os
+import random
 import re
+import sqlite3
+import struct
+import threading
 import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Any, Iterable, Iterator, Sequence
+from typing import IO, Any, Iterable, Iterator, Sequence
 
 DEFAULT_PATTERN = r"ark:/[0-9]+/[A-Za-z0-9]+"
 DEFAULT_API_HOST = "https://pfc3noemi-ihm.bnf.fr/service"
 DEFAULT_ENDPOINT = "entity/ark"
 HEADERS = {"Accept": "application/json", "Content-Type": "application/json"}
+RETRYABLE_CODES = {"request_error", "429", "500", "502", "503", "504"}
 
 try:
     import requests  # type: ignore
@@ -75,6 +89,107 @@ def dedupe_preserving_order(values: Iterable[str]) -> list[str]:
     return result
 
 
+DEFAULT_SCAN_CHUNK = 64 * 1024 * 1024
+
+# Exports are often shipped compressed; chosen by extension, decompressed as a stream.
+COMPRESSED_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+
+def _open_export(path: Path, encoding: str | None = None) -> IO[Any]:
+    """Open ``path`` for reading (text if ``encoding`` is given), decompressing by extension."""
+    opener = COMPRESSED_OPENERS.get(path.suffix.lower())
+    if encoding is None:
+        return opener(path, "rb") if opener else path.open("rb")
+    if opener:
+        return opener(path, "rt", encoding=encoding, newline="")
+    return path.open(newline="", encoding=encoding)
+
+
+def _scan_stream(path: Path, pattern: bytes, flags: int, block_size: int) -> list[str]:
+    """Regex scan over a compressed file, one decompressed block at a time.
+
+    The bytes after the last newline of each block are carried over to the
+    next one so no ARK is cut in half.
+    """
+    compiled = re.compile(pattern, flags)
+    found: dict[bytes, None] = {}
+    carry = b""
+    with _open_export(path) as handle:
+        while True:
+            block = handle.read(block_size)
+            if not block:
+                break
+            data = carry + block
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                carry = data
+                continue
+            found.update(dict.fromkeys(match.group(0) for match in compiled.finditer(data, 0, cut)))
+            carry = data[cut:]
+    if carry:
+        found.update(dict.fromkeys(match.group(0) for match in compiled.finditer(carry)))
+    return [value.decode("ascii", "replace") for value in found]
+
+
+def _chunk_bounds(path: Path, chunk_size: int) -> list[tuple[int, int]]:
+    """Split a file into ranges ending on newlines, so no ARK straddles two chunks."""
+    size = path.stat().st_size
+    if size == 0:
+        return []
+    bounds: list[tuple[int, int]] = []
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                newline = data.find(b"\n", end)
+                end = size if newline < 0 else newline + 1
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def _scan_chunk(path: str, start: int, end: int, pattern: bytes, flags: int) -> list[str]:
+    compiled = re.compile(pattern, flags)
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        found = dict.fromkeys(match.group(0) for match in compiled.finditer(data, start, end))
+    return [value.decode("ascii", "replace") for value in found]
+
+
+def scan_arks_raw(
+    path: str | Path,
+    *,
+    pattern: str = DEFAULT_PATTERN,
+    case_sensitive: bool = False,
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_SCAN_CHUNK,
+) -> list[str]:
+    """Run the ARK regex straight over the memory-mapped file bytes.
+
+    No CSV or JSON decoding happens, so every column is scanned. Chunks are
+    newline-aligned and spread across ``workers`` processes (default: one per
+    CPU); results keep first-occurrence order. ``.gz``/``.bz2``/``.xz`` files are
+    decompressed as a stream instead, in blocks of ``chunk_size`` bytes.
+    """
+    path = Path(path)
+    flags = 0 if case_sensitive else re.IGNORECASE
+    raw_pattern = pattern.encode("ascii")
+    if path.suffix.lower() in COMPRESSED_OPENERS:
+        # Compressed streams cannot be mapped or split; decompress once, in-process.
+        return dedupe_preserving_order(_scan_stream(path, raw_pattern, flags, chunk_size))
+    bounds = _chunk_bounds(path, chunk_size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(bounds) <= 1:
+        per_chunk = [_scan_chunk(str(path), start, end, raw_pattern, flags) for start, end in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_scan_chunk, str(path), start, end, raw_pattern, flags) for start, end in bounds]
+            per_chunk = [future.result() for future in futures]
+    return dedupe_preserving_order(value for chunk in per_chunk for value in chunk)
+
+
 def extract_unique_arks_from_csv(
     csv_path: str | Path,
     *,
@@ -83,18 +198,33 @@ def extract_unique_arks_from_csv(
     pattern: str = DEFAULT_PATTERN,
     case_sensitive: bool = False,
     allow_invalid_json: bool = False,
+    validate_json: bool = True,
+    scan_workers: int | None = None,
 ) -> list[str]:
-    """Extract unique ARK identifiers from the JSON payload stored in a CSV column."""
+    """Extract unique ARK identifiers from the JSON payload stored in a CSV column.
+
+    With ``validate_json=False`` the file is scanned as raw bytes by
+    `scan_arks_raw` (all columns, ``scan_workers`` processes, default one per CPU), which keeps
+    multi-GB exports I/O-bound. Compressed exports (``.gz``, ``.bz2``,
+    ``.xz``) are read transparently in both modes.
+    """
 
     csv_path = Path(csv_path)
     if not csv_path.is_file():
         raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
+    if not validate_json:
+        with _open_export(csv_path, encoding) as handle:
+            header = next(csv.reader(handle, delimiter=";", quotechar='"'), [])
+        if column not in header:
+            raise KeyError(f"Column '{column}' not present in CSV header. Columns: {header}")
+        return scan_arks_raw(csv_path, pattern=pattern, case_sensitive=case_sensitive, workers=scan_workers)
+
     regex_flags = 0 if case_sensitive else re.IGNORECASE
     compiled = re.compile(pattern, regex_flags)
 
     collected: list[str] = []
-    with csv_path.open(newline="", encoding=encoding) as handle:
+    with _open_export(csv_path, encoding) as handle:
         reader = csv.DictReader(handle, delimiter=";", quotechar='"')
         if column not in (reader.fieldnames or []):
             raise KeyError(
@@ -132,17 +262,356 @@ def save_ark_list(arks: Sequence[str], path: str | Path) -> Path:
     return path
 
 
-def _ensure_status_log(path: Path) -> None:
-    if not path.exists():
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text("ark\thttp_code\tresult_path\terror\n", encoding="utf-8")
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+class FetchJournal:
+    """Transactional record of every fetch attempt, kept next to the responses.
+
+    One SQLite row per ARK holds the status, HTTP code, size and SHA-256 of the
+    stored body. Rows are committed as soon as the body is on disk, so resumed
+    runs skip completed ARKs and retry only failed ones, even after a crash.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS fetch(
+                    ark TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    http_code TEXT,
+                    size INTEGER,
+                    sha256 TEXT,
+                    result_path TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL
+                )"""
+            )
+
+    def completed(self) -> set[str]:
+        """ARKs whose last fetch succeeded, loaded once for O(1) resume checks."""
+        rows = self._conn.execute("SELECT ark FROM fetch WHERE status = ?", (STATUS_OK,))
+        return {row[0] for row in rows}
+
+    def known(self) -> set[str]:
+        return {row[0] for row in self._conn.execute("SELECT ark FROM fetch")}
+
+    def outcomes(self) -> dict[str, tuple[str, str]]:
+        """ARK -> (status, http_code) of its last attempt."""
+        return {ark: (status, code or "") for ark, status, code in self._conn.execute("SELECT ark, status, http_code FROM fetch")}
+
+    def record(
+        self,
+        ark: str,
+        *,
+        status: str,
+        http_code: str,
+        body: bytes | None = None,
+        result_path: Path | None = None,
+        error: str | None = None,
+    ) -> None:
+        size = len(body) if body is not None else None
+        digest = hashlib.sha256(body).hexdigest() if body is not None else None
+        with self._conn:
+            self._conn.execute(
+                """INSERT INTO fetch(ark, status, http_code, size, sha256, result_path, error, attempts, updated_at)
+                   VALUES(?,?,?,?,?,?,?,1,?)
+                   ON CONFLICT(ark) DO UPDATE SET
+                       status=excluded.status, http_code=excluded.http_code, size=excluded.size,
+                       sha256=excluded.sha256, result_path=excluded.result_path, error=excluded.error,
+                       attempts=fetch.attempts + 1, updated_at=excluded.updated_at""",
+                (ark, status, http_code, size, digest, str(result_path or ""), error or "", time.time()),
+            )
+
+    def result_paths(self) -> dict[str, str]:
+        """Map stored result paths back to their ARK."""
+        rows = self._conn.execute("SELECT ark, result_path FROM fetch WHERE result_path != ''")
+        return {result_path: ark for ark, result_path in rows}
+
+    def export_tsv(self, path: str | Path) -> Path:
+        """Write the journal as the historical ``fetch_status.tsv`` summary."""
+        path = Path(path)
+        with path.open("w", encoding="utf-8") as handle:
+            handle.write("ark\thttp_code\tresult_path\terror\n")
+            for ark, http_code, result_path, error in self._conn.execute(
+                "SELECT ark, http_code, result_path, error FROM fetch ORDER BY rowid"
+            ):
+                handle.write(f"{ark}\t{http_code}\t{result_path}\t{error}\n")
+        return path
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _write_atomically(path: Path, body: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".part")
+    tmp_path.write_bytes(body)
+    os.replace(tmp_path, path)
+
+
+def _legacy_status_codes(status_log: Path) -> dict[str, str]:
+    """HTTP code of each ARK's last attempt in a pre-journal ``fetch_status.tsv`` (later rows win)."""
+    codes: dict[str, str] = {}
+    try:
+        with status_log.open("r", encoding="utf-8") as handle:
+            next(handle, None)  # header
+            for line in handle:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) >= 2 and fields[0]:
+                    codes[fields[0]] = fields[1]
+    except OSError:
+        pass
+    return codes
+
+
+def _adopt_legacy_response(journal: FetchJournal, ark: str, response_file: Path, http_code: str | None) -> bool:
+    """Journal a response written by a pre-journal run, if its logged fetch succeeded and it holds valid JSON.
+
+    Pre-journal runs also wrote 4xx/5xx error bodies to disk; those (and files the
+    legacy log does not mention) are left unjournaled so they are fetched again.
+    """
+    if not http_code or not http_code.startswith("2"):
+        return False
+    try:
+        body = response_file.read_bytes()
+        json.loads(body)
+    except (OSError, ValueError):
+        return False
+    journal.record(ark, status=STATUS_OK, http_code=http_code, body=body, result_path=response_file)
+    return True
+
+
+PACK_MAGIC = b"ARKP"
+_PACK_HEADER = struct.Struct(">4sHI")  # magic, ark length, payload length
+DEFAULT_SEGMENT_SIZE = 256 * 1024 * 1024
+
+
+class PackStore:
+    """Append-only, zlib-compressed segments holding every fetched response.
+
+    Records are written as ``magic | ark | compressed body`` into
+    ``pack-NNNNN.dat`` files that roll over at ``segment_size`` bytes. A SQLite
+    index maps each ARK to its latest record, giving random-access reads; bulk
+    reads follow the index in segment/offset order so they stay sequential.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        compresslevel: int = 6,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.compresslevel = compresslevel
+        self._index = sqlite3.connect(self.directory / "pack_index.sqlite")
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        with self._index:
+            self._index.execute(
+                """CREATE TABLE IF NOT EXISTS entry(
+                    ark TEXT PRIMARY KEY,
+                    segment INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    raw_size INTEGER NOT NULL
+                )"""
+            )
+        row = self._index.execute("SELECT MAX(segment) FROM entry").fetchone()
+        self._segment = row[0] if row and row[0] is not None else 0
+        self._writer: Any = None
+        self._readers: dict[int, Any] = {}
+
+    def segment_path(self, segment: int) -> Path:
+        return self.directory / f"pack-{segment:05d}.dat"
+
+    def _open_writer(self) -> Any:
+        if self._writer is None:
+            self._writer = self.segment_path(self._segment).open("ab")
+        if self._writer.tell() >= self.segment_size:
+            self._writer.close()
+            self._segment += 1
+            self._writer = self.segment_path(self._segment).open("ab")
+        return self._writer
+
+    def put(self, ark: str, body: bytes) -> Path:
+        """Append a response; the index is only committed once the bytes are flushed."""
+        payload = zlib.compress(body, self.compresslevel)
+        ark_bytes = ark.encode("utf-8")
+        writer = self._open_writer()
+        offset = writer.tell()
+        writer.write(_PACK_HEADER.pack(PACK_MAGIC, len(ark_bytes), len(payload)))
+        writer.write(ark_bytes)
+        writer.write(payload)
+        writer.flush()
+        with self._index:
+            self._index.execute(
+                "INSERT OR REPLACE INTO entry(ark, segment, offset, length, raw_size) VALUES(?,?,?,?,?)",
+                (ark, self._segment, offset, len(payload), len(body)),
+            )
+        return self.segment_path(self._segment)
+
+    def __contains__(self, ark: object) -> bool:
+        return self._index.execute("SELECT 1 FROM entry WHERE ark = ?", (ark,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._index.execute("SELECT COUNT(*) FROM entry").fetchone()[0]
+
+    def _read(self, ark: str, segment: int, offset: int, length: int) -> bytes:
+        if self._writer is not None:
+            self._writer.flush()
+        reader = self._readers.get(segment)
+        if reader is None:
+            reader = self._readers[segment] = self.segment_path(segment).open("rb")
+        reader.seek(offset)
+        magic, ark_length, payload_length = _PACK_HEADER.unpack(reader.read(_PACK_HEADER.size))
+        if magic != PACK_MAGIC or payload_length != length:
+            raise ValueError(f"Corrupt pack record for {ark} in {self.segment_path(segment)} at {offset}")
+        reader.seek(ark_length, os.SEEK_CUR)
+        return zlib.decompress(reader.read(length))
+
+    def get(self, ark: str) -> bytes | None:
+        row = self._index.execute("SELECT segment, offset, length FROM entry WHERE ark = ?", (ark,)).fetchone()
+        if row is None:
+            return None
+        return self._read(ark, *row)
+
+    def iter_records(self) -> Iterator[tuple[str, bytes]]:
+        """Yield (ark, body) for every live record, reading segments sequentially."""
+        rows = self._index.execute("SELECT ark, segment, offset, length FROM entry ORDER BY segment, offset").fetchall()
+        for ark, segment, offset, length in rows:
+            yield ark, self._read(ark, segment, offset, length)
+
+    def stats(self) -> dict[str, int]:
+        records, raw, stored = self._index.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(length), 0) FROM entry"
+        ).fetchone()
+        return {"records": records, "raw_bytes": raw, "stored_bytes": stored, "segments": self._segment + 1}
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+        self._index.close()
+
+    def __enter__(self) -> "PackStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _ark_from_safe_filename(stem: str) -> str | None:
+    """Best-effort inverse of `_safe_filename` for ``ark:/NAAN/name`` identifiers."""
+    match = re.fullmatch(r"ark_([0-9]+)_([A-Za-z0-9]+)", stem)
+    return f"ark:/{match.group(1)}/{match.group(2)}" if match else None
+
+
+def migrate_json_files(output_dir: str | Path, *, remove: bool = False, verbose: bool = False) -> int:
+    """Move successful per-ARK ``.json`` responses of ``output_dir`` into its pack store.
+
+    ARKs are taken from the fetch journal when it knows the file, otherwise
+    recovered from the file name. A response is migrated only when its last
+    fetch succeeded, per the journal or, for pre-journal runs, the old
+    ``fetch_status.tsv``; it is then journaled as completed with its pack path,
+    so ``storage="pack"`` runs skip it. Error bodies stay where they are.
+    Returns the number of migrated responses.
+    """
+    output_path = Path(output_dir)
+    journal = FetchJournal(output_path / "fetch_journal.sqlite")
+    by_path = {Path(result_path).name: ark for result_path, ark in journal.result_paths().items()}
+    outcomes = journal.outcomes()
+    legacy_codes = _legacy_status_codes(output_path / "fetch_status.tsv")
+    migrated = 0
+    try:
+        with PackStore(output_path / "packs") as store:
+            for response_file in sorted(output_path.glob("*.json")):
+                ark = by_path.get(response_file.name) or _ark_from_safe_filename(response_file.stem)
+                if ark is None:
+                    if verbose:
+                        print(f"Skipping {response_file.name}: cannot recover its ARK")
+                    continue
+                if ark in outcomes:
+                    status, http_code = outcomes[ark]
+                    succeeded = status == STATUS_OK
+                else:
+                    http_code = legacy_codes.get(ark, "")
+                    succeeded = http_code.startswith("2")
+                if not succeeded:
+                    if verbose:
+                        print(f"Skipping {response_file.name}: its last fetch did not succeed ({http_code or 'unknown'})")
+                    continue
+                body = response_file.read_bytes()
+                journal.record(ark, status=STATUS_OK, http_code=http_code, body=body, result_path=store.put(ark, body))
+                if remove:
+                    response_file.unlink()
+                migrated += 1
+            if verbose:
+                print(f"Migrated {migrated} responses into {store.directory}: {store.stats()}")
+    finally:
+        journal.close()
+    return migrated
 
 
 def _safe_filename(ark: str) -> str:
     return re.sub(r"[^A-Za-z0-9._-]+", "_", ark)
 
 
-def _post_payload(url: str, payload: str, timeout: float) -> tuple[str, bytes | None, str | None]:
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _make_session(pool_size: int) -> Any:
+    """Return a pooled keep-alive `requests.Session`, or None when requests is unavailable."""
+    if requests is None:
+        return None
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def _post_payload(
+    url: str,
+    payload: str,
+    timeout: float,
+    session: Any = None,
+) -> tuple[str, bytes | None, str | None]:
     """Send a POST request containing the given payload.
 
     Returns a tuple (status_code, response_body, error_message).
@@ -152,7 +621,8 @@ def _post_payload(url: str, payload: str, timeout: float) -> tuple[str, bytes |
 
     if requests is not None:
         try:
-            response = requests.post(url, data=data, headers=HEADERS, timeout=timeout)
+            post = session.post if session is not None else requests.post
+            response = post(url, data=data, headers=HEADERS, timeout=timeout)
             return str(response.status_code), response.content, None
         except Exception as exc:  # pragma: no cover - network errors in runtime
             return "request_error", None, str(exc)
@@ -168,6 +638,90 @@ def _post_payload(url: str, payload: str, timeout: float) -> tuple[str, bytes |
         return "request_error", None, str(exc)
 
 
+def _post_with_retries(
+    url: str,
+    payload: str,
+    timeout: float,
+    *,
+    session: Any = None,
+    bucket: TokenBucket | None = None,
+    retries: int = 0,
+    backoff: float = 1.0,
+) -> tuple[str, bytes | None, str | None]:
+    """`_post_payload` with rate limiting and exponential backoff on 5xx, 429 and network errors."""
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * (2 ** (attempt - 1)) * (0.5 + random.random() / 2))
+        if bucket is not None:
+            bucket.acquire()
+        http_code, body, error = _post_payload(url, payload, timeout, session)
+        if http_code not in RETRYABLE_CODES:
+            break
+    return http_code, body, error
+
+
+def _fetch_many(
+    arks: Sequence[str],
+    target_url: str,
+    *,
+    workers: int,
+    timeout: float,
+    rate_limit: float | None,
+    retries: int,
+    backoff: float,
+    sleep_seconds: float = 0.0,
+) -> Iterator[tuple[str, str, bytes | None, str | None]]:
+    """Yield (ark, http_code, body, error) as responses arrive, in the calling thread.
+
+    With one worker requests are sent sequentially (honouring `sleep_seconds`);
+    otherwise a thread pool shares one pooled session. At most two requests per
+    worker are queued, so a consumer that stops early (Ctrl-C, a write error,
+    closing the generator) only waits for the requests already running.
+    """
+    if not arks:
+        return
+    session = _make_session(workers)
+    bucket = TokenBucket(rate_limit) if rate_limit else None
+
+    def fetch(ark: str) -> tuple[str, str, bytes | None, str | None]:
+        http_code, body, error = _post_with_retries(
+            target_url,
+            json.dumps(ark),
+            timeout,
+            session=session,
+            bucket=bucket,
+            retries=retries,
+            backoff=backoff,
+        )
+        return ark, http_code, body, error
+
+    try:
+        if workers <= 1:
+            for position, ark in enumerate(arks):
+                if position and sleep_seconds:
+                    time.sleep(sleep_seconds)
+                yield fetch(ark)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ark-fetch")
+        queued = iter(arks)
+        pending: set[Future] = set()
+        try:
+            while True:
+                for ark in islice(queued, 2 * workers - len(pending)):
+                    pending.add(pool.submit(fetch, ark))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    finally:
+        if session is not None:
+            session.close()
+
+
 def fetch_ark_metadata(
     *,
     csv_path: str | Path | None = None,
@@ -186,11 +740,26 @@ def fetch_ark_metadata(
     force: bool = False,
     verbose: bool = False,
     timeout: float = 30.0,
+    workers: int = 1,
+    rate_limit: float | None = None,
+    retries: int = 2,
+    backoff: float = 1.0,
+    storage: str = "files",
+    validate_json: bool = True,
+    scan_workers: int | None = None,
+    save_list: bool = True,
 ) -> list[FetchOutcome]:
     """Fetch metadata for ARK identifiers.
 
     Parameters mirror the capabilities of the original shell workflow while being
-    convenient to call from a notebook cell.
+    convenient to call from a notebook cell. With ``workers > 1`` requests run on a
+    thread pool sharing one keep-alive session; ``rate_limit`` caps requests per
+    second across workers, and 5xx/429/network failures are retried ``retries``
+    times with exponential ``backoff``. ``storage="pack"`` appends successful
+    responses to a `PackStore` under ``output_dir/packs`` instead of one file per ARK.
+    With ``validate_json=False`` the CSV is scanned by ``scan_workers`` processes
+    (default one per CPU), independently of the HTTP ``workers``. The requested
+    ARKs are saved to ``ark_identifiers.txt`` unless ``save_list`` is false.
     """
 
     if csv_path is None and ark_list is None and ark_list_path is None:
@@ -216,6 +785,8 @@ def fetch_ark_metadata(
             pattern=pattern,
             case_sensitive=case_sensitive,
             allow_invalid_json=allow_invalid_json,
+            validate_json=validate_json,
+            scan_workers=scan_workers,
         )
         arks = extracted if not arks else dedupe_preserving_order(arks + extracted)
         source_label = str(csv_path)
@@ -223,6 +794,11 @@ def fetch_ark_metadata(
     if not arks:
         raise ValueError("No ARK identifiers found from the provided sources")
 
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if storage not in {"files", "pack"}:
+        raise ValueError("storage must be 'files' or 'pack'")
+
     if limit is not None:
         if limit < 0:
             raise ValueError("limit must be non-negative")
@@ -233,52 +809,94 @@ def fetch_ark_metadata(
 
     ark_list_file = output_path / "ark_identifiers.txt"
     status_log = output_path / "fetch_status.tsv"
-    save_ark_list(arks, ark_list_file)
-    _ensure_status_log(status_log)
+    if save_list:
+        save_ark_list(arks, ark_list_file)
+    journal = FetchJournal(output_path / "fetch_journal.sqlite")
+    pack = PackStore(output_path / "packs") if storage == "pack" else None
 
     api_host = api_host.rstrip("/")
     target_url = f"{api_host}/{endpoint}"
 
     outcomes: list[FetchOutcome] = []
     total = len(arks)
-    for index, ark in enumerate(arks, start=1):
-        safe_name = _safe_filename(ark)
-        response_file = output_path / f"{safe_name}.json"
-
-        if response_file.exists() and not force:
-            outcomes.append(FetchOutcome(ark=ark, http_code="cached", result_path=response_file, cached=True))
-            if verbose:
-                print(f"[{index}/{total}] {ark} -> cached ({response_file.name})")
-            continue
-
-        if verbose:
-            print(f"[{index}/{total}] Fetching {ark}")
+    to_fetch: list[str] = []
+    try:
+        completed = journal.completed()
+        known = journal.known()
+        # Read before export_tsv replaces it; only consulted for ARKs the journal has never seen.
+        legacy_codes = _legacy_status_codes(status_log) if pack is None and not force else {}
+        for index, ark in enumerate(arks, start=1):
+            response_file = output_path / f"{_safe_filename(ark)}.json"
 
-        payload = json.dumps(ark)
-        http_code, body, error = _post_payload(target_url, payload, timeout)
+            # The journal is shared by both storages: only skip when the selected one holds the body.
+            stored = ark in pack if pack is not None else response_file.exists()
+            if not force and (
+                (ark in completed and stored)
+                or (
+                    pack is None
+                    and ark not in known
+                    and response_file.exists()
+                    and _adopt_legacy_response(journal, ark, response_file, legacy_codes.get(ark))
+                )
+            ):
+                cached_path = response_file if pack is None else pack.directory
+                outcomes.append(FetchOutcome(ark=ark, http_code="cached", result_path=cached_path, cached=True))
+                if verbose:
+                    print(f"[{index}/{total}] {ark} -> cached ({response_file.name})")
+                continue
+            to_fetch.append(ark)
 
-        if body is not None:
-            response_file.write_bytes(body)
-        elif response_file.exists():
-            response_file.unlink()
+        results = _fetch_many(
+            to_fetch,
+            target_url,
+            workers=workers,
+            timeout=timeout,
+            rate_limit=rate_limit,
+            retries=retries,
+            backoff=backoff,
+            sleep_seconds=sleep_seconds,
+        )
+        for done, (ark, http_code, body, error) in enumerate(results, start=1):
+            response_file: Path | None = output_path / f"{_safe_filename(ark)}.json"
+            if verbose:
+                print(f"[{done}/{len(to_fetch)}] {ark} -> {http_code}")
 
-        with status_log.open("a", encoding="utf-8") as log_handle:
-            result_path_text = str(response_file) if body is not None else ""
-            error_text = error or ""
-            log_handle.write(f"{ark}\t{http_code}\t{result_path_text}\t{error_text}\n")
+            succeeded = body is not None and http_code.startswith("2")
+            if pack is not None:
+                response_file = pack.put(ark, body) if succeeded and body is not None else None
+            elif body is not None:
+                _write_atomically(response_file, body)
+            elif response_file.exists():
+                response_file.unlink()
+            if body is None:
+                response_file = None
 
-        outcomes.append(
-            FetchOutcome(
-                ark=ark,
+            journal.record(
+                ark,
+                status=STATUS_OK if succeeded else STATUS_FAILED,
                 http_code=http_code,
-                result_path=response_file if body is not None else None,
-                cached=False,
+                body=body,
+                result_path=response_file,
                 error=error,
             )
-        )
 
-        if sleep_seconds:
-            time.sleep(sleep_seconds)
+            outcomes.append(
+                FetchOutcome(
+                    ark=ark,
+                    http_code=http_code,
+                    result_path=response_file,
+                    cached=False,
+                    error=error,
+                )
+            )
+        journal.export_tsv(status_log)
+    finally:
+        journal.close()
+        if pack is not None:
+            pack.close()
+
+    order = {ark: position for position, ark in enumerate(arks)}
+    outcomes.sort(key=lambda outcome: order[outcome.ark])
 
     if verbose:
         print(
@@ -289,13 +907,132 @@ def fetch_ark_metadata(
     return outcomes
 
 
+def _iter_subfield_values(node: Any, codes: set[str]) -> Iterator[str]:
+    """Yield ``valeur`` of Intermarc sousZones whose ``code`` is selected.
+
+    Intermarc payloads embedded as JSON strings are decoded on the way.
+    """
+    if isinstance(node, dict):
+        code = node.get("code")
+        value = node.get("valeur")
+        if isinstance(code, str) and code in codes and isinstance(value, str):
+            yield value
+        for child in node.values():
+            yield from _iter_subfield_values(child, codes)
+    elif isinstance(node, (list, tuple)):
+        for item in node:
+            yield from _iter_subfield_values(item, codes)
+    elif isinstance(node, str) and node.lstrip().startswith("{"):
+        try:
+            decoded = json.loads(node)
+        except ValueError:
+            return
+        yield from _iter_subfield_values(decoded, codes)
+
+
+def extract_linked_arks(
+    body: bytes,
+    *,
+    pattern: re.Pattern[str],
+    subfields: Iterable[str] | None = None,
+) -> list[str]:
+    """ARKs referenced by a fetched response, optionally only from some subfields (e.g. ``750$3``)."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return []
+    if subfields is None:
+        return dedupe_preserving_order(_extract_from_payload(payload, pattern))
+    values = _iter_subfield_values(payload, set(subfields))
+    return dedupe_preserving_order(ark for value in values for ark in pattern.findall(value))
+
+
+def crawl_ark_closure(
+    seeds: Sequence[str],
+    *,
+    output_dir: str | Path,
+    max_depth: int = 2,
+    subfields: Iterable[str] | None = None,
+    pattern: str = DEFAULT_PATTERN,
+    case_sensitive: bool = False,
+    storage: str = "pack",
+    verbose: bool = False,
+    **fetch_options: Any,
+) -> dict[str, int]:
+    """Fetch the linked-entity closure of ``seeds`` breadth-first.
+
+    Each level is fetched concurrently with `fetch_ark_metadata` (so resume,
+    journaling and storage behave the same), then ARKs found in the responses,
+    restricted to ``subfields`` when given, form the next deduplicated frontier.
+    Returns the depth at which every ARK was first reached; the full closure is
+    saved once, at the end, to ``ark_identifiers.txt``.
+    """
+    if max_depth < 0:
+        raise ValueError("max_depth must be non-negative")
+    compiled = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+    selected = set(subfields) if subfields is not None else None
+    output_path = Path(output_dir)
+
+    depth_by_ark: dict[str, int] = {}
+    frontier = dedupe_preserving_order(seeds)
+    depth = 0
+    while frontier:
+        for ark in frontier:
+            depth_by_ark.setdefault(ark, depth)
+        outcomes = fetch_ark_metadata(
+            ark_list=frontier,
+            output_dir=output_path,
+            storage=storage,
+            pattern=pattern,
+            case_sensitive=case_sensitive,
+            verbose=verbose,
+            save_list=False,
+            **fetch_options,
+        )
+        if verbose:
+            print(f"Crawl depth {depth}: {len(frontier)} ARKs fetched, {len(depth_by_ark)} known")
+        if depth >= max_depth:
+            break
+
+        discovered: list[str] = []
+        pack = PackStore(output_path / "packs") if storage == "pack" else None
+        try:
+            for outcome in outcomes:
+                if outcome.http_code != "cached" and not outcome.http_code.startswith("2"):
+                    continue
+                if pack is not None:
+                    body = pack.get(outcome.ark)
+                else:
+                    response_file = output_path / f"{_safe_filename(outcome.ark)}.json"
+                    body = response_file.read_bytes() if response_file.exists() else None
+                if body is None:
+                    continue
+                discovered.extend(extract_linked_arks(body, pattern=compiled, subfields=selected))
+        finally:
+            if pack is not None:
+                pack.close()
+
+        frontier = [ark for ark in dedupe_preserving_order(discovered) if ark not in depth_by_ark]
+        depth += 1
+
+    save_ark_list(list(depth_by_ark), output_path / "ark_identifiers.txt")
+    return depth_by_ark
+
+
 __all__ = [
     "DEFAULT_API_HOST",
     "DEFAULT_ENDPOINT",
+    "FetchJournal",
     "FetchOutcome",
+    "PackStore",
+    "TokenBucket",
+    "crawl_ark_closure",
     "dedupe_preserving_order",
+    "extract_linked_arks",
     "extract_unique_arks_from_csv",
     "fetch_ark_metadata",
     "load_ark_list",
+    "migrate_json_files",
     "save_ark_list",
+    "scan_arks_raw",
 ]
@@ -0,0 +1,73 @@
+# scripts/authority/dump_loader.py
+from __future__ import annotations
+import logging
+from pathlib import Path
+from typing import Iterator, List, Tuple
+import xml.etree.ElementTree as ET
+
+from scripts.utils.compressed_io import open_binary
+from .nes_store import DEFAULT_BULK_BATCH, SOURCE_SRU, NESStore, PersonEntry
+from .sru_client import _record_ark, _variants_from_record
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _split_tag(tag: str) -> Tuple[str, str]:
+    """'{uri}record' -> ('uri', 'record'); 'record' -> ('', 'record')."""
+    if tag.startswith("{"):
+        uri, _, local = tag[1:].partition("}")
+        return uri, local
+    return "", tag
+
+
+def iter_dump_records(path: str | Path) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Stream (ark, variants) out of a UNIMARCXchange / MARCXchange authority dump.
+
+    Records are matched by local name whatever their namespace, read with the
+    same 200/400 logic as SRU responses, then cleared so memory stays flat on
+    multi-GB dumps. Records without an ARK are skipped.
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"Authority dump not found: {path}")
+
+    stack: List[ET.Element] = []
+    with open_binary(path) as handle:
+        for event, elem in ET.iterparse(handle, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            uri, local = _split_tag(elem.tag)
+            if local != "record" or not any(_split_tag(child.tag)[1] == "datafield" for child in elem):
+                continue
+
+            ns = {"mxc": uri}
+            ark = _record_ark(elem, ns)
+            if ark:
+                accepted, rejected = _variants_from_record(elem, ns)
+                variants = list(dict.fromkeys(" ".join(v.split()) for v in accepted + rejected if v.strip()))
+                yield ark, variants
+
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+
+def import_authority_dump(
+    path: str | Path,
+    store: NESStore | None = None,
+    batch_size: int = DEFAULT_BULK_BATCH,
+) -> int:
+    """Bulk-load an authority dump into the NES cache; returns the number of ARKs written."""
+    store = store or NESStore()
+
+    def entries() -> Iterator[PersonEntry]:
+        for ark, variants in iter_dump_records(path):
+            yield ark, variants, None, SOURCE_SRU
+
+    count = store.put_many(entries(), batch_size=batch_size)
+    LOGGER.info("Imported %s authority records from %s into %s", count, path, store.db_path)
+    return count
@@ -0,0 +1,190 @@
+# scripts/authority/nes_refresh.py
+from __future__ import annotations
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional, Set
+
+from .nes_store import NESStore
+from .sru_client import DEFAULT_BATCH_SIZE, SRU_BASE
+from .sru_prefetch import (
+    DEFAULT_RETRIES,
+    DEFAULT_BACKOFF,
+    HostRateLimiter,
+    KeepAliveClient,
+    PrefetchReport,
+    fetch_variants_batch,
+    prefetch_person_variants,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+NES_TTL_ENV = "NES_TTL_DAYS"
+DEFAULT_REFRESH_REQUESTS_PER_SECOND = 2.0
+
+
+def ttl_from_env() -> Optional[float]:
+    """TTL in seconds from NES_TTL_DAYS, or None (cached variants never expire)."""
+    raw = os.getenv(NES_TTL_ENV, "").strip()
+    if not raw:
+        return None
+    try:
+        days = float(raw)
+    except ValueError:
+        LOGGER.warning("Ignoring invalid %s=%r", NES_TTL_ENV, raw)
+        return None
+    return days * 86400 if days > 0 else None
+
+
+def is_stale(fetched_at: Optional[float], ttl_seconds: Optional[float], now: Optional[float] = None) -> bool:
+    if ttl_seconds is None or fetched_at is None:
+        return False
+    return (now if now is not None else time.time()) - fetched_at > ttl_seconds
+
+
+class BackgroundRefresher:
+    """
+    Daemon thread re-resolving expired ARKs from SRU while lookups keep serving
+    the cached variants (stale-while-revalidate). Requests are batched and
+    throttled; refreshed ARKs are reported through `on_refreshed` from the
+    refresher thread, so callbacks must be thread-safe.
+    """
+
+    def __init__(
+        self,
+        store: NESStore,
+        *,
+        base_url: str = SRU_BASE,
+        requests_per_second: float | None = DEFAULT_REFRESH_REQUESTS_PER_SECOND,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        on_refreshed: Callable[[str], None] | None = None,
+    ):
+        self.store = store
+        self.base_url = base_url
+        self.batch_size = max(1, batch_size)
+        self.retries = retries
+        self.backoff = backoff
+        self.on_refreshed = on_refreshed
+        self.refreshed = 0
+        self.failed = 0
+        self._limiter = HostRateLimiter(requests_per_second)
+        self._client = KeepAliveClient()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._queued: Set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def enqueue(self, ark: str) -> bool:
+        """Queue an ARK for refresh; returns False when it is already pending."""
+        with self._lock:
+            if ark in self._queued:
+                return False
+            self._queued.add(ark)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="nes-refresh", daemon=True)
+                self._thread.start()
+        self._queue.put(ark)
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def _next_batch(self) -> List[str] | None:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                ark = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if ark is None:
+                self._queue.put(None)
+                break
+            batch.append(ark)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            try:
+                resolved, _ = fetch_variants_batch(
+                    self._client,
+                    batch,
+                    self._limiter,
+                    base_url=self.base_url,
+                    retries=self.retries,
+                    backoff=self.backoff,
+                )
+            except Exception as exc:  # noqa: BLE001 - keep serving stale variants
+                self.failed += len(batch)
+                LOGGER.warning("Background refresh failed for %s ARK(s): %s", len(batch), exc)
+                resolved = {}
+            for ark, variants in resolved.items():
+                # Nothing found, or a locally derived entry: keep serving the cached variants.
+                if not self.store.replace_variants(ark, [" ".join(v.split()) for v in variants if v.strip()]):
+                    continue
+                self.refreshed += 1
+                if self.on_refreshed is not None:
+                    self.on_refreshed(ark)
+            with self._lock:
+                self._queued.difference_update(batch)
+        self._client.close()
+
+    def close(self, wait: bool = False) -> None:
+        """Stop the thread; with `wait`, drain the queue first."""
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        if not wait:
+            # Drop what has not been picked up yet.
+            try:
+                while True:
+                    self._queue.get_nowait()
+            except queue.Empty:
+                pass
+        self._queue.put(None)
+        thread.join()
+        with self._lock:
+            self._thread = None
+            self._queued.clear()
+
+
+def refresh_stalest(
+    store: NESStore,
+    limit: int,
+    ttl_seconds: Optional[float] = None,
+    **options: Any,
+) -> PrefetchReport:
+    """
+    Synchronously re-resolve the `limit` least recently fetched ARKs (only the
+    expired ones when a TTL is given). Options go to `prefetch_person_variants`.
+    ARKs that come back without variants keep their cached ones.
+    """
+    if limit < 0:
+        raise ValueError("limit must be non-negative")
+    older_than = time.time() - ttl_seconds if ttl_seconds is not None else None
+    arks = [ark for ark, _ in store.stalest(limit, older_than=older_than)]
+
+    unchanged: List[str] = []
+
+    def replace(ark: str, variants: List[str]) -> None:
+        if not store.replace_variants(ark, [" ".join(v.split()) for v in variants if v.strip()]):
+            unchanged.append(ark)
+
+    options.setdefault("requests_per_second", DEFAULT_REFRESH_REQUESTS_PER_SECOND)
+    report = prefetch_person_variants(arks, on_resolved=replace, **options)
+    for ark in unchanged:
+        report.resolved.pop(ark, None)
+    if unchanged:
+        LOGGER.info("%s ARK(s) came back without variants; cached variants kept", len(unchanged))
+    return report
@@ -1,12 +1,20 @@
 # scripts/authority/nes_service.py
 from __future__ import annotations
-from typing import Dict, List
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice, product
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
 
 import re
 
 from scripts.models import Entity
-from .sru_client import get_person_variants
-from .nes_store import NESStore
+from scripts.utils import metrics
+from scripts.utils.profiling import profiled
+from .sru_client import SRU_BASE, get_person_variants
+from .nes_refresh import BackgroundRefresher, is_stale, ttl_from_env
+from .nes_store import SOURCE_LOCAL, NESStore
+from .sru_prefetch import PrefetchReport, prefetch_person_variants
 
 
 HONORIFIC_ABBREVIATIONS: Dict[str, List[str]] = {
@@ -68,48 +76,215 @@ def _variants_from_entity(entity: Entity) -> List[str]:
     return _augment_with_abbreviations(list(seen.keys()))
 
 
+# Upper bound on the forms generated from one variant: n honorifics with k
+# abbreviations each would otherwise yield (k + 1) ** n combinations.
+MAX_HONORIFIC_EXPANSIONS = 64
+
+_HONORIFIC_LOOKUP: Dict[str, Tuple[str, ...]] = {
+    term.casefold(): tuple(replacements) for term, replacements in HONORIFIC_ABBREVIATIONS.items()
+}
+# One alternation for every term, longest first so "comtesse" wins over "comte".
+_HONORIFIC_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(t) for t in sorted(HONORIFIC_ABBREVIATIONS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=65536)
+def expand_honorifics(variant: str) -> Tuple[str, ...]:
+    """
+    Return `variant` followed by every form where each honorific occurrence is
+    independently kept or abbreviated, capped at MAX_HONORIFIC_EXPANSIONS.
+    """
+    matches = list(_HONORIFIC_PATTERN.finditer(variant))
+    if not matches:
+        return (variant,)
+
+    literals: List[str] = []
+    choices: List[Tuple[str, ...]] = []
+    cursor = 0
+    for match in matches:
+        literals.append(variant[cursor:match.start()])
+        choices.append((match.group(0),) + _HONORIFIC_LOOKUP.get(match.group(0).casefold(), ()))
+        cursor = match.end()
+    tail = variant[cursor:]
+
+    expanded: Dict[str, None] = {}
+    for combination in islice(product(*choices), MAX_HONORIFIC_EXPANSIONS):
+        parts = [literal + choice for literal, choice in zip(literals, combination)]
+        expanded.setdefault("".join(parts) + tail, None)
+    return tuple(expanded)
+
+
 def _augment_with_abbreviations(variants: List[str]) -> List[str]:
-    augmented = set(variants)
-    for variant in list(augmented):
-        lowered = variant.lower()
-        for term, replacements in HONORIFIC_ABBREVIATIONS.items():
-            if term in lowered:
-                pattern = re.compile(rf"\b{re.escape(term)}\b", re.IGNORECASE)
-                for replacement in replacements:
-                    augmented.add(pattern.sub(replacement, variant))
+    augmented: Dict[str, None] = {}
+    for variant in variants:
+        for form in expand_honorifics(variant):
+            augmented.setdefault(form, None)
     return list(augmented)
 
+
+DEFAULT_CACHE_SIZE = 4096
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
 class NameExpansionService:
     """
     Resolve person name variants, preferring local CSV records (100/400) before SRU.
+
+    Resolved variant lists are kept in a size-bounded in-process LRU in front of
+    the SQLite store, so an author ARK recurring on thousands of works only hits
+    the store (and the local 100/400 expansion) once.
+
+    With a TTL (`ttl_seconds`, default from NES_TTL_DAYS), expired SRU variants
+    are still served immediately and queued for a background refresh.
+
+    Every SRU request (one-by-one resolution, prefetch, refresh) goes to
+    `sru_base_url`.
     """
 
     def __init__(
         self,
         store: NESStore | None = None,
-        local_entities_by_ark: Dict[str, Entity] | None = None,
+        local_entities_by_ark: Mapping[str, Entity] | None = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        ttl_seconds: float | None = None,
+        refresher: BackgroundRefresher | None = None,
+        sru_base_url: str = SRU_BASE,
     ):
+        if cache_size < 0:
+            raise ValueError("cache_size must be non-negative")
         self.store = store or NESStore()
-        self.local_entities_by_ark = local_entities_by_ark or {}
+        self.cache_size = cache_size
+        self.stats = CacheStats()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else ttl_from_env()
+        self.sru_base_url = sru_base_url
+        self._refresher = refresher
+        # Filled by the refresher thread, drained on the caller's thread.
+        self._refreshed: "deque[str]" = deque()
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._local_entities_by_ark: Mapping[str, Entity] = local_entities_by_ark or {}
+
+    @property
+    def refresher(self) -> BackgroundRefresher:
+        if self._refresher is None:
+            self._refresher = BackgroundRefresher(
+                self.store, base_url=self.sru_base_url, on_refreshed=self._refreshed.append
+            )
+        return self._refresher
+
+    def close(self, wait: bool = False) -> None:
+        """Stop background refreshing; with `wait`, let queued refreshes finish."""
+        if self._refresher is not None:
+            self._refresher.close(wait=wait)
+
+    @property
+    def local_entities_by_ark(self) -> Mapping[str, Entity]:
+        return self._local_entities_by_ark
+
+    @local_entities_by_ark.setter
+    def local_entities_by_ark(self, value: Mapping[str, Entity] | None) -> None:
+        # A new index may shadow (or stop shadowing) any cached ARK.
+        self._local_entities_by_ark = value or {}
+        self.invalidate()
+
+    def update_local_entities(self, entities_by_ark: Mapping[str, Entity]) -> None:
+        """Merge entities into the local index, dropping cached variants of the touched ARKs."""
+        merged = dict(self._local_entities_by_ark)
+        merged.update(entities_by_ark)
+        self._local_entities_by_ark = merged
+        for ark in entities_by_ark:
+            self.invalidate(ark)
+
+    def invalidate(self, ark: str | None = None) -> None:
+        """Forget cached variants for one ARK, or for every ARK when none is given."""
+        if ark is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(ark, None)
+
+    def _cache_get(self, ark: str) -> List[str] | None:
+        variants = self._cache.get(ark)
+        if variants is None:
+            self.stats.misses += 1
+            return None
+        self._cache.move_to_end(ark)
+        self.stats.hits += 1
+        metrics.incr("nes_cache_hits")
+        return variants
+
+    def _cache_put(self, ark: str, variants: List[str]) -> None:
+        if self.cache_size == 0:
+            return
+        self._cache[ark] = variants
+        self._cache.move_to_end(ark)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.stats.evictions += 1
 
     def _variants_from_local(self, ark: str) -> List[str]:
-        entity = self.local_entities_by_ark.get(ark)
+        entity = self._local_entities_by_ark.get(ark)
         if not entity:
             return []
         return _variants_from_entity(entity)
 
-    def ensure_variants(self, ark: str) -> List[str]:
+    @profiled("nes_resolution")
+    def prefetch(self, arks: Iterable[str], **options: Any) -> PrefetchReport:
+        """
+        Resolve every ARK that is neither local nor already stored, concurrently,
+        before the sequential `ensure_variants` calls of a clustering loop.
+        Options are forwarded to `prefetch_person_variants`.
+        """
+        missing = [
+            ark
+            for ark in dict.fromkeys(arks)
+            if ark and ark not in self._local_entities_by_ark and not self.store.has_ark(ark)
+        ]
+
+        def store_variants(ark: str, variants: List[str]) -> None:
+            self.store.put_variants(ark, [" ".join(v.split()) for v in variants if v.strip()])
+
+        options.setdefault("base_url", self.sru_base_url)
+        report = prefetch_person_variants(missing, on_resolved=store_variants, **options)
+        metrics.incr("nes_prefetched_sru", len(report.resolved))
+        return report
+
+    def _resolve(self, ark: str) -> List[str]:
         local_variants = self._variants_from_local(ark)
         if local_variants:
-            self.store.put_variants(ark, local_variants)
+            metrics.incr("nes_resolved_local")
+            self.store.put_variants(ark, local_variants, source=SOURCE_LOCAL)
             return self.store.get_variants(ark)
 
-        if not self.store.has_ark(ark):
+        fetched_at = self.store.fetched_at(ark)
+        if fetched_at is None:
+            metrics.incr("nes_resolved_sru")
             variants = [
                 " ".join(str(v).split())
-                for v in get_person_variants(ark)
+                for v in get_person_variants(ark, base_url=self.sru_base_url)
                 if str(v).strip()
             ]
             self.store.put_variants(ark, variants)
+        else:
+            metrics.incr("nes_resolved_sqlite")
+            if is_stale(fetched_at, self.ttl_seconds):
+                self.refresher.enqueue(ark)
 
         return self.store.get_variants(ark)
+
+    @profiled("nes_resolution")
+    def ensure_variants(self, ark: str) -> List[str]:
+        while self._refreshed:
+            self.invalidate(self._refreshed.popleft())
+        cached = self._cache_get(ark)
+        if cached is None:
+            cached = self._resolve(ark)
+            self._cache_put(ark, cached)
+        # Hand out a copy so callers cannot mutate the cached list.
+        return list(cached)
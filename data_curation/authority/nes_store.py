@@ -1,14 +1,27 @@
 # scripts/authority/nes_store.py
 from __future__ import annotations
+from contextlib import closing
+import json
 import sqlite3
-from typing import Iterable, List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 import time
 
+from scripts.utils.compressed_io import open_text
+
+# Origine des variantes d'un ARK : notice locale (100/400) ou SRU / dump BnF.
+SOURCE_LOCAL = "local"
+SOURCE_SRU = "sru"
+
+# (ark, variants, fetched_at, source) ; fetched_at None = maintenant
+PersonEntry = Tuple[str, List[str], Optional[float], str]
+
+DEFAULT_BULK_BATCH = 10_000
+
 class NESStore:
     """
     KV-store SQLite très simple :
-      - table person(ark PRIMARY KEY, fetched_at)
+      - table person(ark PRIMARY KEY, fetched_at, source)
       - table variant(ark, variant TEXT, UNIQUE(ark, variant))
     """
     def __init__(self, db_path: str = ".nes_cache.sqlite"):
@@ -30,20 +43,157 @@ class NESStore:
                 variant TEXT,
                 UNIQUE(ark, variant)
             )""")
+            columns = {row[1] for row in c.execute("PRAGMA table_info(person)")}
+            if "source" not in columns:
+                # Caches antérieurs : origine inconnue, traitée comme SRU.
+                c.execute("ALTER TABLE person ADD COLUMN source TEXT")
+            c.execute("CREATE INDEX IF NOT EXISTS person_fetched_at ON person(fetched_at)")
 
     def has_ark(self, ark: str) -> bool:
         with self._conn() as c:
             row = c.execute("SELECT 1 FROM person WHERE ark=?", (ark,)).fetchone()
             return row is not None
 
-    def put_variants(self, ark: str, variants: Iterable[str]) -> None:
+    def put_variants(self, ark: str, variants: Iterable[str], source: str = SOURCE_SRU) -> None:
         now = time.time()
         with self._conn() as c:
-            c.execute("INSERT OR REPLACE INTO person(ark, fetched_at) VALUES(?,?)", (ark, now))
+            c.execute("INSERT OR REPLACE INTO person(ark, fetched_at, source) VALUES(?,?,?)", (ark, now, source))
             c.executemany("INSERT OR IGNORE INTO variant(ark, variant) VALUES(?,?)", [(ark, v) for v in variants])
 
+    def fetched_at(self, ark: str) -> Optional[float]:
+        """Date (epoch) de la dernière récupération, None si l'ARK n'est pas en cache."""
+        with closing(self._conn()) as c:
+            row = c.execute("SELECT fetched_at FROM person WHERE ark=?", (ark,)).fetchone()
+        if row is None:
+            return None
+        return row[0] if row[0] is not None else 0.0
+
+    def replace_variants(self, ark: str, variants: Iterable[str]) -> bool:
+        """
+        Remplace (au lieu de compléter) les variantes d'un ARK rafraîchi depuis le SRU.
+        Sans variante (notice introuvable, réponse vide ou partielle) ou pour un ARK
+        venu d'une notice locale, le cache est laissé tel quel ; renvoie False.
+        """
+        values = list(variants)
+        if not values:
+            return False
+        now = time.time()
+        with closing(self._conn()) as c, c:
+            row = c.execute("SELECT source FROM person WHERE ark=?", (ark,)).fetchone()
+            if row is not None and row[0] == SOURCE_LOCAL:
+                return False
+            c.execute("DELETE FROM variant WHERE ark=?", (ark,))
+            c.execute("INSERT OR REPLACE INTO person(ark, fetched_at, source) VALUES(?,?,?)", (ark, now, SOURCE_SRU))
+            c.executemany("INSERT OR IGNORE INTO variant(ark, variant) VALUES(?,?)", [(ark, v) for v in values])
+        return True
+
+    def stalest(self, limit: int, older_than: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Les `limit` ARK les plus anciens, éventuellement limités à fetched_at < older_than.
+        Les ARK issus de notices locales ne sont jamais rafraîchis depuis le SRU.
+        """
+        query = "SELECT ark, COALESCE(fetched_at, 0) FROM person WHERE source IS NOT ?"
+        params: Tuple[object, ...] = (SOURCE_LOCAL,)
+        if older_than is not None:
+            query += " AND COALESCE(fetched_at, 0) < ?"
+            params += (older_than,)
+        query += " ORDER BY COALESCE(fetched_at, 0) ASC LIMIT ?"
+        with closing(self._conn()) as c:
+            rows = c.execute(query, params + (limit,)).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
     def get_variants(self, ark: str) -> List[str]:
         with self._conn() as c:
             rows = c.execute("SELECT variant FROM variant WHERE ark=? ORDER BY rowid ASC", (ark,)).fetchall()
         # print(*[r[0] for r in rows], sep="\n")
         return [r[0] for r in rows]
+
+    def put_many(self, entries: Iterable[PersonEntry], batch_size: int = DEFAULT_BULK_BATCH) -> int:
+        """
+        Insertion en masse sur une seule connexion, une transaction par lot de
+        `batch_size` ARK : la mémoire reste constante quel que soit le flux.
+        Renvoie le nombre d'ARK écrits. Un ARK déjà marqué local le reste : une
+        entrée SRU importée ne le rend pas rafraîchissable.
+        """
+        count = 0
+        with closing(self._conn()) as c:
+            c.execute("PRAGMA synchronous=NORMAL")
+            persons: List[Tuple[str, float, str]] = []
+            variants: List[Tuple[str, str]] = []
+
+            def flush() -> None:
+                with c:
+                    c.executemany(
+                        "INSERT INTO person(ark, fetched_at, source) VALUES(?,?,?) "
+                        "ON CONFLICT(ark) DO UPDATE SET fetched_at = excluded.fetched_at, "
+                        "source = CASE WHEN person.source = ? THEN person.source ELSE excluded.source END",
+                        [row + (SOURCE_LOCAL,) for row in persons],
+                    )
+                    c.executemany("INSERT OR IGNORE INTO variant(ark, variant) VALUES(?,?)", variants)
+                persons.clear()
+                variants.clear()
+
+            for ark, values, fetched_at, source in entries:
+                persons.append((ark, fetched_at if fetched_at is not None else time.time(), source))
+                variants.extend((ark, v) for v in values)
+                count += 1
+                if len(persons) >= batch_size:
+                    flush()
+            flush()
+        return count
+
+    def iter_entries(self) -> Iterator[PersonEntry]:
+        """Parcourt tout le cache, ARK par ARK, sans le charger en mémoire."""
+        with closing(self._conn()) as c:
+            current: Optional[str] = None
+            fetched: Optional[float] = None
+            origin = SOURCE_SRU
+            values: List[str] = []
+            rows = c.execute(
+                """SELECT p.ark, p.fetched_at, p.source, v.variant
+                   FROM person p LEFT JOIN variant v ON v.ark = p.ark
+                   ORDER BY p.ark, v.rowid"""
+            )
+            for ark, fetched_at, source, variant in rows:
+                if ark != current:
+                    if current is not None:
+                        yield current, values, fetched, origin
+                    # Caches antérieurs : origine inconnue, traitée comme SRU.
+                    current, fetched, origin, values = ark, fetched_at, source or SOURCE_SRU, []
+                if variant is not None:
+                    values.append(variant)
+            if current is not None:
+                yield current, values, fetched, origin
+
+    def export_cache(self, path: str | Path) -> int:
+        """Exporte le cache en JSON Lines portable (compressé si le fichier finit par .gz/.bz2/.xz)."""
+        path = Path(path)
+        count = 0
+        with open_text(path, "w") as f:
+            for ark, values, fetched_at, source in self.iter_entries():
+                f.write(json.dumps(
+                    {"ark": ark, "fetched_at": fetched_at, "source": source, "variants": values},
+                    ensure_ascii=False,
+                ))
+                f.write("\n")
+                count += 1
+        return count
+
+    def import_cache(self, path: str | Path, batch_size: int = DEFAULT_BULK_BATCH) -> int:
+        """Recharge un export de `export_cache`, en conservant les dates de récupération et l'origine."""
+        path = Path(path)
+
+        def entries() -> Iterator[PersonEntry]:
+            with open_text(path, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    row = json.loads(line)
+                    yield (
+                        row["ark"],
+                        list(row.get("variants") or []),
+                        row.get("fetched_at"),
+                        row.get("source") or SOURCE_SRU,
+                    )
+
+        return self.put_many(entries(), batch_size=batch_size)
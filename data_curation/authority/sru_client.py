@@ -1,79 +1,135 @@
 # scripts/authority/sru_client.py
 from __future__ import annotations
 import xml.etree.ElementTree as ET
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 import urllib.parse
 import urllib.request
 
 SRU_BASE = "https://catalogue.bnf.fr/api/SRU"
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_BATCH_SIZE = 50
 
 NS = {
     "srw": "http://www.loc.gov/zing/srw/",
     "mxc": "info:lc/xmlns/marcxchange-v2",
 }
 
-def _sru_url_for_ark(ark: str) -> str:
+def _sru_url_for_ark(ark: str, base_url: str = SRU_BASE) -> str:
     q = f'aut.persistentid any "{ark}"'
     params = {
         "version": "1.2",
         "operation": "searchRetrieve",
         "query": q
     }
-    return f"{SRU_BASE}?{urllib.parse.urlencode(params)}"
+    return f"{base_url}?{urllib.parse.urlencode(params)}"
 
-def fetch_marcxchange_xml(ark: str) -> str:
-    url = _sru_url_for_ark(ark)
-    with urllib.request.urlopen(url) as resp:
+def _sru_url_for_arks(
+    arks: Sequence[str],
+    start_record: int = 1,
+    maximum_records: int = DEFAULT_BATCH_SIZE,
+    base_url: str = SRU_BASE,
+) -> str:
+    """Une seule requête searchRetrieve pour plusieurs ARK (clauses persistentid reliées par OR)."""
+    q = " or ".join(f'aut.persistentid any "{ark}"' for ark in arks)
+    params = {
+        "version": "1.2",
+        "operation": "searchRetrieve",
+        "query": q,
+        "startRecord": str(start_record),
+        "maximumRecords": str(maximum_records),
+    }
+    return f"{base_url}?{urllib.parse.urlencode(params)}"
+
+def fetch_marcxchange_xml(ark: str, timeout: float = DEFAULT_TIMEOUT, base_url: str = SRU_BASE) -> str:
+    url = _sru_url_for_ark(ark, base_url)
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
         return resp.read().decode("utf-8")
 
-def _join_name(df: ET.Element) -> str:
+def _join_name(df: ET.Element, ns: Dict[str, str] = NS) -> str:
     """UNIMARC Autorité Personne: 200/400 - combine $a (élément d'entrée), $b (reste du nom), $c (qualificatifs éventuels)."""
     parts: List[str] = []
     for code in ("a", "b", "c"):
-        for sf in df.findall(f'./mxc:subfield[@code="{code}"]', NS):
+        for sf in df.findall(f'./mxc:subfield[@code="{code}"]', ns):
             val = (sf.text or "").strip()
             if val:
                 parts.append(val)
     return " ".join(parts)
 
-def parse_variants_from_sru(xml_text: str) -> Tuple[List[str], List[str]]:
+def _dedup(seq: List[str]) -> List[str]:
+    """Déduplication en gardant l'ordre."""
+    return list(dict.fromkeys(seq))
+
+def _variants_from_record(rec: ET.Element, ns: Dict[str, str] = NS) -> Tuple[List[str], List[str]]:
     """
-    Retourne (accepted_forms, rejected_forms) à partir des tags 200 (forme admise) et 400 (formes rejetées).
+    200/400 d'une notice. `ns` permet de relire des notices dont le préfixe mxc
+    pointe vers un autre espace de noms (dumps MARCXchange, sans espace de noms...).
     """
-    root = ET.fromstring(xml_text)
-    rec = root.find(".//mxc:record", NS)
-    if rec is None:
-        return [], []
     accepted: List[str] = []
     rejected: List[str] = []
 
-    for df in rec.findall('./mxc:datafield[@tag="200"]', NS):
-        name = _join_name(df)
+    for df in rec.findall('./mxc:datafield[@tag="200"]', ns):
+        name = _join_name(df, ns)
         if name:
             accepted.append(name)
 
-    for df in rec.findall('./mxc:datafield[@tag="400"]', NS):
-        name = _join_name(df)
+    for df in rec.findall('./mxc:datafield[@tag="400"]', ns):
+        name = _join_name(df, ns)
         if name:
             rejected.append(name)
 
-    # déduplication en gardant l'ordre
-    def dedup(seq: List[str]) -> List[str]:
-        seen = set(); out=[]
-        for x in seq:
-            if x not in seen:
-                seen.add(x); out.append(x)
-        return out
+    return _dedup(accepted), _dedup(rejected)
 
-    return dedup(accepted), dedup(rejected)
+def parse_variants_from_sru(xml_text: str) -> Tuple[List[str], List[str]]:
+    """
+    Retourne (accepted_forms, rejected_forms) à partir des tags 200 (forme admise) et 400 (formes rejetées).
+    """
+    root = ET.fromstring(xml_text)
+    rec = root.find(".//mxc:record", NS)
+    if rec is None:
+        return [], []
+    return _variants_from_record(rec)
 
-def get_person_variants(ark: str) -> List[str]:
+def _record_ark(rec: ET.Element, ns: Dict[str, str] = NS) -> Optional[str]:
+    """ARK d'une notice : attribut id, sinon contrôle 003 (URI catalogue.bnf.fr/ark:/...)."""
+    candidates = [rec.get("id") or ""]
+    candidates.extend(cf.text or "" for cf in rec.findall('./mxc:controlfield[@tag="003"]', ns))
+    for value in candidates:
+        idx = value.find("ark:/")
+        if idx >= 0:
+            return value[idx:].strip()
+    return None
+
+def parse_batch_variants_from_sru(
+    xml_text: str,
+) -> Tuple[Dict[str, Tuple[List[str], List[str]]], Optional[int]]:
     """
-    Enchaîne fetch + parse. Renvoie toutes les variantes utiles (200 + 400).
+    Découpe une réponse multi-notices en {ark: (accepted_forms, rejected_forms)}.
+    Renvoie aussi nextRecordPosition (None sur la dernière page).
+    """
+    root = ET.fromstring(xml_text)
+    by_ark: Dict[str, Tuple[List[str], List[str]]] = {}
+    for rec in root.iter(f"{{{NS['mxc']}}}record"):
+        ark = _record_ark(rec)
+        if not ark:
+            continue
+        acc, rej = _variants_from_record(rec)
+        prev_acc, prev_rej = by_ark.get(ark, ([], []))
+        by_ark[ark] = (_dedup(prev_acc + acc), _dedup(prev_rej + rej))
+
+    next_text = root.findtext(".//srw:nextRecordPosition", default="", namespaces=NS).strip()
+    next_position = int(next_text) if next_text.isdigit() else None
+    return by_ark, next_position
+
+def variants_from_sru(xml_text: str) -> List[str]:
+    """
+    Renvoie toutes les variantes utiles (200 + 400) d'une réponse SRU, dédupliquées.
     """
-    xml_text = fetch_marcxchange_xml(ark)
     acc, rej = parse_variants_from_sru(xml_text)
-    variants = acc + rej
-    payload = list(dict.fromkeys(variants))
-    # print(payload)
-    return payload  # dédupli ordonné
\ No newline at end of file
+    return list(dict.fromkeys(acc + rej))
+
+def get_person_variants(ark: str, timeout: float = DEFAULT_TIMEOUT, base_url: str = SRU_BASE) -> List[str]:
+    """
+    Enchaîne fetch + parse. Renvoie toutes les variantes utiles (200 + 400).
+    """
+    xml_text = fetch_marcxchange_xml(ark, timeout=timeout, base_url=base_url)
+    return variants_from_sru(xml_text)  # dédupli ordonné
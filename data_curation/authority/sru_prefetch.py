@@ -0,0 +1,267 @@
+# scripts/authority/sru_prefetch.py
+from __future__ import annotations
+import http.client
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Tuple
+import urllib.parse
+
+from .sru_client import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_TIMEOUT,
+    SRU_BASE,
+    _sru_url_for_ark,
+    _sru_url_for_arks,
+    parse_batch_variants_from_sru,
+    variants_from_sru,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SRUFetchError(RuntimeError):
+    """Raised when an SRU request still fails after every retry."""
+
+
+class HostRateLimiter:
+    """
+    Thread-safe per-host throttle: request starts towards one host are spaced
+    by at least 1 / requests_per_second seconds.
+    """
+
+    def __init__(self, requests_per_second: float | None = DEFAULT_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, host: str) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class KeepAliveClient:
+    """
+    Minimal HTTP GET client keeping one persistent connection per (thread, host),
+    so concurrent workers reuse their sockets instead of reconnecting per ARK.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened: List[http.client.HTTPConnection] = []
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns: Dict[Tuple[str, str], http.client.HTTPConnection] = getattr(self._local, "conns", None) or {}
+        self._local.conns = conns
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = factory(netloc, timeout=self.timeout)
+            conns[(scheme, netloc)] = conn
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def _drop(self, scheme: str, netloc: str) -> None:
+        conns = getattr(self._local, "conns", {})
+        conn = conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def get(self, url: str) -> Tuple[int, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        conn = self._connection(parts.scheme, parts.netloc)
+        try:
+            conn.request("GET", path, headers={"Connection": "keep-alive"})
+            resp = conn.getresponse()
+            body = resp.read()
+        except (OSError, http.client.HTTPException):
+            # Stale keep-alive socket or network error: reconnect on next attempt.
+            self._drop(parts.scheme, parts.netloc)
+            raise
+        if resp.will_close:
+            self._drop(parts.scheme, parts.netloc)
+        return resp.status, body
+
+    def close(self) -> None:
+        """Close every connection opened by any worker thread."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            conn.close()
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF) -> float:
+    """Exponential backoff with jitter for the given (zero-based) retry attempt."""
+    return base * (2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def get_with_retries(
+    client: KeepAliveClient,
+    url: str,
+    limiter: HostRateLimiter,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+) -> str:
+    host = urllib.parse.urlsplit(url).netloc
+    last_error = ""
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff_delay(attempt - 1, backoff))
+        limiter.wait(host)
+        try:
+            status, body = client.get(url)
+        except (OSError, http.client.HTTPException) as exc:
+            last_error = f"{type(exc).__name__}: {exc}"
+            continue
+        if status == 200:
+            return body.decode("utf-8")
+        last_error = f"HTTP {status}"
+        if status not in RETRYABLE_STATUSES:
+            break
+    raise SRUFetchError(f"{url}: {last_error}")
+
+
+@dataclass
+class PrefetchReport:
+    resolved: Dict[str, List[str]] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+    requests: int = 0
+    elapsed: float = 0.0
+
+
+def fetch_variants_batch(
+    client: KeepAliveClient,
+    arks: List[str],
+    limiter: HostRateLimiter,
+    *,
+    base_url: str = SRU_BASE,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+) -> Tuple[Dict[str, List[str]], int]:
+    """
+    Resolve a batch of ARKs with OR-ed persistentid queries, following
+    nextRecordPosition until the result set is exhausted.
+
+    Returns ({ark: variants}, request_count). Requested ARKs without a
+    matching record resolve to an empty list, like the single-ARK path.
+    """
+    found: Dict[str, List[str]] = {}
+    position: int | None = 1
+    request_count = 0
+    while position is not None:
+        url = _sru_url_for_arks(arks, start_record=position, maximum_records=len(arks), base_url=base_url)
+        xml_text = get_with_retries(client, url, limiter, retries, backoff)
+        request_count += 1
+        page, next_position = parse_batch_variants_from_sru(xml_text)
+        for ark, (acc, rej) in page.items():
+            key = ark.casefold()
+            found[key] = list(dict.fromkeys(found.get(key, []) + acc + rej))
+        position = next_position if next_position and next_position > position else None
+    return {ark: found.get(ark.casefold(), []) for ark in arks}, request_count
+
+
+def prefetch_person_variants(
+    arks: Iterable[str],
+    *,
+    base_url: str = SRU_BASE,
+    workers: int = DEFAULT_WORKERS,
+    requests_per_second: float | None = DEFAULT_REQUESTS_PER_SECOND,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_resolved: Callable[[str, List[str]], None] | None = None,
+) -> PrefetchReport:
+    """
+    Resolve 200/400 variants for many ARKs concurrently over a bounded worker pool.
+
+    ARKs are packed `batch_size` at a time into one searchRetrieve query;
+    `batch_size=1` falls back to one request per ARK.
+
+    `on_resolved` is invoked from the calling thread as results arrive, which
+    keeps store writes single-threaded. Failures are collected, not raised.
+    At most two batches per worker are queued, so an interrupted prefetch only
+    waits for the requests already running.
+    """
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+
+    pending = list(dict.fromkeys(a for a in arks if a))
+    report = PrefetchReport()
+    if not pending:
+        return report
+
+    started = time.perf_counter()
+    client = KeepAliveClient(timeout=timeout)
+    limiter = HostRateLimiter(requests_per_second)
+
+    def fetch_chunk(chunk: List[str]) -> Tuple[Dict[str, List[str]], int]:
+        if len(chunk) == 1:
+            xml_text = get_with_retries(client, _sru_url_for_ark(chunk[0], base_url), limiter, retries, backoff)
+            return {chunk[0]: variants_from_sru(xml_text)}, 1
+        return fetch_variants_batch(
+            client, chunk, limiter, base_url=base_url, retries=retries, backoff=backoff
+        )
+
+    size = max(1, batch_size)
+    chunks = (pending[i:i + size] for i in range(0, len(pending), size))
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sru")
+    in_flight: Dict[Future, List[str]] = {}
+    try:
+        while True:
+            for chunk in islice(chunks, 2 * workers - len(in_flight)):
+                in_flight[pool.submit(fetch_chunk, chunk)] = chunk
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = in_flight.pop(future)
+                try:
+                    resolved, request_count = future.result()
+                except Exception as exc:  # noqa: BLE001 - report and keep prefetching
+                    LOGGER.warning("SRU prefetch failed for %s ARK(s): %s", len(chunk), exc)
+                    report.failed.update({ark: str(exc) for ark in chunk})
+                    continue
+                report.requests += request_count
+                for ark, variants in resolved.items():
+                    report.resolved[ark] = variants
+                    if on_resolved is not None:
+                        on_resolved(ark, variants)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        client.close()
+
+    report.elapsed = time.perf_counter() - started
+    LOGGER.info(
+        "SRU prefetch: %s resolved, %s failed, %s requests in %.1fs (%s workers)",
+        len(report.resolved),
+        len(report.failed),
+        report.requests,
+        report.elapsed,
+        workers,
+    )
+    return report
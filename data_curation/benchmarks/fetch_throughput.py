@@ -0,0 +1,98 @@
+"""Throughput benchmark for ``ark_fetcher.fetch_ark_metadata`` against a local stub.
+
+The stub answers every POST with a small JSON body after a configurable delay,
+standing in for the Noemi service. Run with::
+
+    python -m scripts.benchmarks.fetch_throughput --arks 500 --latency 0.05 --workers 1 4 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Sequence
+
+from scripts.ark_fetcher import fetch_ark_metadata
+
+
+def _make_handler(latency: float, error_every: int) -> type[BaseHTTPRequestHandler]:
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - stdlib signature
+            return
+
+        def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+            length = int(self.headers.get("Content-Length") or 0)
+            ark = json.loads(self.rfile.read(length) or b'""')
+            with lock:
+                counter["n"] += 1
+                fail = error_every and counter["n"] % error_every == 0
+            time.sleep(latency)
+            if fail:
+                status, body = 503, b"{}"
+            else:
+                status = 200
+                body = json.dumps({"ark": ark, "zones": [{"code": "001", "sousZones": []}]}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StubHandler
+
+
+def start_stub_server(latency: float = 0.02, error_every: int = 0) -> ThreadingHTTPServer:
+    """Start the stub service on an ephemeral port in a daemon thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(latency, error_every))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(arks: int, latency: float, workers: Sequence[int], rate_limit: float | None, error_every: int) -> None:
+    server = start_stub_server(latency, error_every)
+    api_host = f"http://127.0.0.1:{server.server_address[1]}"
+    ark_list = [f"ark:/12148/cb{i:09d}" for i in range(arks)]
+    try:
+        print(f"{'workers':>8} {'seconds':>9} {'arks/s':>9} {'ok':>6} {'failed':>7}")
+        for count in workers:
+            with tempfile.TemporaryDirectory() as output_dir:
+                started = time.perf_counter()
+                outcomes = fetch_ark_metadata(
+                    ark_list=ark_list,
+                    output_dir=output_dir,
+                    api_host=api_host,
+                    workers=count,
+                    rate_limit=rate_limit,
+                    backoff=0.05,
+                )
+                elapsed = time.perf_counter() - started
+            ok = sum(1 for o in outcomes if o.http_code == "200")
+            print(f"{count:>8} {elapsed:>9.2f} {arks / elapsed:>9.1f} {ok:>6} {len(outcomes) - ok:>7}")
+    finally:
+        server.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent ARK fetching against a local stub server")
+    parser.add_argument("--arks", type=int, default=300, help="Number of ARKs to fetch per run")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub response delay in seconds")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16], help="Worker counts to compare")
+    parser.add_argument("--rate-limit", type=float, help="Optional requests-per-second cap")
+    parser.add_argument("--error-every", type=int, default=0, help="Answer 503 to every Nth request")
+    args = parser.parse_args()
+    run(args.arks, args.latency, args.workers, args.rate_limit, args.error_every)
+
+
+if __name__ == "__main__":
+    main()
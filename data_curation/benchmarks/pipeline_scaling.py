@@ -0,0 +1,171 @@
+"""Scaling benchmark: time every pipeline stage on synthetic corpora of growing size.
+
+For each size a corpus is generated with ``synthetic_corpus``, the chosen
+operation runs under the stage profiler, and the per-stage wall times are
+reported with their scaling exponent between consecutive sizes (1.0 is
+linear, 2.0 quadratic). Run with::
+
+    python -m scripts.benchmarks.pipeline_scaling --sizes 1000 10000 100000 --report scaling.json
+
+``--blank-nlp`` swaps the transformer model for a tokenizer-only French
+pipeline, to measure everything else on machines without the model.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import tempfile
+import time
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Set, Tuple
+
+from scripts.benchmarks.synthetic_corpus import add_spec_arguments, spec_from_args, write_corpus
+from scripts.curation.pipeline import run_cluster_operation, run_cluster_with_expression_operation
+from scripts.utils import metrics
+from scripts.utils.profiling import STAGES, disable_profiling, enable_profiling
+
+
+@contextlib.contextmanager
+def _working_directory(path: Path) -> Iterator[None]:
+    # The NES cache lives in the working directory; keep each run's cache isolated.
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _use_blank_nlp() -> None:
+    import spacy
+
+    from scripts.utils import title_cleaner
+
+    blank = spacy.blank("fr")
+    title_cleaner.get_nlp = lambda: blank  # type: ignore[assignment]
+
+
+def _pairs(clusters: Sequence[Sequence[str]]) -> Set[Tuple[str, str]]:
+    return {tuple(sorted(pair)) for cluster in clusters for pair in combinations(cluster, 2)}  # type: ignore[misc]
+
+
+def pairwise_quality(found: Sequence[Sequence[str]], expected: Sequence[Sequence[str]]) -> Dict[str, float]:
+    """Pairwise precision/recall of the work clusters against the generator's ground truth."""
+    found_pairs, expected_pairs = _pairs(found), _pairs(expected)
+    hits = len(found_pairs & expected_pairs)
+    return {
+        "precision": round(hits / len(found_pairs), 4) if found_pairs else 1.0,
+        "recall": round(hits / len(expected_pairs), 4) if expected_pairs else 1.0,
+    }
+
+
+def run_size(size: int, args: argparse.Namespace, workdir: Path) -> Dict[str, Any]:
+    corpus = workdir / f"corpus_{size}.csv"
+    output = workdir / f"curated_{size}.csv"
+    run_dir = workdir / f"run_{size}"
+    run_dir.mkdir(exist_ok=True)
+
+    started = time.perf_counter()
+    stats = write_corpus(corpus, spec_from_args(args, size))
+    generation_seconds = time.perf_counter() - started
+
+    metrics.reset()
+    profiler = enable_profiling()
+    try:
+        with _working_directory(run_dir):
+            if args.operation == "cluster":
+                clusters = run_cluster_operation(str(corpus), str(output))
+            else:
+                clusters, _ = run_cluster_with_expression_operation(str(corpus), str(output))
+    finally:
+        disable_profiling()
+
+    found = [[c.anchor_id, *c.clustered_ids] for c in clusters]
+    timings = profiler.report()
+    return {
+        "works": size,
+        "records": stats.records,
+        "generation_seconds": round(generation_seconds, 3),
+        "total_wall_seconds": timings["total_wall_seconds"],
+        "stages": timings["stages"],
+        "counters": metrics.snapshot(),
+        "clusters_found": len(found),
+        "clusters_expected": len(stats.clusters),
+        "quality": pairwise_quality(found, stats.clusters),
+    }
+
+
+def scaling_exponents(runs: List[Dict[str, Any]]) -> Dict[str, List[float | None]]:
+    """log(t2/t1) / log(n2/n1) per stage between consecutive sizes."""
+    exponents: Dict[str, List[float | None]] = {}
+    for stage in ("total", *STAGES):
+        values: List[float | None] = []
+        for before, after in zip(runs, runs[1:]):
+            t1 = before["total_wall_seconds"] if stage == "total" else before["stages"].get(stage, {}).get("wall_seconds")
+            t2 = after["total_wall_seconds"] if stage == "total" else after["stages"].get(stage, {}).get("wall_seconds")
+            if not t1 or not t2 or after["records"] == before["records"]:
+                values.append(None)
+                continue
+            values.append(round(math.log(t2 / t1) / math.log(after["records"] / before["records"]), 3))
+        if any(v is not None for v in values):
+            exponents[stage] = values
+    return exponents
+
+
+def print_table(runs: List[Dict[str, Any]], exponents: Dict[str, List[float | None]]) -> None:
+    sizes = [run["works"] for run in runs]
+    header = f"{'stage':<24}" + "".join(f"{size:>12}" for size in sizes) + "   exponents"
+    print(header)
+    print("-" * len(header))
+    for stage in ("total", *STAGES):
+        if stage != "total" and not any(stage in run["stages"] for run in runs):
+            continue
+        cells = []
+        for run in runs:
+            seconds = run["total_wall_seconds"] if stage == "total" else run["stages"].get(stage, {}).get("wall_seconds")
+            cells.append(f"{seconds:>11.3f}s" if seconds is not None else f"{'-':>12}")
+        slopes = " ".join("-" if e is None else f"{e:.2f}" for e in exponents.get(stage, []))
+        print(f"{stage:<24}" + "".join(cells) + f"   {slopes}")
+    for run in runs:
+        print(
+            f"{run['works']:>10} works: {run['clusters_found']} clusters found / {run['clusters_expected']} expected, "
+            f"precision {run['quality']['precision']}, recall {run['quality']['recall']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic corpora of growing size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2_000, 8_000], help="Work counts to benchmark")
+    parser.add_argument(
+        "--operation",
+        choices=("cluster", "cluster-with-expressions"),
+        default="cluster-with-expressions",
+    )
+    parser.add_argument("--report", help="Optional JSON path for the full results")
+    parser.add_argument("--workdir", help="Keep corpora and outputs here instead of a temporary directory")
+    parser.add_argument("--blank-nlp", action="store_true", help="Use a tokenizer-only spaCy pipeline")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    if args.blank_nlp:
+        _use_blank_nlp()
+
+    with contextlib.ExitStack() as stack:
+        workdir = Path(args.workdir or stack.enter_context(tempfile.TemporaryDirectory())).resolve()
+        workdir.mkdir(parents=True, exist_ok=True)
+        runs = [run_size(size, args, workdir) for size in sorted(args.sizes)]
+
+    exponents = scaling_exponents(runs)
+    print_table(runs, exponents)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs, "exponents": exponents}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
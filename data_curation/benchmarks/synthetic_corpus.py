@@ -0,0 +1,322 @@
+"""Synthetic Intermarc exports with a known cluster structure.
+
+Produces a ``id_entitelrm;type_entite;intermarc`` CSV shaped like the NOEMI
+exports: agents with 100/400 forms, works grouped on (015$c, 700$3) whose
+titles come in contaminated variants ("/ par ...", ", illustrations de ...",
+"La |..."), expressions carrying 051/041 signatures and manifestations.
+Run with::
+
+    python -m scripts.benchmarks.synthetic_corpus --works 100000 --output corpus.csv.gz --truth truth.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import random
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from scripts.utils.compressed_io import open_text
+
+HEADERS = ["id_entitelrm", "type_entite", "intermarc"]
+NOID_ALPHABET = "0123456789bcdfghjkmnpqrstvwxz"
+
+FORENAMES = [
+    "Sophie", "Jules", "Victor", "George", "Marie", "Alexandre", "Hector", "Zénaïde", "Émile", "Louise",
+    "Gustave", "Alphonse", "Anatole", "Juliette", "Honoré", "Pierre", "Marguerite", "Théophile", "Colette", "Léon",
+]
+SURNAMES = [
+    "Ségur", "Verne", "Hugo", "Sand", "Dumas", "Malot", "Fleuriot", "Zola", "Michelet", "Daudet",
+    "Flaubert", "Gautier", "Loti", "Renard", "Mérimée", "Nodier", "Féval", "Aimard", "Reybaud", "Carraud",
+]
+HONORIFICS = ["comtesse", "madame", "baron", "docteur", "marquise", "monsieur", "général"]
+ILLUSTRATORS = ["Bertall", "Castelli", "Doré", "Riou", "Neuville", "Bayard", "Férat", "Job", "Vogel", "Tofani"]
+TITLE_WORDS = [
+    "malheurs", "vacances", "mémoires", "aventures", "voyage", "histoire", "contes", "souvenirs", "petites",
+    "filles", "modèles", "général", "dourakine", "âne", "bon", "petit", "diable", "auberge", "ange", "gardien",
+    "mystérieuse", "île", "tour", "monde", "jours", "capitaine", "enfants", "lune", "terre", "centre", "mer",
+    "lieues", "château", "forêt", "prince", "princesse", "roi", "reine", "nuit", "matin", "hiver",
+    "printemps", "été", "automne", "rivière", "montagne", "village", "famille", "grand", "mère", "père",
+    "jardin", "secret", "lettres", "récits", "scènes", "vie", "campagne", "ville", "moulin", "pauvre", "riche",
+]
+# No link word may also be a title word, or two titles could only differ by where the link sits.
+LINKS = ["de", "du", "des", "et", "au", "sur", "sous", "dans"]
+ARTICLES = ["Le", "La", "Les", "Un", "Une"]
+FORM_ARKS = 8
+SIGNATURES = [("txt", "fre"), ("txt", "eng"), ("txt", "ger"), ("sti", "fre"), ("prm", "fre")]
+
+
+def noid_check(value: str) -> str:
+    """NOID-style check character over ``value`` (e.g. ``cb12345678``)."""
+    total = sum(pos * (NOID_ALPHABET.index(ch) if ch in NOID_ALPHABET else 0) for pos, ch in enumerate(value, 1))
+    return NOID_ALPHABET[total % len(NOID_ALPHABET)]
+
+
+def ark_for(entity_id: int) -> str:
+    body = f"cb{entity_id}"
+    return f"ark:/12148/{body}{noid_check(body)}"
+
+
+def _zone(code: str, *subfields: Tuple[str, str]) -> Dict[str, object]:
+    return {"code": code, "sousZones": [{"code": f"{code}${sub}", "valeur": value} for sub, value in subfields]}
+
+
+def _record(*zones: Dict[str, object]) -> str:
+    return json.dumps({"zones": list(zones)}, ensure_ascii=False)
+
+
+@dataclass
+class CorpusSpec:
+    works: int = 1_000
+    agents: int = 200
+    duplicate_ratio: float = 0.3
+    mean_cluster_size: float = 3.0
+    contamination_ratio: float = 0.4
+    expressions_per_work: int = 2
+    manifestations_per_expression: int = 1
+    first_id: int = 10_000_000
+    seed: int = 0
+
+
+@dataclass
+class CorpusStats:
+    agents: int = 0
+    works: int = 0
+    expressions: int = 0
+    manifestations: int = 0
+    groups: int = 0
+    clusters: List[List[str]] = field(default_factory=list)
+
+    @property
+    def records(self) -> int:
+        return self.agents + self.works + self.expressions + self.manifestations
+
+
+@dataclass
+class _Agent:
+    entity_id: int
+    surname: str
+    forename: str
+    honorific: str
+
+    @property
+    def ark(self) -> str:
+        return ark_for(self.entity_id)
+
+    def forms(self) -> List[str]:
+        """Forms an author name takes inside contaminated titles."""
+        return [
+            f"{self.forename} {self.surname}",
+            f"{self.honorific} de {self.surname}",
+            f"{self.forename[0]}. {self.surname}",
+            self.surname,
+        ]
+
+
+class CorpusGenerator:
+    """
+    Deterministic (per seed) generator. Rows are streamed so corpora far larger
+    than memory can be written; only the ground-truth clusters are kept.
+    """
+
+    def __init__(self, spec: CorpusSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self._next_id = spec.first_id
+        self.stats = CorpusStats()
+        # Base titles spell a scrambled cluster number in TITLE_WORDS digits, so
+        # they are unique without remembering the ones already drawn.
+        self._title_words = 2
+        while len(TITLE_WORDS) ** self._title_words < spec.works:
+            self._title_words += 1
+        self._title_space = len(TITLE_WORDS) ** self._title_words
+        self._title_stride = self.rng.randrange(1, self._title_space)
+        while math.gcd(self._title_stride, self._title_space) != 1:
+            self._title_stride = self.rng.randrange(1, self._title_space)
+        self._title_offset = self.rng.randrange(self._title_space)
+        self._titles_drawn = 0
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def _base_title(self) -> str:
+        code = (self._title_offset + self._title_stride * self._titles_drawn) % self._title_space
+        self._titles_drawn += 1
+        words: List[str] = []
+        for _ in range(self._title_words):
+            code, digit = divmod(code, len(TITLE_WORDS))
+            words.append(TITLE_WORDS[digit])
+        words.insert(self.rng.randint(1, len(words) - 1), self.rng.choice(LINKS))
+        title = f"{self.rng.choice(ARTICLES)} {' '.join(words)}"
+        if self.rng.random() < 0.3:
+            title += f" {self.rng.choice(FORENAMES)}"
+        return title
+
+    def _variant(self, base: str, author: _Agent, illustrator: _Agent | None) -> str:
+        if self.rng.random() >= self.spec.contamination_ratio:
+            if self.rng.random() < 0.2:
+                article, _, rest = base.partition(" ")
+                return f"{article} |{rest}"
+            return base
+        kind = self.rng.random()
+        if kind < 0.5:
+            return f"{base} / par {self.rng.choice(author.forms())}"
+        if kind < 0.8 or illustrator is None:
+            name = illustrator.surname if illustrator else self.rng.choice(ILLUSTRATORS)
+            return f"{base}, {self.rng.choice(['illustrations de', 'illustré par', 'vignettes par'])} {name}"
+        return f"{base} / {author.honorific} de {author.surname} ; illustrations de {illustrator.surname}"
+
+    def _cluster_sizes(self) -> Iterator[int]:
+        """Sizes of the title clusters, singletons included, summing to `spec.works`."""
+        remaining = self.spec.works
+        while remaining > 0:
+            if self.rng.random() < self.spec.duplicate_ratio / max(self.spec.mean_cluster_size, 1.0):
+                size = max(2, round(self.rng.expovariate(1 / max(self.spec.mean_cluster_size - 1, 1)) + 1))
+            else:
+                size = 1
+            size = min(size, remaining)
+            remaining -= size
+            yield size
+
+    def rows(self) -> Iterator[Tuple[str, str, str]]:
+        spec = self.spec
+        agents: List[_Agent] = []
+        for _ in range(max(spec.agents, 2)):
+            agent = _Agent(
+                entity_id=self._new_id(),
+                surname=self.rng.choice(SURNAMES),
+                forename=self.rng.choice(FORENAMES),
+                honorific=self.rng.choice(HONORIFICS),
+            )
+            agents.append(agent)
+            self.stats.agents += 1
+            yield str(agent.entity_id), "Identité publique de personne", _record(
+                _zone("001", ("a", agent.ark)),
+                _zone("100", ("a", agent.surname), ("m", agent.forename)),
+                _zone("400", ("a", f"{agent.honorific.capitalize()} de {agent.surname}")),
+                _zone("400", ("a", agent.surname), ("m", f"{agent.forename[0]}.")),
+            )
+
+        forms = [ark_for(self.spec.first_id - i) for i in range(1, FORM_ARKS + 1)]
+        groups: set[Tuple[str, str]] = set()
+        for size in self._cluster_sizes():
+            author = self.rng.choice(agents)
+            illustrator = self.rng.choice(agents) if self.rng.random() < 0.5 else None
+            form = self.rng.choice(forms)
+            groups.add((form, author.ark))
+            base = self._base_title()
+            signature = self.rng.choice(SIGNATURES)
+            cluster_ids: List[str] = []
+            for _ in range(size):
+                work_id = self._new_id()
+                work_ark = ark_for(work_id)
+                cluster_ids.append(str(work_id))
+                zones = [
+                    _zone("001", ("a", work_ark)),
+                    _zone("015", ("c", form)),
+                    _zone("150", ("a", self._variant(base, author, illustrator))),
+                    _zone("700", ("3", author.ark)),
+                ]
+                if illustrator is not None:
+                    zones.append(_zone("702", ("3", illustrator.ark)))
+                self.stats.works += 1
+                yield str(work_id), "Œuvre", _record(*zones)
+                yield from self._expressions(work_ark, signature)
+            if size > 1:
+                self.stats.clusters.append(cluster_ids)
+        self.stats.groups = len(groups)
+
+    def _expressions(self, work_ark: str, signature: Tuple[str, str]) -> Iterator[Tuple[str, str, str]]:
+        # The first expression of every work in a cluster shares the cluster
+        # signature, so it is propagated; the others are drawn at random.
+        for index in range(self.spec.expressions_per_work):
+            content, language = signature if index == 0 else self.rng.choice(SIGNATURES)
+            expr_id = self._new_id()
+            expr_ark = ark_for(expr_id)
+            self.stats.expressions += 1
+            yield str(expr_id), "Expression", _record(
+                _zone("001", ("a", expr_ark)),
+                _zone("041", ("a", language)),
+                _zone("051", ("a", content)),
+                _zone("140", ("3", work_ark)),
+                _zone("750", ("3", work_ark)),
+            )
+            for _ in range(self.spec.manifestations_per_expression):
+                manif_id = self._new_id()
+                self.stats.manifestations += 1
+                yield str(manif_id), "Manifestation", _record(
+                    _zone("001", ("a", ark_for(manif_id))),
+                    _zone("740", ("3", expr_ark)),
+                )
+
+
+def write_corpus(path: str | Path, spec: CorpusSpec, truth_path: str | Path | None = None) -> CorpusStats:
+    """Write a corpus (compressed by extension); `truth_path` receives the expected work clusters."""
+    generator = CorpusGenerator(spec)
+    with open_text(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";", quotechar='"', lineterminator="\n")
+        writer.writerow(HEADERS)
+        writer.writerows(generator.rows())
+
+    if truth_path:
+        with open(truth_path, "w", encoding="utf-8") as jf:
+            json.dump({"spec": asdict(spec), "clusters": generator.stats.clusters}, jf, ensure_ascii=False, indent=2)
+    return generator.stats
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = CorpusSpec()
+    parser.add_argument("--agents", type=int, default=defaults.agents, help="Number of agent records (100/400)")
+    parser.add_argument(
+        "--duplicate-ratio",
+        type=float,
+        default=defaults.duplicate_ratio,
+        help="Approximate share of works that belong to a duplicate cluster",
+    )
+    parser.add_argument("--mean-cluster-size", type=float, default=defaults.mean_cluster_size)
+    parser.add_argument(
+        "--contamination-ratio",
+        type=float,
+        default=defaults.contamination_ratio,
+        help="Share of titles carrying an author or illustrator mention",
+    )
+    parser.add_argument("--expressions-per-work", type=int, default=defaults.expressions_per_work)
+    parser.add_argument("--manifestations-per-expression", type=int, default=defaults.manifestations_per_expression)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args: argparse.Namespace, works: int) -> CorpusSpec:
+    return CorpusSpec(
+        works=works,
+        agents=args.agents,
+        duplicate_ratio=args.duplicate_ratio,
+        mean_cluster_size=args.mean_cluster_size,
+        contamination_ratio=args.contamination_ratio,
+        expressions_per_work=args.expressions_per_work,
+        manifestations_per_expression=args.manifestations_per_expression,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Intermarc export")
+    parser.add_argument("--works", type=int, default=1_000, help="Number of work records")
+    parser.add_argument("--output", required=True, help="CSV path (.gz/.bz2/.xz compress on the fly)")
+    parser.add_argument("--truth", help="Optional JSON path for the expected work clusters")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    stats = write_corpus(args.output, spec_from_args(args, args.works), args.truth)
+    print(
+        f"{stats.records} records: {stats.agents} agents, {stats.works} works in {stats.groups} groups "
+        f"({len(stats.clusters)} duplicate clusters), {stats.expressions} expressions, "
+        f"{stats.manifestations} manifestations"
+    )
+
+
+if __name__ == "__main__":
+    main()
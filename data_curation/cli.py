@@ -12,8 +12,26 @@ from rich.console import Console
 from rich.logging import RichHandler
 from rich.theme import Theme
 
-from scripts.curation.pipeline import run_cluster_operation, run_cluster_with_expression_operation
+from scripts.authority.dump_loader import import_authority_dump
+from scripts.authority.nes_refresh import refresh_stalest
+from scripts.authority.nes_store import NESStore
+from scripts.curation.blocking import DEFAULT_TOP_BLOCKS, BlockingScheme, load_blocking_scheme
+from scripts.curation.pipeline import run_blocking_report, run_cluster_operation, run_cluster_with_expression_operation
+from scripts.curation.registry import check_options, get_operation, registered_operations
+from scripts.curation.single_pass import run_operations
+from scripts.curation.title_blocking import (
+    DEFAULT_JACCARD_THRESHOLD,
+    DEFAULT_MIN_PREFIX_TOKENS,
+    DEFAULT_MINHASH_PERMUTATIONS,
+    TITLE_MATCH_MODES,
+    TitleBlocker,
+    lsh_bands,
+    make_title_blocker,
+)
 from scripts.pipeline_title_contamination import run_title_contamination_detection
+from scripts.utils.memory import MemoryTracker
+from scripts.utils.metrics import write_metrics
+from scripts.utils.profiling import STAGES, disable_profiling, enable_profiling
 
 
 LOGGER = logging.getLogger("scripts.cli")
@@ -25,6 +43,7 @@ RICH_THEME = Theme({
 })
 RICH_CONSOLE = Console(theme=RICH_THEME, highlight=True, soft_wrap=True)
 _TEMP_FIXTURES: list[Path] = []
+INPUT_HELP = "Path to input CSV, or a sqlite:///... / postgresql://... URL (with --seed-ids)"
 
 
 def _cleanup_temp_fixtures() -> None:
@@ -83,8 +102,8 @@ def _apply_input_fixture(input_path: str | Path, fixture: str | None) -> Path:
     if not fixture_path.exists():
         raise FileNotFoundError(f"Fixture CSV not found: {fixture_path}")
 
-    suffix = original_path.suffix or ".csv"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix="vendange_fixture_") as tmp:
+    # Fixtures are plain CSV: keeping a compressed input's suffix would make the reader gunzip them.
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv", prefix="vendange_fixture_") as tmp:
         temp_path = Path(tmp.name)
 
     shutil.copy2(fixture_path, temp_path)
@@ -109,6 +128,36 @@ def main() -> None:
         default=0,
         help="Increase logging verbosity (use -vv for debug output)",
     )
+    parser.add_argument(
+        "--profile",
+        metavar="REPORT_JSON",
+        help="Record wall/CPU time per pipeline stage and write them to this JSON report",
+    )
+    parser.add_argument(
+        "--memory-report",
+        metavar="REPORT_JSON",
+        help="Trace allocations (tracemalloc) and peak RSS at each stage boundary and write a summary here",
+    )
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=float,
+        help="With --memory-report, exit with status 1 when peak RSS exceeds this many MB",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="Write hot-path counters at the end of the run (JSON, or Prometheus textfile for *.prom)",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=("json", "prometheus"),
+        help="Override the format inferred from the --metrics extension",
+    )
+    parser.add_argument(
+        "--profile-stage",
+        choices=STAGES,
+        help="Also run cProfile during this stage (dumped next to the --profile report)",
+    )
 
     fixture_parent = argparse.ArgumentParser(add_help=False)
     fixture_parent.add_argument(
@@ -118,21 +167,83 @@ def main() -> None:
         metavar="NAME",
         help="Load fixture data/test_NAME.csv into the provided input path before running the command",
     )
+    fixture_parent.add_argument(
+        "--seed-ids",
+        metavar="FILE",
+        help="Work ids to start the hop queries from when --input is a sqlite:/// or postgresql:// URL",
+    )
+
+    store_parent = argparse.ArgumentParser(add_help=False)
+    store_parent.add_argument(
+        "--entity-store",
+        metavar="SQLITE",
+        help="Run out of core: load the input into this SQLite entity store and cluster group by group",
+    )
+    store_parent.add_argument(
+        "--manifest",
+        metavar="SQLITE",
+        help="Run manifest: reuse normalized titles of works unchanged since the run that wrote it, then update it",
+    )
+    store_parent.add_argument(
+        "--checkpoint",
+        metavar="SQLITE",
+        help="Save finished work groups here while clustering; deleted once the output is written",
+    )
+    store_parent.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the last finished group in --checkpoint instead of starting over",
+    )
+
+    match_parent = argparse.ArgumentParser(add_help=False)
+    match_parent.add_argument(
+        "--title-match",
+        choices=TITLE_MATCH_MODES,
+        default="exact",
+        help=(
+            "Within a (015$c, 700$3) group, cluster equal normalized titles, also token-boundary prefixes, "
+            "or near-duplicates by MinHash/LSH"
+        ),
+    )
+    match_parent.add_argument(
+        "--min-prefix-tokens",
+        type=int,
+        default=DEFAULT_MIN_PREFIX_TOKENS,
+        help="With --title-match prefix: tokens the shorter title needs to count as a prefix",
+    )
+    match_parent.add_argument(
+        "--jaccard-threshold",
+        type=float,
+        default=DEFAULT_JACCARD_THRESHOLD,
+        help="With --title-match minhash: minimum Jaccard similarity of title shingles",
+    )
+    match_parent.add_argument(
+        "--minhash-permutations",
+        type=int,
+        default=DEFAULT_MINHASH_PERMUTATIONS,
+        help="With --title-match minhash: signature length (more is more precise and slower)",
+    )
+    match_parent.add_argument(
+        "--blocking-config",
+        metavar="JSON",
+        help="Blocking keys per entity kind (subfield paths, normalization); default: works by (015$c, 700$3), "
+        "expressions by (051$a, 041$a)",
+    )
 
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     # EXISTANT
-    p_cluster = sub.add_parser("cluster", help="Run clustering operation on works", parents=[fixture_parent])
-    p_cluster.add_argument("--input", required=True, help="Path to input CSV")
+    p_cluster = sub.add_parser("cluster", help="Run clustering operation on works", parents=[fixture_parent, store_parent, match_parent])
+    p_cluster.add_argument("--input", required=True, help=INPUT_HELP)
     p_cluster.add_argument("--output", required=True, help="Path to output CSV (curated)")
     p_cluster.add_argument("--clusters-json", required=False, help="Optional path to write clusters summary JSON")
 
     p_cluster_expr = sub.add_parser(
         "cluster-with-expressions",
         help="Run clustering on works and propagate to expressions",
-        parents=[fixture_parent],
+        parents=[fixture_parent, store_parent, match_parent],
     )
-    p_cluster_expr.add_argument("--input", required=True, help="Path to input CSV")
+    p_cluster_expr.add_argument("--input", required=True, help=INPUT_HELP)
     p_cluster_expr.add_argument("--output", required=True, help="Path to output CSV (curated)")
     p_cluster_expr.add_argument(
         "--work-clusters-json",
@@ -151,21 +262,165 @@ def main() -> None:
         help="Detect titles contaminated with author names",
         parents=[fixture_parent],
     )
-    p_detect.add_argument("--input", required=True, help="Path to input CSV")
+    p_detect.add_argument("--input", required=True, help=INPUT_HELP)
     p_detect.add_argument("--out-json", required=True, help="Where to write detections JSON")
     p_detect.add_argument("--tau-hi", type=float, default=0.85, help="High-confidence threshold")
     p_detect.add_argument("--tau-lo", type=float, default=0.65, help="Medium-confidence threshold")
 
+    p_run = sub.add_parser(
+        "run",
+        help="Run several operations over one load of the input, sharing NES lookups and cleaned titles",
+        parents=[fixture_parent, match_parent],
+    )
+    p_run.add_argument("--input", required=True, help=INPUT_HELP)
+    operations = registered_operations()
+    p_run.add_argument(
+        "--operations",
+        nargs="+",
+        required=True,
+        choices=[op.name for op in operations],
+        help="Operations, in order: " + "; ".join(f"{op.name}: {op.help}" for op in operations),
+    )
+    for op in operations:
+        if op.add_arguments is not None:
+            op.add_arguments(p_run)
+
+    p_blocks = sub.add_parser(
+        "blocking-report",
+        help="Report block-size distributions of the blocking keys of works, expressions and manifestations",
+        parents=[fixture_parent],
+    )
+    p_blocks.add_argument("--input", required=True, help=INPUT_HELP)
+    p_blocks.add_argument("--output", required=True, help="Where to write the report JSON")
+    p_blocks.add_argument("--blocking-config", metavar="JSON", help="Blocking keys to report on (default: the built-in ones)")
+    p_blocks.add_argument("--top", type=int, default=DEFAULT_TOP_BLOCKS, help="Largest blocks listed per entity kind")
+
+    nes_parent = argparse.ArgumentParser(add_help=False)
+    nes_parent.add_argument("--db", default=".nes_cache.sqlite", help="Path to the NES SQLite cache")
+
+    p_nes_dump = sub.add_parser(
+        "nes-import-dump",
+        help="Bulk-load a BnF authority dump (UNIMARCXchange/MARCXchange XML, optionally .gz/.bz2/.xz) into the NES cache",
+        parents=[nes_parent],
+    )
+    p_nes_dump.add_argument("--dump", required=True, help="Path to the authority dump")
+    p_nes_dump.add_argument("--batch-size", type=int, default=10_000, help="ARKs per transaction")
+
+    p_nes_export = sub.add_parser("nes-export", help="Export the NES cache as portable JSON Lines", parents=[nes_parent])
+    p_nes_export.add_argument("--output", required=True, help="Path to the export (.jsonl or .jsonl.gz)")
+
+    p_nes_import = sub.add_parser("nes-import", help="Import a NES cache export", parents=[nes_parent])
+    p_nes_import.add_argument("--input", required=True, help="Path to an nes-export file")
+
+    p_nes_refresh = sub.add_parser(
+        "nes-refresh",
+        help="Re-resolve the least recently fetched ARKs of the NES cache from SRU",
+        parents=[nes_parent],
+    )
+    p_nes_refresh.add_argument("--limit", type=int, required=True, help="Number of stalest ARKs to refresh")
+    p_nes_refresh.add_argument(
+        "--older-than-days",
+        type=float,
+        help="Only refresh ARKs fetched more than this many days ago",
+    )
+    p_nes_refresh.add_argument("--rate", type=float, default=2.0, help="Maximum SRU requests per second")
+
     args = parser.parse_args()
 
     _configure_logging(args.verbose)
 
-    input_path = Path(args.input)
+    if args.profile_stage and not args.profile:
+        parser.error("--profile-stage requires --profile")
+    if args.memory_budget_mb is not None and not args.memory_report:
+        parser.error("--memory-budget-mb requires --memory-report")
+    if getattr(args, "min_prefix_tokens", 1) < 1:
+        parser.error("--min-prefix-tokens must be at least 1")
+    if not 0 < getattr(args, "jaccard_threshold", 1) <= 1:
+        parser.error("--jaccard-threshold must be in (0, 1]")
+    if getattr(args, "minhash_permutations", 1) < 1:
+        parser.error("--minhash-permutations must be positive")
+    if getattr(args, "title_match", None) == "minhash":
+        try:
+            lsh_bands(args.jaccard_threshold, args.minhash_permutations)
+        except ValueError as exc:
+            parser.error(f"--minhash-permutations: {exc}")
+    if getattr(args, "blocking_config", None):
+        try:
+            load_blocking_scheme(args.blocking_config)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            parser.error(f"--blocking-config {args.blocking_config}: {exc}")
+    if getattr(args, "resume", False) and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    if args.cmd == "run":
+        try:
+            check_options([get_operation(name) for name in args.operations], vars(args))
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    tracker = MemoryTracker() if args.memory_report else None
+    if args.profile or tracker is not None:
+        profiler = enable_profiling(args.profile_stage)
+        if tracker is not None:
+            profiler.on_stage_end.append(tracker.on_stage_end)
+            tracker.start()
+    try:
+        _run_command(args)
+    finally:
+        profiler = disable_profiling()
+        if profiler is not None and args.profile:
+            profiler.write_report(args.profile)
+            LOGGER.info("[bold green]Profile written:[/] %s", args.profile)
+        if tracker is not None:
+            tracker.stop()
+            memory = tracker.write_report(args.memory_report)
+            LOGGER.info(
+                "[bold green]Memory report written:[/] %s (peak RSS %s MB)",
+                args.memory_report,
+                memory["rss_peak_mb"],
+            )
+        if args.metrics:
+            write_metrics(args.metrics, args.metrics_format)
+            LOGGER.info("[bold green]Metrics written:[/] %s", args.metrics)
+
+    if tracker is not None and args.memory_budget_mb is not None:
+        peak = tracker.summary()["rss_peak_mb"]
+        if peak is not None and peak > args.memory_budget_mb:
+            LOGGER.error("Peak RSS %.1f MB exceeds the %.1f MB budget", peak, args.memory_budget_mb)
+            raise SystemExit(1)
+
+
+def _title_blocker(args: argparse.Namespace) -> TitleBlocker:
+    return make_title_blocker(
+        args.title_match,
+        min_prefix_tokens=args.min_prefix_tokens,
+        jaccard_threshold=args.jaccard_threshold,
+        permutations=args.minhash_permutations,
+    )
+
+
+def _blocking(args: argparse.Namespace) -> BlockingScheme:
+    return load_blocking_scheme(args.blocking_config)
+
+
+def _run_command(args: argparse.Namespace) -> None:
+    # Keep the raw string: Path() would collapse the "//" of database URLs.
+    input_source = getattr(args, "input", None) or ""
     if getattr(args, "fixture", None):
-        input_path = _apply_input_fixture(args.input, args.fixture)
+        input_source = str(_apply_input_fixture(args.input, args.fixture))
 
     if args.cmd == "cluster":
-        clusters = run_cluster_operation(str(input_path), args.output, args.clusters_json)
+        clusters = run_cluster_operation(
+            input_source,
+            args.output,
+            args.clusters_json,
+            args.seed_ids,
+            entity_store=args.entity_store,
+            manifest=args.manifest,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            title_blocker=_title_blocker(args),
+            blocking=_blocking(args),
+        )
         LOGGER.info("[bold green]Clusters created:[/] %s", len(clusters))
         for c in clusters:
             LOGGER.info(
@@ -177,10 +432,17 @@ def main() -> None:
 
     elif args.cmd == "cluster-with-expressions":
         work_clusters, expression_clusters = run_cluster_with_expression_operation(
-            str(input_path),
+            input_source,
             args.output,
             args.work_clusters_json,
             args.expression_clusters_json,
+            args.seed_ids,
+            entity_store=args.entity_store,
+            manifest=args.manifest,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            title_blocker=_title_blocker(args),
+            blocking=_blocking(args),
         )
         LOGGER.info("[bold green]Work clusters created:[/] %s", len(work_clusters))
         for c in work_clusters:
@@ -200,8 +462,67 @@ def main() -> None:
             )
 
     elif args.cmd == "detect-contamination":
-        recs = run_title_contamination_detection(str(input_path), args.out_json, tau_hi=args.tau_hi, tau_lo=args.tau_lo)
+        recs = run_title_contamination_detection(
+            input_source,
+            args.out_json,
+            tau_hi=args.tau_hi,
+            tau_lo=args.tau_lo,
+            seed_ids_path=args.seed_ids,
+        )
         LOGGER.info("[bold green]Detections written:[/] %s", len(recs))
 
+    elif args.cmd == "blocking-report":
+        report = run_blocking_report(
+            input_source,
+            args.output,
+            seed_ids_path=args.seed_ids,
+            blocking=_blocking(args),
+            top=args.top,
+        )
+        for kind, entry in report.items():
+            blocks = entry.get("groups", entry["blocks"])
+            LOGGER.info(
+                "[bold green]%s:[/] %s records (%s without key), %s blocks, largest %s, %s candidate pairs",
+                kind,
+                entry["records"],
+                entry["unkeyed"],
+                blocks["count"],
+                blocks["max"],
+                blocks["pairs"],
+            )
+
+    elif args.cmd == "run":
+        results = run_operations(
+            input_source,
+            args.operations,
+            vars(args),
+            seed_ids_path=args.seed_ids,
+            title_blocker=_title_blocker(args),
+            blocking=_blocking(args),
+        )
+        for name, result in results.items():
+            LOGGER.info("[bold green]%s:[/] %s results", name, len(result) if hasattr(result, "__len__") else "-")
+
+    elif args.cmd == "nes-import-dump":
+        count = import_authority_dump(args.dump, NESStore(args.db), batch_size=args.batch_size)
+        LOGGER.info("[bold green]Authority records imported:[/] %s", count)
+
+    elif args.cmd == "nes-export":
+        count = NESStore(args.db).export_cache(args.output)
+        LOGGER.info("[bold green]Cached ARKs exported:[/] %s", count)
+
+    elif args.cmd == "nes-refresh":
+        ttl = args.older_than_days * 86400 if args.older_than_days is not None else None
+        report = refresh_stalest(NESStore(args.db), args.limit, ttl, requests_per_second=args.rate)
+        LOGGER.info(
+            "[bold green]Cached ARKs refreshed:[/] %s ([bold red]%s failed[/])",
+            len(report.resolved),
+            len(report.failed),
+        )
+
+    elif args.cmd == "nes-import":
+        count = NESStore(args.db).import_cache(input_source)
+        LOGGER.info("[bold green]Cached ARKs imported:[/] %s", count)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,306 @@
+"""Which records are compared with which: declarative blocking keys per entity kind.
+
+A key is one or more Intermarc subfield paths ("015$c", "700$3"); several
+paths make a composite key, one value per path. A path holding several values
+either yields every combination of them ("all") or only its first value
+("first", the historical rule for works). Values go through a normalizer
+before they are compared. A kind can list several keys: two records share a
+block when any one of them matches.
+
+Works are clustered per group, the connected components of their blocks, so
+a work reaching two blocks through two 700$3 merges them instead of being
+clustered twice. Expressions of clustered works match when they share a block.
+
+The default scheme reproduces the hard-coded rules; a JSON file overrides it
+kind by kind::
+
+    {
+      "work": {"paths": ["015$c", "700$3"], "values": "first"},
+      "expression": [
+        {"paths": ["051$a", "041$a"]},
+        {"paths": ["041$a", "144$a"], "normalize": "match"}
+      ],
+      "manifestation": {"paths": ["740$3"]}
+    }
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple, TypeVar
+
+from scripts.curation.registry import LoadPlan
+from scripts.models import Entity
+from scripts.utils.text_norm import normalize_for_match
+from scripts.utils.title_cleaner import normalize_title_for_clustering
+
+
+T = TypeVar("T")
+
+BlockValues = Tuple[str, ...]
+# (position of the key in its kind's rule, values): keys of one rule never collide.
+BlockKey = Tuple[int, BlockValues]
+
+NORMALIZERS: Dict[str, Callable[[str], str]] = {
+    "none": lambda value: value,
+    "strip": str.strip,
+    "casefold": lambda value: value.strip().casefold(),
+    "match": normalize_for_match,
+    "title": normalize_title_for_clustering,
+}
+VALUE_MODES = ("all", "first")
+_PATH = re.compile(r"^([0-9A-Za-z]{3})\$([0-9A-Za-z])$")
+DEFAULT_TOP_BLOCKS = 20
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # The smaller root wins, so roots do not depend on union order.
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+@dataclass(frozen=True)
+class BlockingKey:
+    paths: Tuple[str, ...]
+    normalize: str = "none"
+    values: str = "all"
+
+    def __post_init__(self) -> None:
+        if not self.paths:
+            raise ValueError("A blocking key needs at least one subfield path")
+        for path in self.paths:
+            if not _PATH.match(path):
+                raise ValueError(f"Invalid subfield path {path!r}; expected e.g. '015$c'")
+        if self.normalize not in NORMALIZERS:
+            raise ValueError(f"Unknown normalizer {self.normalize!r}; expected one of {', '.join(NORMALIZERS)}")
+        if self.values not in VALUE_MODES:
+            raise ValueError(f"Unknown values mode {self.values!r}; expected one of {', '.join(VALUE_MODES)}")
+
+    @property
+    def zones(self) -> Tuple[str, ...]:
+        return tuple(path.split("$")[0] for path in self.paths)
+
+    @property
+    def description(self) -> str:
+        return f"{'+'.join(self.paths)}[{self.values},{self.normalize}]"
+
+    def extract(self, entity: Entity) -> List[BlockValues]:
+        """Key values of `entity`; none when one of the paths is missing."""
+        normalize = NORMALIZERS[self.normalize]
+        per_path: List[List[str]] = []
+        for path in self.paths:
+            zone, sub = path.split("$")
+            found = entity.intermarc.get_subfield_values(zone, sub)
+            if not found:
+                return []
+            if self.values == "first":
+                found = found[:1]
+            per_path.append(list(dict.fromkeys(normalize(value) for value in found)))
+        return list(product(*per_path))
+
+
+@dataclass(frozen=True)
+class BlockingRule:
+    """The keys of one entity kind; records sharing any of them share a block."""
+
+    keys: Tuple[BlockingKey, ...]
+
+    @property
+    def description(self) -> str:
+        return " | ".join(key.description for key in self.keys)
+
+    def block_keys(self, entity: Entity) -> List[BlockKey]:
+        return [(index, values) for index, key in enumerate(self.keys) for values in key.extract(entity)]
+
+
+DEFAULT_WORK_RULE = BlockingRule((BlockingKey(("015$c", "700$3"), values="first"),))
+DEFAULT_EXPRESSION_RULE = BlockingRule((BlockingKey(("051$a", "041$a")),))
+DEFAULT_MANIFESTATION_RULE = BlockingRule((BlockingKey(("740$3",)),))
+
+
+@dataclass(frozen=True)
+class BlockingScheme:
+    """Entity kind (as returned by `entity_kind`) -> its blocking rule."""
+
+    rules: Mapping[str, BlockingRule]
+
+    def rule(self, kind: str) -> BlockingRule:
+        try:
+            return self.rules[kind]
+        except KeyError:
+            raise ValueError(f"No blocking rule for {kind!r} entities") from None
+
+    @property
+    def description(self) -> str:
+        return "; ".join(f"{kind}: {rule.description}" for kind, rule in sorted(self.rules.items()))
+
+    def load_plan(self) -> LoadPlan:
+        """Parse only the zones the keys read, for a load that just builds the indexes."""
+        return LoadPlan({
+            kind: frozenset(zone for key in rule.keys for zone in key.zones)
+            for kind, rule in self.rules.items()
+        })
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "BlockingScheme":
+        """Kinds missing from `data` keep their default rule."""
+        rules = dict(DEFAULT_BLOCKING.rules)
+        for kind, spec in data.items():
+            specs = spec if isinstance(spec, list) else [spec]
+            if not specs:
+                raise ValueError(f"Blocking rule for {kind!r} has no key")
+            if any(not isinstance(item, Mapping) or "paths" not in item for item in specs):
+                raise ValueError(f"Every blocking key for {kind!r} needs its 'paths'")
+            rules[kind] = BlockingRule(tuple(
+                BlockingKey(
+                    paths=tuple(item["paths"]),
+                    normalize=item.get("normalize", "none"),
+                    values=item.get("values", "all"),
+                )
+                for item in specs
+            ))
+        return cls(rules)
+
+
+DEFAULT_BLOCKING = BlockingScheme({
+    "work": DEFAULT_WORK_RULE,
+    "expression": DEFAULT_EXPRESSION_RULE,
+    "manifestation": DEFAULT_MANIFESTATION_RULE,
+})
+
+
+def load_blocking_scheme(path: str | Path | None) -> BlockingScheme:
+    if not path:
+        return DEFAULT_BLOCKING
+    with open(path, "r", encoding="utf-8") as f:
+        return BlockingScheme.from_dict(json.load(f))
+
+
+def group_by_blocks(keyed: Iterable[Tuple[T, Sequence[BlockKey]]]) -> List[Tuple[BlockValues, List[T]]]:
+    """
+    Connected components of items linked by shared block keys, as (group key,
+    members). Items without keys are left out; groups come in order of their
+    first member, members keep input order, and the group key is the values
+    of the first member's first key.
+    """
+    items: List[Tuple[T, BlockValues, int]] = []
+    key_index: Dict[BlockKey, int] = {}
+    links: List[Tuple[int, int]] = []
+    for item, keys in keyed:
+        if not keys:
+            continue
+        indices = [key_index.setdefault(key, len(key_index)) for key in keys]
+        items.append((item, keys[0][1], indices[0]))
+        links.extend((indices[0], other) for other in indices[1:])
+
+    components = UnionFind(len(key_index))
+    for a, b in links:
+        components.union(a, b)
+
+    groups: Dict[int, Tuple[BlockValues, List[T]]] = {}
+    for item, values, first in items:
+        groups.setdefault(components.find(first), (values, []))[1].append(item)
+    return list(groups.values())
+
+
+def _size_bucket(size: int) -> str:
+    low = 1 << (size.bit_length() - 1)
+    return str(low) if low == 1 else f"{low}-{2 * low - 1}"
+
+
+def block_size_stats(sizes: Sequence[int]) -> Dict[str, Any]:
+    """Distribution of block sizes; `pairs` is the comparisons they cost, what giant blocks blow up."""
+    ordered = sorted(sizes)
+    if not ordered:
+        return {"count": 0, "singletons": 0, "max": 0, "mean": 0.0, "p50": 0, "p90": 0, "p99": 0, "pairs": 0, "histogram": {}}
+
+    def percentile(q: float) -> int:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    histogram: Dict[str, int] = {}
+    for size in ordered:
+        bucket = _size_bucket(size)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return {
+        "count": len(ordered),
+        "singletons": sum(1 for size in ordered if size == 1),
+        "max": ordered[-1],
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "pairs": sum(size * (size - 1) // 2 for size in ordered),
+        "histogram": histogram,
+    }
+
+
+def block_size_report(
+    entities: Iterable[Entity],
+    scheme: BlockingScheme = DEFAULT_BLOCKING,
+    top: int = DEFAULT_TOP_BLOCKS,
+) -> Dict[str, Any]:
+    """
+    Per kind of `scheme`: how many records have no key, and the size
+    distribution and `top` largest blocks of its key index. Works also get
+    their groups, the components clustering actually iterates.
+    """
+    from scripts.curation.entity_store import entity_kind
+
+    records: Dict[str, int] = {kind: 0 for kind in scheme.rules}
+    unkeyed: Dict[str, int] = {kind: 0 for kind in scheme.rules}
+    index: Dict[str, Dict[BlockKey, int]] = {kind: {} for kind in scheme.rules}
+    work_keys: List[Tuple[str, List[BlockKey]]] = []
+    for entity in entities:
+        kind = entity_kind(entity.type_entite)
+        if kind not in scheme.rules:
+            continue
+        records[kind] += 1
+        keys = list(dict.fromkeys(scheme.rules[kind].block_keys(entity)))
+        if not keys:
+            unkeyed[kind] += 1
+        for key in keys:
+            index[kind][key] = index[kind].get(key, 0) + 1
+        if kind == "work":
+            work_keys.append((entity.id_entitelrm, keys))
+
+    report: Dict[str, Any] = {}
+    for kind, rule in scheme.rules.items():
+        largest = sorted(index[kind].items(), key=lambda item: -item[1])[:top]
+        report[kind] = {
+            "keys": [key.description for key in rule.keys],
+            "records": records[kind],
+            "unkeyed": unkeyed[kind],
+            "blocks": block_size_stats(list(index[kind].values())),
+            "largest": [
+                {"key": rule.keys[position].description, "values": list(values), "size": size}
+                for (position, values), size in largest
+            ],
+        }
+    if "work" in report:
+        groups = group_by_blocks(work_keys)
+        report["work"]["groups"] = block_size_stats([len(members) for _, members in groups])
+        report["work"]["largest_groups"] = [
+            {"values": list(values), "size": len(members)}
+            for values, members in sorted(groups, key=lambda group: -len(group[1]))[:top]
+        ]
+    return report
+
+
+def write_block_report(path: str, report: Mapping[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from scripts.curation.entity_store import EntityStore
+from scripts.curation.operations import ClusterResult
+from scripts.models import Entity
+
+
+LOGGER = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = "1"
+DEFAULT_CHECKPOINT_SECONDS = 60.0
+
+
+def group_signature(store: EntityStore, settings: str = "") -> str:
+    """
+    Hash of the group order and membership, and of the clustering `settings`;
+    a checkpoint only applies to the same sequence of groups clustered the same way.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(settings.encode("utf-8"))
+    for key, member_ids in store.iter_work_group_ids():
+        digest.update(json.dumps([list(key), member_ids]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ClusteringCheckpoint:
+    """
+    Completed work groups of a clustering run, in SQLite: the normalized title
+    of every member, the cluster results and the rewritten anchors. Groups are
+    written as they finish and committed every `interval_seconds` (and when the
+    run stops, even on error), so an interrupted run loses at most that much.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        resume: bool = False,
+        interval_seconds: float = DEFAULT_CHECKPOINT_SECONDS,
+    ):
+        self.path = Path(path)
+        self.resume = resume
+        self.interval_seconds = interval_seconds
+        self._conn = sqlite3.connect(str(self.path))
+        self._last_commit = time.monotonic()
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS title_key(id TEXT PRIMARY KEY, title_key TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS anchor(id TEXT PRIMARY KEY, intermarc TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cluster("
+                "seq INTEGER PRIMARY KEY, anchor_id TEXT, anchor_ark TEXT, clustered_ids TEXT, clustered_arks TEXT)"
+            )
+
+    def _meta(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES(?, ?)", (key, value))
+
+    def start(self, store: EntityStore, settings: str = "") -> int:
+        """Check the checkpoint against `store` and return how many groups are already done."""
+        signature = group_signature(store, settings)
+        completed = int(self._meta("completed_groups") or 0)
+        if self.resume and completed:
+            if self._meta("version") != CHECKPOINT_VERSION or self._meta("signature") != signature:
+                raise ValueError(f"Checkpoint {self.path} was written for a different input; rerun without --resume")
+            LOGGER.info("Resuming from %s: %s groups already done", self.path, completed)
+            return completed
+        if self.resume:
+            LOGGER.info("No completed groups in %s; starting from the first group", self.path)
+        with self._conn:
+            for table in ("meta", "title_key", "anchor", "cluster"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._set_meta("version", CHECKPOINT_VERSION)
+            self._set_meta("signature", signature)
+            self._set_meta("completed_groups", "0")
+        return 0
+
+    def title_keys(self) -> Dict[str, str]:
+        return dict(self._conn.execute("SELECT id, title_key FROM title_key"))
+
+    def anchor_intermarcs(self) -> Dict[str, str]:
+        return dict(self._conn.execute("SELECT id, intermarc FROM anchor"))
+
+    def cluster_results(self) -> List[ClusterResult]:
+        return [
+            ClusterResult(
+                anchor_id=anchor_id,
+                anchor_ark=anchor_ark,
+                clustered_ids=json.loads(ids),
+                clustered_arks=json.loads(arks),
+            )
+            for anchor_id, anchor_ark, ids, arks in self._conn.execute(
+                "SELECT anchor_id, anchor_ark, clustered_ids, clustered_arks FROM cluster ORDER BY seq"
+            )
+        ]
+
+    def group_done(
+        self,
+        index: int,
+        title_keys: Dict[str, str],
+        anchors: Iterable[Entity],
+        clusters: Iterable[ClusterResult],
+    ) -> None:
+        """
+        Record group `index` (0-based) as completed; committed with the next flush.
+        The rows and the `completed_groups` bump share a savepoint, so an interrupt
+        cannot leave the group's clusters in without the group counted as done.
+        """
+        # Inside an open transaction, releasing the savepoint does not commit it.
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+        self._conn.execute("SAVEPOINT group_done")
+        try:
+            self._conn.executemany("INSERT OR REPLACE INTO title_key VALUES(?, ?)", title_keys.items())
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO anchor VALUES(?, ?)",
+                ((a.id_entitelrm, a.intermarc_raw) for a in anchors),
+            )
+            self._conn.executemany(
+                "INSERT INTO cluster(anchor_id, anchor_ark, clustered_ids, clustered_arks) VALUES(?, ?, ?, ?)",
+                (
+                    (c.anchor_id, c.anchor_ark, json.dumps(c.clustered_ids), json.dumps(c.clustered_arks))
+                    for c in clusters
+                ),
+            )
+            self._set_meta("completed_groups", str(index + 1))
+        except BaseException:
+            self._conn.execute("ROLLBACK TO group_done")
+            raise
+        finally:
+            self._conn.execute("RELEASE group_done")
+        if time.monotonic() - self._last_commit >= self.interval_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        self._conn.commit()
+        self._last_commit = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import re
+import sqlite3
+from typing import Any, Iterable, Iterator, List, Sequence, Set, Tuple
+
+from ..models import Entity
+from scripts.utils.compressed_io import open_text
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Same layout as the NOEMI tables queried in sql/sql_query.md; SQLite stand-ins
+# keep the tables in their main schema.
+SCHEMA = "noemiprod"
+ENTITY_TABLE = "entitelrm"
+LINK_TABLE = "entitelrm_entitelrm"
+HEADERS = ["id_entitelrm", "type_entite", "intermarc"]
+DEFAULT_CHUNK = 500
+DEFAULT_ITERSIZE = 2000
+
+# Step 5 of the SQL: any cb ARK in a record points to entity id = digits minus the check character.
+ARK_ID_PATTERN = re.compile(r"ark:/12148/cb([0-9a-z]+)", re.IGNORECASE)
+
+Row = Tuple[str, str, str]
+
+
+def connect(url: str) -> Any:
+    """Open a DB-API connection from `sqlite:///path` or `postgresql://...`."""
+    if url.startswith("sqlite:///"):
+        return sqlite3.connect(url[len("sqlite:///"):])
+    if url.startswith(("postgresql://", "postgres://")):
+        try:
+            import psycopg2  # type: ignore
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("psycopg2 is required to read from PostgreSQL") from exc
+        return psycopg2.connect(url)
+    raise ValueError(f"Unsupported database URL: {url}")
+
+
+def is_db_url(source: str) -> bool:
+    return source.startswith(("sqlite:///", "postgresql://", "postgres://"))
+
+
+def _placeholder(conn: Any) -> str:
+    return "?" if isinstance(conn, sqlite3.Connection) else "%s"
+
+
+def _table(conn: Any, name: str, schema: str | None) -> str:
+    if schema is None:
+        schema = None if isinstance(conn, sqlite3.Connection) else SCHEMA
+    return f"{schema}.{name}" if schema else name
+
+
+def _chunks(values: Sequence[int], size: int) -> Iterator[Sequence[int]]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _cursor(conn: Any, server_side: bool) -> Any:
+    """Named (server-side) cursor on PostgreSQL so rows stream instead of being buffered client-side."""
+    if server_side and not isinstance(conn, sqlite3.Connection):
+        cur = conn.cursor(name="vendange_stream")
+        cur.itersize = DEFAULT_ITERSIZE
+        return cur
+    return conn.cursor()
+
+
+def ark_to_entity_id(ark_suffix: str) -> int | None:
+    digits = ark_suffix[:-1]
+    return int(digits) if digits.isdigit() else None
+
+
+def _hop(conn: Any, schema: str | None, code: str, destinations: Sequence[int], chunk_size: int) -> Set[int]:
+    ph = _placeholder(conn)
+    link_table = _table(conn, LINK_TABLE, schema)
+    found: Set[int] = set()
+    for chunk in _chunks(sorted(destinations), chunk_size):
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT DISTINCT id_entitelrm_source FROM {link_table} "
+            f"WHERE codesouszone = {ph} AND id_entitelrm_destination IN ({', '.join([ph] * len(chunk))})",
+            [code, *chunk],
+        )
+        found.update(int(row[0]) for row in cur.fetchall())
+        cur.close()
+    return found
+
+
+def collect_base_ids(
+    conn: Any,
+    seed_ids: Iterable[int],
+    *,
+    schema: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> Set[int]:
+    """Steps 1-3 of the SQL: seed works, expressions pointing to them (750$3), manifestations of those (740$3)."""
+    ids = {int(i) for i in seed_ids}
+    hop_750 = _hop(conn, schema, "750$3", list(ids), chunk_size)
+    hop_740 = _hop(conn, schema, "740$3", list(hop_750), chunk_size)
+    LOGGER.info("DB hops: %s seeds, %s via 750$3, %s via 740$3", len(ids), len(hop_750), len(hop_740))
+    return ids | hop_750 | hop_740
+
+
+def iter_entity_rows(
+    conn: Any,
+    ids: Iterable[int],
+    *,
+    schema: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+    server_side: bool = True,
+) -> Iterator[Row]:
+    """Stream (id_entitelrm, type_entite, intermarc) rows for the given ids, in id order."""
+    ph = _placeholder(conn)
+    entity_table = _table(conn, ENTITY_TABLE, schema)
+    for chunk in _chunks(sorted(ids), chunk_size):
+        cur = _cursor(conn, server_side)
+        cur.execute(
+            f"SELECT id_entitelrm, type_entite, intermarc FROM {entity_table} "
+            f"WHERE id_entitelrm IN ({', '.join([ph] * len(chunk))}) ORDER BY id_entitelrm",
+            list(chunk),
+        )
+        for id_entitelrm, type_entite, intermarc in cur:
+            if not isinstance(intermarc, str):
+                # jsonb columns come back already decoded
+                intermarc = json.dumps(intermarc, ensure_ascii=False)
+            yield str(id_entitelrm), type_entite, intermarc
+        cur.close()
+
+
+def _cited_ids(intermarc: str) -> Iterator[int]:
+    for match in ARK_ID_PATTERN.finditer(intermarc):
+        entity_id = ark_to_entity_id(match.group(1))
+        if entity_id is not None:
+            yield entity_id
+
+
+def stream_db_rows(
+    conn: Any,
+    seed_ids: Iterable[int],
+    *,
+    schema: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+    ordered: bool = False,
+) -> Iterator[Row]:
+    """
+    Run the hop queries of sql/sql_query.md and stream the resulting rows:
+    first the base rows (seeds + hops), then every entity whose ARK they cite.
+
+    With `ordered`, the base rows are only scanned for cited ARKs and every row
+    is then streamed in a single id-ordered pass, as `ORDER BY id_entitelrm`
+    over the whole set would return them.
+    """
+    base_ids = collect_base_ids(conn, seed_ids, schema=schema, chunk_size=chunk_size)
+    linked: Set[int] = set()
+    for row in iter_entity_rows(conn, base_ids, schema=schema, chunk_size=chunk_size):
+        linked.update(_cited_ids(row[2]))
+        if not ordered:
+            yield row
+    extra = linked - base_ids
+    LOGGER.info("DB ark scraping: %s linked entities outside the base set", len(extra))
+    yield from iter_entity_rows(conn, base_ids | extra if ordered else extra, schema=schema, chunk_size=chunk_size)
+
+
+def stream_db_entities(conn: Any, seed_ids: Iterable[int], **options: Any) -> Iterator[Entity]:
+    for id_entitelrm, type_entite, intermarc in stream_db_rows(conn, seed_ids, **options):
+        yield Entity(id_entitelrm=id_entitelrm, type_entite=type_entite, intermarc_raw=intermarc)
+
+
+def load_seed_ids(path: str) -> List[int]:
+    """Read work ids (one per line, commas tolerated) such as sql/comtesse_segur_work_ids.txt."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [int(tok) for tok in re.split(r"[\s,]+", f.read()) if tok.isdigit()]
+
+
+def build_sqlite_standin(csv_path: str, db_path: str) -> int:
+    """
+    Load a CSV export into SQLite tables shaped like entitelrm / entitelrm_entitelrm,
+    deriving links from every `$3` ARK, so the DB adapter can run without NOEMI.
+    Returns the number of entities loaded.
+    """
+    csv.field_size_limit(2**31 - 1)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS entitelrm")
+        conn.execute("DROP TABLE IF EXISTS entitelrm_entitelrm")
+        conn.execute("CREATE TABLE entitelrm(id_entitelrm INTEGER PRIMARY KEY, type_entite TEXT, intermarc TEXT)")
+        conn.execute(
+            "CREATE TABLE entitelrm_entitelrm("
+            "id_entitelrm_source INTEGER, id_entitelrm_destination INTEGER, codesouszone TEXT)"
+        )
+        conn.execute(
+            "CREATE INDEX entitelrm_link_dest ON entitelrm_entitelrm(codesouszone, id_entitelrm_destination)"
+        )
+        count = 0
+        with open_text(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f, delimiter=";", quotechar='"')
+            for row in reader:
+                source = int(row["id_entitelrm"])
+                conn.execute(
+                    "INSERT INTO entitelrm VALUES(?,?,?)", (source, row["type_entite"], row["intermarc"])
+                )
+                links = []
+                for zone in json.loads(row["intermarc"]).get("zones", []):
+                    for sz in zone.get("sousZones", []):
+                        code = sz.get("code", "")
+                        match = ARK_ID_PATTERN.search(str(sz.get("valeur", "")))
+                        if code.endswith("$3") and match:
+                            dest = ark_to_entity_id(match.group(1))
+                            if dest is not None:
+                                links.append((source, dest, code))
+                conn.executemany("INSERT INTO entitelrm_entitelrm VALUES(?,?,?)", links)
+                count += 1
+    conn.close()
+    return count
@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from contextlib import closing
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Protocol, Sequence, Tuple
+
+from scripts.curation.blocking import DEFAULT_BLOCKING, BlockKey, BlockingScheme, group_by_blocks
+from scripts.models import Entity
+from scripts.utils.title_cleaner import extract_responsible_person_arks
+
+
+WORK_TYPES = {"œuvre", "oeuvre"}
+EXPRESSION_TYPES = {"expression"}
+DEFAULT_STORE_BATCH = 5_000
+
+GroupKey = Tuple[str, ...]
+RawRecord = Tuple[str, str, str]
+StoredRow = Tuple[List[str], "Entity | None"]
+# (work id, whether the work has a title, responsibility ARK)
+WorkPersonArk = Tuple[str, bool, str]
+
+
+def entity_kind(type_entite: str) -> str:
+    """'work', 'expression' or the lowercased NOEMI type for anything else."""
+    normalized = type_entite.strip().lower()
+    if normalized in WORK_TYPES:
+        return "work"
+    if normalized in EXPRESSION_TYPES:
+        return "expression"
+    return normalized
+
+
+def expression_work_arks(expr: Entity) -> List[str]:
+    """Return referenced work ARKs for an expression entity (140$3, else 750$3)."""
+    arks = expr.intermarc.get_subfield_values("140", "3")
+    if arks:
+        return arks
+    return expr.intermarc.get_subfield_values("750", "3")
+
+
+class EntityStore(Protocol):
+    """What the curation operations need from a backend, in-memory or on disk."""
+
+    def iter_work_groups(self) -> Iterator[Tuple[GroupKey, List[Entity]]]:
+        """Works sharing a block (by default (015$c, 700$3)), group by group, in order of first appearance."""
+
+    def iter_work_group_ids(self) -> Iterator[Tuple[GroupKey, List[str]]]:
+        """The groups of `iter_work_groups` as member ids, without loading the records."""
+
+    def iter_work_person_arks(self, start_group: int = 0) -> Iterator[WorkPersonArk]:
+        """Responsibility ARKs of the works in groups `start_group` onwards, without loading the records."""
+
+    def entities_by_ark(self) -> Mapping[str, Entity]:
+        """Lookup used for local 100/400 name variants."""
+
+    def expressions_for_work(self, work_ark: str) -> List[Entity]:
+        """Expressions pointing to `work_ark`, in input order."""
+
+    def iter_records(self) -> Iterator[RawRecord]:
+        """(id_entitelrm, type_entite, intermarc) of every entity, serialized as `to_json_string` writes it."""
+
+
+class InMemoryEntityStore:
+    """The historical backend: everything lives in Python lists and dicts."""
+
+    def __init__(
+        self,
+        entities: Sequence[Entity],
+        works: Sequence[Entity] | None = None,
+        expressions: Sequence[Entity] | None = None,
+        blocking: BlockingScheme | None = None,
+    ):
+        self.entities = list(entities)
+        self.works = list(works) if works is not None else [e for e in self.entities if entity_kind(e.type_entite) == "work"]
+        self.expressions = (
+            list(expressions)
+            if expressions is not None
+            else [e for e in self.entities if entity_kind(e.type_entite) == "expression"]
+        )
+        self.blocking = blocking or DEFAULT_BLOCKING
+        self._by_ark: Dict[str, Entity] | None = None
+        self._expressions_by_work_ark: Dict[str, List[Entity]] | None = None
+
+    def iter_work_groups(self) -> Iterator[Tuple[GroupKey, List[Entity]]]:
+        rule = self.blocking.rule("work")
+        yield from group_by_blocks((w, rule.block_keys(w)) for w in self.works)
+
+    def iter_work_group_ids(self) -> Iterator[Tuple[GroupKey, List[str]]]:
+        for key, members in self.iter_work_groups():
+            yield key, [w.id_entitelrm for w in members]
+
+    def iter_work_person_arks(self, start_group: int = 0) -> Iterator[WorkPersonArk]:
+        for index, (_, members) in enumerate(self.iter_work_groups()):
+            if index < start_group:
+                continue
+            for w in members:
+                titled = bool(w.title_main())
+                for ark in extract_responsible_person_arks(w):
+                    yield w.id_entitelrm, titled, ark
+
+    def entities_by_ark(self) -> Mapping[str, Entity]:
+        if self._by_ark is None:
+            self._by_ark = {ark: entity for entity in self.entities if (ark := entity.ark())}
+        return self._by_ark
+
+    def expressions_for_work(self, work_ark: str) -> List[Entity]:
+        if self._expressions_by_work_ark is None:
+            self._expressions_by_work_ark = {}
+            for expr in self.expressions:
+                for ark in expression_work_arks(expr):
+                    self._expressions_by_work_ark.setdefault(ark, []).append(expr)
+        return self._expressions_by_work_ark.get(work_ark, [])
+
+    def iter_records(self) -> Iterator[RawRecord]:
+        for e in self.entities:
+            yield e.id_entitelrm, e.type_entite, e.intermarc.to_json_string()
+
+
+class _SQLiteArkIndex(Mapping[str, Entity]):
+    """Read-only Mapping over the store's ARK index, so NES lookups never load the catalog."""
+
+    def __init__(self, store: "SQLiteEntityStore"):
+        self._store = store
+
+    def __getitem__(self, ark: str) -> Entity:
+        entity = self._store.get_by_ark(ark)
+        if entity is None:
+            raise KeyError(ark)
+        return entity
+
+    def __contains__(self, ark: object) -> bool:
+        return isinstance(ark, str) and self._store.has_ark(ark)
+
+    def __iter__(self) -> Iterator[str]:
+        with closing(self._store._conn.execute("SELECT DISTINCT ark FROM entity WHERE ark IS NOT NULL")) as cur:
+            for (ark,) in cur:
+                yield ark
+
+    def __len__(self) -> int:
+        return self._store._conn.execute("SELECT COUNT(DISTINCT ark) FROM entity").fetchone()[0]
+
+
+class SQLiteEntityStore:
+    """
+    Out-of-core backend: raw Intermarc and the original CSV cells live in SQLite,
+    indexed on id, ARK, type, the work group and the 140/750 links,
+    so clustering pulls one group at a time instead of holding the whole export.
+    """
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entity("
+                "seq INTEGER PRIMARY KEY, id TEXT, type TEXT, kind TEXT, ark TEXT, intermarc TEXT, cells TEXT)"
+            )
+            # Stores written before configurable blocking kept (015$c, 700$3) columns here.
+            self._conn.execute("DROP TABLE IF EXISTS work_key")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS work_group(grp INTEGER PRIMARY KEY, key TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS work_member(seq INTEGER PRIMARY KEY, grp INTEGER NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS link(seq INTEGER NOT NULL, code TEXT NOT NULL, target_ark TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS work_person(seq INTEGER NOT NULL, titled INTEGER NOT NULL, ark TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entity_id ON entity(id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entity_ark ON entity(ark)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entity_kind ON entity(kind)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS work_member_group ON work_member(grp, seq)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS link_target ON link(target_ark, code)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS link_source ON link(seq, code)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS work_person_seq ON work_person(seq)")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SQLiteEntityStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # -- loading -----------------------------------------------------------
+
+    @property
+    def headers(self) -> List[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'headers'").fetchone()
+        return json.loads(row[0]) if row else []
+
+    @property
+    def intermarc_column(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'intermarc_column'").fetchone()
+        return int(row[0]) if row else -1
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entity WHERE id IS NOT NULL").fetchone()[0]
+
+    def load(
+        self,
+        headers: List[str],
+        intermarc_column: int,
+        rows: Iterable[StoredRow],
+        batch_size: int = DEFAULT_STORE_BATCH,
+        blocking: BlockingScheme | None = None,
+    ) -> int:
+        """
+        Replace the store content with `rows`: (cells, entity) pairs in export
+        order, entity None for rows that are copied through untouched.
+        Returns the number of entities stored.
+
+        Work groups are components over the whole export, so only the block
+        keys of works are held in memory until the last row is read.
+        """
+        rule = (blocking or DEFAULT_BLOCKING).rule("work")
+        with self._conn:
+            for table in ("meta", "entity", "work_group", "work_member", "link", "work_person"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("INSERT INTO meta VALUES('headers', ?)", (json.dumps(headers, ensure_ascii=False),))
+            self._conn.execute("INSERT INTO meta VALUES('intermarc_column', ?)", (str(intermarc_column),))
+
+        count = 0
+        entity_rows: List[Tuple] = []
+        work_keys: List[Tuple[int, List[BlockKey]]] = []
+        link_rows: List[Tuple] = []
+        person_rows: List[Tuple] = []
+
+        def flush() -> None:
+            with self._conn:
+                self._conn.executemany("INSERT INTO entity VALUES(?,?,?,?,?,?,?)", entity_rows)
+                self._conn.executemany("INSERT INTO link VALUES(?,?,?)", link_rows)
+                self._conn.executemany("INSERT INTO work_person VALUES(?,?,?)", person_rows)
+            entity_rows.clear()
+            link_rows.clear()
+            person_rows.clear()
+
+        for seq, (cells, entity) in enumerate(rows):
+            if entity is None:
+                entity_rows.append((seq, None, None, None, None, None, json.dumps(cells, ensure_ascii=False)))
+            else:
+                stored_cells = list(cells)
+                stored_cells[intermarc_column] = None
+                entity_rows.append((
+                    seq,
+                    entity.id_entitelrm,
+                    entity.type_entite,
+                    entity_kind(entity.type_entite),
+                    entity.ark(),
+                    entity.intermarc.to_json_string(),
+                    json.dumps(stored_cells, ensure_ascii=False),
+                ))
+                if entity_kind(entity.type_entite) == "work":
+                    work_keys.append((seq, rule.block_keys(entity)))
+                    titled = int(bool(entity.title_main()))
+                    person_rows.extend((seq, titled, ark) for ark in extract_responsible_person_arks(entity))
+                for code in ("140", "750"):
+                    for ark in entity.intermarc.get_subfield_values(code, "3"):
+                        link_rows.append((seq, code, ark))
+                count += 1
+            if len(entity_rows) >= batch_size:
+                flush()
+        flush()
+
+        # A group is numbered by its first member, so ordering by it keeps the order of first appearance.
+        groups = group_by_blocks(work_keys)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO work_group VALUES(?,?)",
+                ((members[0], json.dumps(list(key), ensure_ascii=False)) for key, members in groups),
+            )
+            self._conn.executemany(
+                "INSERT INTO work_member VALUES(?,?)",
+                ((seq, members[0]) for _, members in groups for seq in members),
+            )
+        return count
+
+    # -- EntityStore -------------------------------------------------------
+
+    @staticmethod
+    def _entity(row: Tuple[str, str, str]) -> Entity:
+        return Entity(id_entitelrm=row[0], type_entite=row[1], intermarc_raw=row[2])
+
+    def iter_work_groups(self) -> Iterator[Tuple[GroupKey, List[Entity]]]:
+        groups = self._conn.execute("SELECT grp, key FROM work_group ORDER BY grp").fetchall()
+        for grp, key in groups:
+            members = self._conn.execute(
+                "SELECT e.id, e.type, e.intermarc FROM work_member m JOIN entity e ON e.seq = m.seq "
+                "WHERE m.grp = ? ORDER BY m.seq",
+                (grp,),
+            ).fetchall()
+            yield tuple(json.loads(key)), [self._entity(row) for row in members]
+
+    def iter_work_group_ids(self) -> Iterator[Tuple[GroupKey, List[str]]]:
+        with closing(self._conn.execute(
+            "SELECT g.grp, g.key, e.id FROM work_group g JOIN work_member m ON m.grp = g.grp "
+            "JOIN entity e ON e.seq = m.seq ORDER BY g.grp, m.seq"
+        )) as cur:
+            for (_, key), rows in groupby(cur, key=lambda row: row[:2]):
+                yield tuple(json.loads(key)), [row[2] for row in rows]
+
+    def iter_work_person_arks(self, start_group: int = 0) -> Iterator[WorkPersonArk]:
+        # Groups are numbered by their first member, so the start is found by rank, not number.
+        first = self._conn.execute(
+            "SELECT grp FROM work_group ORDER BY grp LIMIT 1 OFFSET ?", (start_group,)
+        ).fetchone()
+        if first is None:
+            return
+        with closing(self._conn.execute(
+            "SELECT e.id, p.titled, p.ark FROM work_member m JOIN work_person p ON p.seq = m.seq "
+            "JOIN entity e ON e.seq = m.seq WHERE m.grp >= ? ORDER BY m.grp, m.seq, p.rowid",
+            (first[0],),
+        )) as cur:
+            for entity_id, titled, ark in cur:
+                yield entity_id, bool(titled), ark
+
+    def entities_by_ark(self) -> Mapping[str, Entity]:
+        return _SQLiteArkIndex(self)
+
+    def get_by_ark(self, ark: str) -> Entity | None:
+        # Last row wins, like the dict built by the in-memory backend.
+        row = self._conn.execute(
+            "SELECT id, type, intermarc FROM entity WHERE ark = ? ORDER BY seq DESC LIMIT 1", (ark,)
+        ).fetchone()
+        return self._entity(row) if row else None
+
+    def has_ark(self, ark: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM entity WHERE ark = ? LIMIT 1", (ark,)).fetchone() is not None
+
+    def expressions_for_work(self, work_ark: str) -> List[Entity]:
+        rows = self._conn.execute(
+            "SELECT DISTINCT e.seq, e.id, e.type, e.intermarc FROM link l JOIN entity e ON e.seq = l.seq "
+            "WHERE l.target_ark = ? AND e.kind = 'expression' "
+            "AND (l.code = '140' OR NOT EXISTS (SELECT 1 FROM link l2 WHERE l2.seq = l.seq AND l2.code = '140')) "
+            "ORDER BY e.seq",
+            (work_ark,),
+        ).fetchall()
+        return [self._entity(row[1:]) for row in rows]
+
+    def iter_records(self) -> Iterator[RawRecord]:
+        with closing(
+            self._conn.execute("SELECT id, type, intermarc FROM entity WHERE id IS NOT NULL ORDER BY seq")
+        ) as cur:
+            yield from cur
+
+    # -- write back --------------------------------------------------------
+
+    def update_entities(self, entities: Iterable[Entity]) -> int:
+        """Persist new Intermarc for already stored ids (e.g. anchors given 90F zones)."""
+        payload = [(e.intermarc.to_json_string(), e.id_entitelrm) for e in entities]
+        with self._conn:
+            self._conn.executemany("UPDATE entity SET intermarc = ? WHERE id = ?", payload)
+        return len(payload)
+
+    def iter_rows(self) -> Iterator[List[str]]:
+        """Export rows in input order, entity rows carrying their current Intermarc."""
+        column = self.intermarc_column
+        with closing(self._conn.execute("SELECT id, intermarc, cells FROM entity ORDER BY seq")) as cur:
+            for entity_id, intermarc, cells in cur:
+                row = json.loads(cells)
+                if entity_id is not None:
+                    row[column] = intermarc
+                yield row
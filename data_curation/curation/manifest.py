@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+from scripts.authority.nes_service import NameExpansionService
+from scripts.curation.entity_store import EntityStore, GroupKey
+from scripts.curation.operations import ClusterResult, cluster_work_groups
+from scripts.curation.title_blocking import TitleBlocker
+from scripts.models import Entity
+from scripts.utils import metrics
+from scripts.utils.title_cleaner import extract_responsible_person_arks
+
+if TYPE_CHECKING:
+    from scripts.curation.checkpoint import ClusteringCheckpoint
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump whenever title cleaning or normalization changes, so old keys are not reused.
+MANIFEST_VERSION = "2"
+
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def work_fingerprint(work: Entity, nes: NameExpansionService) -> str:
+    """
+    Hash of everything a work's normalized title depends on: its own record and
+    the name variants of its responsibility ARKs (local 100/400 or NES cache),
+    so an edited author record or a refreshed cache entry invalidates the key.
+    """
+    parts = [work.intermarc.to_json_string()]
+    for ark in extract_responsible_person_arks(work):
+        parts.append(ark)
+        parts.extend(nes.ensure_variants(ark))
+    return content_hash(*parts)
+
+
+@dataclass
+class ManifestDiff:
+    """What changed since the manifest was written; logged, and the title counts go to the run metrics."""
+
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    reused_titles: int = 0
+    recomputed_titles: int = 0
+    touched_groups: int = 0
+    groups: int = 0
+
+
+class RunManifest:
+    """
+    What a run leaves behind for the next one, in SQLite: a content hash per
+    record and, per work, its fingerprint, group key and normalized title.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path))
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS record(id TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+            # A manifest without a version row is new, not outdated.
+            self.outdated = self.version is not None and not self.is_compatible()
+            if not self.is_compatible():
+                # Nothing of an older manifest is reused, and its work table may have another layout.
+                self._conn.execute("DROP TABLE IF EXISTS work")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS work("
+                "id TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, group_key TEXT, title_key TEXT NOT NULL)"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @property
+    def version(self) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def is_compatible(self) -> bool:
+        return self.version == MANIFEST_VERSION
+
+    def record_hashes(self) -> Dict[str, str]:
+        return dict(self._conn.execute("SELECT id, hash FROM record"))
+
+    def title_keys(self) -> Dict[str, Tuple[str, str]]:
+        """work id -> (fingerprint, normalized title)."""
+        return {wid: (fp, key) for wid, fp, key in self._conn.execute("SELECT id, fingerprint, title_key FROM work")}
+
+    def save(
+        self,
+        record_hashes: Dict[str, str],
+        works: Iterable[Tuple[str, str, GroupKey, str]],
+    ) -> None:
+        """Replace the manifest with this run's hashes and (id, fingerprint, group key, title) rows."""
+        with self._conn:
+            self._conn.execute("DELETE FROM record")
+            self._conn.execute("DELETE FROM work")
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES('version', ?)", (MANIFEST_VERSION,))
+            self._conn.executemany("INSERT OR REPLACE INTO record VALUES(?, ?)", record_hashes.items())
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO work VALUES(?, ?, ?, ?)",
+                ((wid, fp, json.dumps(list(key), ensure_ascii=False), title) for wid, fp, key, title in works),
+            )
+
+
+def cluster_incrementally(
+    store: EntityStore,
+    manifest_path: str | Path,
+    checkpoint: "ClusteringCheckpoint | None" = None,
+    title_blocker: TitleBlocker | None = None,
+) -> Tuple[Dict[str, Entity], List[ClusterResult]]:
+    """
+    Cluster works, reusing the normalized titles of every work whose fingerprint
+    matches the previous run's manifest; only changed works go through NES
+    matching and spaCy. Grouping and anchor selection are cheap and re-derived
+    for every group, which is what keeps the output identical to a full run.
+    """
+    manifest = RunManifest(manifest_path)
+    diff = ManifestDiff()
+    try:
+        compatible = manifest.is_compatible()
+        previous_hashes = manifest.record_hashes() if compatible else {}
+        previous_titles = manifest.title_keys() if compatible else {}
+        if manifest.outdated:
+            LOGGER.warning(
+                "Manifest %s was written by version %s, not %s; recomputing everything",
+                manifest_path,
+                manifest.version,
+                MANIFEST_VERSION,
+            )
+
+        record_hashes: Dict[str, str] = {}
+        for entity_id, type_entite, intermarc in store.iter_records():
+            record_hashes[entity_id] = content_hash(type_entite, intermarc)
+            previous = previous_hashes.get(entity_id)
+            if previous is None:
+                diff.added += 1
+            elif previous != record_hashes[entity_id]:
+                diff.changed += 1
+        diff.removed = len(set(previous_hashes) - set(record_hashes))
+
+        nes = NameExpansionService(local_entities_by_ark=store.entities_by_ark())
+        # Fingerprints read every responsibility ARK; fetch the missing ones in batches first.
+        nes.prefetch(ark for _, _, ark in store.iter_work_person_arks())
+        fingerprints: Dict[str, str] = {}
+        group_of: Dict[str, GroupKey] = {}
+        title_keys: Dict[str, str] = {}
+        for key, members in store.iter_work_groups():
+            diff.groups += 1
+            touched = False
+            for w in members:
+                fingerprint = work_fingerprint(w, nes)
+                fingerprints[w.id_entitelrm] = fingerprint
+                group_of[w.id_entitelrm] = key
+                cached = previous_titles.get(w.id_entitelrm)
+                if cached and cached[0] == fingerprint:
+                    title_keys[w.id_entitelrm] = cached[1]
+                    diff.reused_titles += 1
+                else:
+                    touched = True
+                    diff.recomputed_titles += 1
+            diff.touched_groups += touched
+        metrics.incr("manifest_titles_reused", diff.reused_titles)
+        metrics.incr("manifest_titles_recomputed", diff.recomputed_titles)
+        metrics.incr("manifest_groups_touched", diff.touched_groups)
+        LOGGER.info(
+            "Manifest: %s added, %s changed, %s removed records; %s/%s groups touched, %s titles reused",
+            diff.added,
+            diff.changed,
+            diff.removed,
+            diff.touched_groups,
+            diff.groups,
+            diff.reused_titles,
+        )
+
+        try:
+            anchors, clusters = cluster_work_groups(
+                store,
+                title_keys=title_keys,
+                nes=nes,
+                checkpoint=checkpoint,
+                title_blocker=title_blocker,
+            )
+        finally:
+            nes.close()
+
+        manifest.save(
+            record_hashes,
+            ((wid, fingerprints[wid], group_of[wid], title_keys.get(wid, "")) for wid in fingerprints),
+        )
+    finally:
+        manifest.close()
+    return anchors, clusters
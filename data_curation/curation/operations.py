@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple, Set
+from typing import TYPE_CHECKING, Dict, List, Mapping, MutableMapping, Tuple, Set
 from datetime import date
 
 from scripts.authority.nes_service import NameExpansionService
+from scripts.curation.blocking import DEFAULT_BLOCKING, DEFAULT_EXPRESSION_RULE, BlockingRule, BlockingScheme, BlockKey
+from scripts.curation.entity_store import EntityStore, InMemoryEntityStore
+from scripts.curation.title_blocking import ExactTitleBlocker, KeyedWork, TitleBlocker
 from scripts.models import Entity, Intermarc, Zone, SousZone
+from scripts.utils import metrics
+from scripts.utils.profiling import profiled
 from scripts.utils.title_cleaner import (
     clean_title_text,
     contains_illustration_trigger,
@@ -17,6 +22,10 @@ from scripts.utils.title_cleaner import (
 )
 
 
+if TYPE_CHECKING:
+    from scripts.curation.checkpoint import ClusteringCheckpoint
+
+
 LOGGER = logging.getLogger(__name__)
 
 @dataclass
@@ -47,21 +56,9 @@ def _clone_intermarc(intermarc: Intermarc) -> Intermarc:
     )
 
 
-def _expression_work_arks(expr: Entity) -> List[str]:
-    """Return referenced work ARKs for an expression entity."""
-    arks = expr.intermarc.get_subfield_values("140", "3")
-    if arks:
-        return arks
-    return expr.intermarc.get_subfield_values("750", "3")
-
-
-def _expression_signature(expr: Entity) -> Set[Tuple[str, str]]:
-    """Compute the set of (051$a, 041$a) signature pairs for an expression."""
-    vals_051 = expr.intermarc.get_subfield_values("051", "a")
-    vals_041 = expr.intermarc.get_subfield_values("041", "a")
-    if not vals_051 or not vals_041:
-        return set()
-    return {(v051, v041) for v051 in vals_051 for v041 in vals_041}
+def _expression_signature(expr: Entity, rule: BlockingRule = DEFAULT_EXPRESSION_RULE) -> Set[BlockKey]:
+    """Compute the set of block keys of an expression (by default its (051$a, 041$a) pairs)."""
+    return set(rule.block_keys(expr))
 
 
 def _existing_cluster_targets(intermarc: Intermarc) -> Set[str]:
@@ -77,13 +74,10 @@ def _existing_cluster_targets(intermarc: Intermarc) -> Set[str]:
     return targets
 
 
-def _normalized_title_key(entity: Entity, nes: NameExpansionService) -> str:
-    """Return the normalized title used as a clustering key."""
+def clean_work_title(entity: Entity, nes: NameExpansionService) -> str:
+    """Main title with the names of its 700$3 agents (NES variants) and illustration credits removed."""
 
     title = entity.title_main() or ""
-    if not title:
-        return ""
-
     person_spans: List[Tuple[int, int]] = []
     person_arks = extract_responsible_person_arks(entity)
     ark2variants: Dict[str, List[str]] = {}
@@ -99,11 +93,30 @@ def _normalized_title_key(entity: Entity, nes: NameExpansionService) -> str:
         variant_strings = [variant for variants in ark2variants.values() for variant in variants]
         person_spans = match_variants_in_title(title, variant_strings)
 
-    cleaned = clean_title_text(
+    return clean_title_text(
         title,
         person_spans=person_spans,
         remove_illustration_groups=contains_illustration_trigger(title),
     )
+
+
+def _normalized_title_key(
+    entity: Entity,
+    nes: NameExpansionService,
+    cleaned_titles: MutableMapping[str, str] | None = None,
+) -> str:
+    """Return the normalized title used as a clustering key."""
+
+    title = entity.title_main() or ""
+    if not title:
+        return ""
+
+    if cleaned_titles is not None and entity.id_entitelrm in cleaned_titles:
+        cleaned = cleaned_titles[entity.id_entitelrm]
+    else:
+        cleaned = clean_work_title(entity, nes)
+        if cleaned_titles is not None:
+            cleaned_titles[entity.id_entitelrm] = cleaned
     normalized = normalize_title_for_clustering(cleaned)
 
     if cleaned != title:
@@ -126,11 +139,15 @@ def _normalized_title_key(entity: Entity, nes: NameExpansionService) -> str:
 def cluster_works_by_title_responsibilities(
     works: List[Entity],
     all_entities: List[Entity] | None = None,
+    title_blocker: TitleBlocker | None = None,
+    blocking: BlockingScheme | None = None,
 ) -> Tuple[List[Entity], List[ClusterResult]]:
     """
     Implements rule:
-    - Consider works that share same 015$c and same 700$3
-    - Clean and normalize titles
+    - Consider works that share same 015$c and same 700$3 (the default work
+      key; `blocking` can declare others)
+    - Clean and normalize titles; split on equal titles, or as `title_blocker`
+      decides (see `title_blocking`)
     - For each cluster (size >= 2), choose an anchor W1 (prefer the one whose title
       does not contain the suffix heuristic; else smallest id).
     - Produce a new intermarc for W1 with 1 new 90F per clustered work:
@@ -139,42 +156,82 @@ def cluster_works_by_title_responsibilities(
         90F$d = TODAY_DATE (YYYY-MM-DD)
     Returns updated works (with anchors modified) and a list of cluster summaries.
     """
+    store = InMemoryEntityStore(all_entities or [], works=works, blocking=blocking)
+    anchors, cluster_summaries = cluster_work_groups(store, title_blocker=title_blocker)
 
-    # Group by (015$c, 700$3)
-    groups: Dict[Tuple[str, str], List[Entity]] = {}
-    for w in works:
-        key = w.work_group_key()
-        if not key:
-            continue
-        groups.setdefault(key, []).append(w)
-
+    # Return updated list in original order
+    return [anchors.get(w.id_entitelrm, w) for w in works], cluster_summaries
+
+
+@profiled("clustering")
+def cluster_work_groups(
+    store: EntityStore,
+    title_keys: MutableMapping[str, str] | None = None,
+    nes: NameExpansionService | None = None,
+    checkpoint: "ClusteringCheckpoint | None" = None,
+    cleaned_titles: MutableMapping[str, str] | None = None,
+    title_blocker: TitleBlocker | None = None,
+) -> Tuple[Dict[str, Entity], List[ClusterResult]]:
+    """
+    Same rule as `cluster_works_by_title_responsibilities`, driven by any
+    `EntityStore`: groups are pulled one at a time, and only the modified
+    anchors are returned (by id), so the caller decides where they go.
+
+    `title_keys` (work id -> normalized title) is read before computing a key
+    and filled with every key computed, so a caller can carry them across runs.
+
+    With a `checkpoint`, each finished group is recorded there, and groups it
+    already holds are restored instead of recomputed. `cleaned_titles` (work
+    id -> title before normalization) is shared the same way as `title_keys`,
+    with other operations that clean the same titles. `title_blocker` decides
+    which normalized titles match (equality by default).
+    """
     today = date.today().isoformat()
-    updated: Dict[str, Entity] = {w.id_entitelrm: w for w in works}
+    anchors: Dict[str, Entity] = {}
     cluster_summaries: List[ClusterResult] = []
 
-    ark_index = {
-        ark: entity
-        for entity in (all_entities or [])
-        if (ark := entity.ark())
-    }
+    if title_blocker is None:
+        title_blocker = ExactTitleBlocker()
+
+    completed = checkpoint.start(store, title_blocker.description) if checkpoint is not None else 0
+    restored: Dict[str, str] = {}
+    if completed:
+        restored = checkpoint.anchor_intermarcs()
+        cluster_summaries.extend(checkpoint.cluster_results())
+        if title_keys is not None:
+            title_keys.update(checkpoint.title_keys())
+
+    owns_nes = nes is None
+    if nes is None:
+        nes = NameExpansionService(local_entities_by_ark=store.entities_by_ark())
+    known_keys: Mapping[str, str] = title_keys if title_keys is not None else {}
+
+    # Resolve every responsibility ARK up front so the loop below never blocks on SRU.
+    nes.prefetch(
+        ark
+        for work_id, titled, ark in store.iter_work_person_arks(completed)
+        if titled and work_id not in known_keys
+    )
 
-    nes = NameExpansionService(local_entities_by_ark=ark_index)
-    normalized_cache: Dict[str, str] = {}
+    for index, (_, members) in enumerate(store.iter_work_groups()):
+        if index < completed:
+            for w in members:
+                if w.id_entitelrm in restored:
+                    anchors[w.id_entitelrm] = Entity(w.id_entitelrm, w.type_entite, restored[w.id_entitelrm])
+            continue
+        first_summary = len(cluster_summaries)
 
-    for _, members in groups.items():
         # Further split by normalized base title
-        by_title: Dict[str, List[Entity]] = {}
+        keyed: List[KeyedWork] = []
+        normalized_cache: MutableMapping[str, str] = title_keys if title_keys is not None else {}
         for w in members:
             if w.id_entitelrm not in normalized_cache:
-                normalized_cache[w.id_entitelrm] = _normalized_title_key(w, nes)
-                setattr(w, "_normalized_title_for_cluster", normalized_cache[w.id_entitelrm])
+                normalized_cache[w.id_entitelrm] = _normalized_title_key(w, nes, cleaned_titles)
             base = normalized_cache[w.id_entitelrm]
+            setattr(w, "_normalized_title_for_cluster", base)
+            keyed.append((w, base))
 
-            if not base:
-                continue
-            by_title.setdefault(base, []).append(w)
-
-        for _, same_title_members in by_title.items():
+        for same_title_members in title_blocker(keyed):
             if len(same_title_members) < 2:
                 continue
 
@@ -207,8 +264,9 @@ def cluster_works_by_title_responsibilities(
                     SousZone(code="90F$d", valeur=today),
                 ])
                 new_inter.add_zone(z)
+            metrics.incr("zones_90f_emitted", len(others))
 
-            updated[anchor.id_entitelrm] = anchor.clone_with_new_intermarc(new_inter)
+            anchors[anchor.id_entitelrm] = anchor.clone_with_new_intermarc(new_inter)
 
             cluster_summaries.append(
                 ClusterResult(
@@ -219,31 +277,62 @@ def cluster_works_by_title_responsibilities(
                 )
             )
 
-    # Return updated list in original order
-    return [updated[w.id_entitelrm] for w in works], cluster_summaries
+        if checkpoint is not None:
+            group_clusters = cluster_summaries[first_summary:]
+            checkpoint.group_done(
+                index,
+                {w.id_entitelrm: normalized_cache[w.id_entitelrm] for w in members},
+                [anchors[c.anchor_id] for c in group_clusters],
+                group_clusters,
+            )
+
+    if owns_nes:
+        nes.close()
+    LOGGER.debug(
+        "NES variant cache: %s hits, %s misses, %s evictions",
+        nes.stats.hits,
+        nes.stats.misses,
+        nes.stats.evictions,
+    )
+    return anchors, cluster_summaries
 
 
 def cluster_expressions_by_051_and_041(
     expressions: List[Entity],
     work_clusters: List[ClusterResult],
+    blocking: BlockingScheme | None = None,
 ) -> Tuple[List[Entity], List[ExpressionClusterResult]]:
     """
     For each work cluster, propagate the clustering to expressions based on matching
     (051$a, 041$a) signatures. When an expression from a clustered work shares at
     least one signature pair with an anchor expression, add a 90F zone linking it
-    to the anchor expression (same payload as for works).
+    to the anchor expression (same payload as for works). The expression keys
+    of `blocking` replace the (051$a, 041$a) signature when given.
     """
 
     if not expressions or not work_clusters:
         return expressions, []
 
-    expressions_by_work_ark: Dict[str, List[Entity]] = {}
-    for expr in expressions:
-        for work_ark in _expression_work_arks(expr):
-            expressions_by_work_ark.setdefault(work_ark, []).append(expr)
+    store = InMemoryEntityStore(expressions, works=[], expressions=expressions)
+    updated, results = propagate_expression_clusters(store, work_clusters, blocking)
+    ordered = [updated.get(expr.id_entitelrm, expr) for expr in expressions]
+    return ordered, results
 
+
+@profiled("expression_propagation")
+def propagate_expression_clusters(
+    store: EntityStore,
+    work_clusters: List[ClusterResult],
+    blocking: BlockingScheme | None = None,
+) -> Tuple[Dict[str, Entity], List[ExpressionClusterResult]]:
+    """
+    Backend-agnostic core of `cluster_expressions_by_051_and_041`: expressions
+    are looked up per work ARK through the store, and only the modified anchor
+    expressions are returned (by id).
+    """
     today = date.today().isoformat()
-    updated: Dict[str, Entity] = {expr.id_entitelrm: expr for expr in expressions}
+    rule = (blocking or DEFAULT_BLOCKING).rule("expression")
+    updated: Dict[str, Entity] = {}
     expr_cluster_results: Dict[str, ExpressionClusterResult] = {}
 
     assigned_candidates: Set[str] = set()
@@ -252,30 +341,30 @@ def cluster_expressions_by_051_and_041(
         anchor_ark = cluster.anchor_ark
         if not anchor_ark:
             continue
-        anchor_expressions = expressions_by_work_ark.get(anchor_ark, [])
+        anchor_expressions = store.expressions_for_work(anchor_ark)
         if not anchor_expressions:
             continue
 
         for clustered_ark in cluster.clustered_arks:
             if not clustered_ark:
                 continue
-            candidate_expressions = expressions_by_work_ark.get(clustered_ark, [])
+            candidate_expressions = store.expressions_for_work(clustered_ark)
             if not candidate_expressions:
                 continue
 
             for anchor_expr in anchor_expressions:
-                anchor_signature = _expression_signature(anchor_expr)
+                anchor_signature = _expression_signature(anchor_expr, rule)
                 if not anchor_signature:
                     continue
 
-                anchor_entity = updated[anchor_expr.id_entitelrm]
+                anchor_entity = updated.get(anchor_expr.id_entitelrm, anchor_expr)
                 existing_targets = _existing_cluster_targets(anchor_entity.intermarc)
 
                 for candidate_expr in candidate_expressions:
                     if candidate_expr.id_entitelrm == anchor_expr.id_entitelrm:
                         continue
 
-                    candidate_signature = _expression_signature(candidate_expr)
+                    candidate_signature = _expression_signature(candidate_expr, rule)
                     if not candidate_signature:
                         continue
 
@@ -296,6 +385,7 @@ def cluster_expressions_by_051_and_041(
                         ],
                     )
                     new_intermarc.add_zone(new_zone)
+                    metrics.incr("zones_90f_emitted")
 
                     anchor_entity = anchor_entity.clone_with_new_intermarc(new_intermarc)
                     updated[anchor_entity.id_entitelrm] = anchor_entity
@@ -315,5 +405,4 @@ def cluster_expressions_by_051_and_041(
                     result.clustered_expression_arks.append(candidate_ark)
                     assigned_candidates.add(candidate_expr.id_entitelrm)
 
-    ordered = [updated[expr.id_entitelrm] for expr in expressions]
-    return ordered, list(expr_cluster_results.values())
+    return updated, list(expr_cluster_results.values())
@@ -1,81 +1,133 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, asdict
-from typing import List, Tuple, Dict
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
 import csv
 import sys
 
 csv.field_size_limit(sys.maxsize) # Huge fields in csv caused error ```_csv.Error: field larger than field limit (131072)```
 
 from ..models import Entity
+from scripts.utils import metrics
+from scripts.utils.compressed_io import open_text
+from scripts.utils.profiling import profiled, stage
+from scripts.curation.blocking import DEFAULT_BLOCKING, DEFAULT_TOP_BLOCKS, BlockingScheme, block_size_report, write_block_report
+from scripts.curation.checkpoint import ClusteringCheckpoint
+from scripts.curation.db_source import HEADERS, connect, is_db_url, load_seed_ids, stream_db_rows
+from scripts.curation.entity_store import EntityStore, InMemoryEntityStore, SQLiteEntityStore, StoredRow, entity_kind
+from scripts.curation.manifest import cluster_incrementally
+from scripts.curation.registry import LoadPlan
+from scripts.curation.title_blocking import TitleBlocker
 from scripts.curation.operations import (
     cluster_works_by_title_responsibilities,
     cluster_expressions_by_051_and_041,
+    cluster_work_groups,
+    propagate_expression_clusters,
     ClusterResult,
     ExpressionClusterResult,
 )
 
 
+LOGGER = logging.getLogger(__name__)
+
+
 @dataclass
 class DataSet:
     headers: List[str]
     rows: List[List[str]]
 
 
-def read_csv_entities(path: str) -> Tuple[List[Entity], DataSet]:
+def _column_index(headers: List[str], name: str) -> int:
+    # Map header names to indices, tolerate slight variations
+    header_map = {h.strip(): i for i, h in enumerate(headers)}
+    # Names might be quoted in the file already parsed; try both exact and without quotes
+    if name in header_map:
+        return header_map[name]
+    if name.strip('"') in header_map:
+        return header_map[name.strip('"')]
+    # fallback: case-insensitive match
+    for k, v in header_map.items():
+        if k.strip('"').lower() == name.strip('"').lower():
+            return v
+    raise KeyError(f"Missing column: {name}")
+
+
+def _parse_entity(entity_id: str, type_entite: str, raw: str, plan: LoadPlan | None) -> Entity | None:
+    if plan is None:
+        return Entity(id_entitelrm=entity_id, type_entite=type_entite, intermarc_raw=raw)
+    kind = entity_kind(type_entite)
+    if not plan.wants(kind):
+        metrics.incr("records_left_raw")
+        return None
+    return Entity(id_entitelrm=entity_id, type_entite=type_entite, intermarc_raw=raw, zones=plan.zones_for(kind))
+
+
+def read_csv_entities(path: str, plan: LoadPlan | None = None) -> Tuple[List[Entity], DataSet]:
+    """
+    Parse every row, or with a `plan` only the kinds and zones it lists; rows
+    left out stay in the `DataSet` as they were read.
+    """
     entities: List[Entity] = []
-    with open(path, "r", encoding="utf-8", newline="") as f:
+    with stage("csv_load"), open_text(path, "r", encoding="utf-8", newline="") as f:
         reader = csv.reader(f, delimiter=";", quotechar='"')
         rows = list(reader)
     if not rows:
         return [], DataSet(headers=[], rows=[])
     headers = rows[0]
-    # Map header names to indices, tolerate slight variations
-    header_map = {h.strip(): i for i, h in enumerate(headers)}
-    def idx(name: str) -> int:
-        # Names might be quoted in the file already parsed; try both exact and without quotes
-        if name in header_map:
-            return header_map[name]
-        if name.strip('"') in header_map:
-            return header_map[name.strip('"')]
-        # fallback: case-insensitive match
-        for k, v in header_map.items():
-            if k.strip('"').lower() == name.strip('"').lower():
-                return v
-        raise KeyError(f"Missing column: {name}")
-
-    id_idx = idx("id_entitelrm")
-    typ_idx = idx("type_entite")
-    int_idx = idx("intermarc")
-
-    for row in rows[1:]:
-        if len(row) <= max(id_idx, typ_idx, int_idx):
-            continue
-        e = Entity(id_entitelrm=row[id_idx], type_entite=row[typ_idx], intermarc_raw=row[int_idx])
-        entities.append(e)
+    id_idx = _column_index(headers, "id_entitelrm")
+    typ_idx = _column_index(headers, "type_entite")
+    int_idx = _column_index(headers, "intermarc")
+
+    with stage("intermarc_parse"):
+        for row in rows[1:]:
+            if len(row) <= max(id_idx, typ_idx, int_idx):
+                continue
+            e = _parse_entity(row[id_idx], row[typ_idx], row[int_idx], plan)
+            if e is not None:
+                entities.append(e)
 
     return entities, DataSet(headers=headers, rows=rows)
 
 
+def read_db_entities(url: str, seed_ids: List[int], plan: LoadPlan | None = None) -> Tuple[List[Entity], DataSet]:
+    """Run the NOEMI hop queries directly and build entities without a CSV round trip."""
+    # Rows come back in id order from the SQL itself, so the cursor is consumed as it streams.
+    with stage("db_load"):
+        conn = connect(url)
+        try:
+            rows = [list(HEADERS)] + [list(r) for r in stream_db_rows(conn, seed_ids, ordered=True)]
+        finally:
+            conn.close()
+    with stage("intermarc_parse"):
+        entities = [e for r in rows[1:] if (e := _parse_entity(r[0], r[1], r[2], plan)) is not None]
+    return entities, DataSet(headers=list(HEADERS), rows=rows)
+
+
+def load_entities(
+    source: str,
+    seed_ids_path: str | None = None,
+    plan: LoadPlan | None = None,
+) -> Tuple[List[Entity], DataSet]:
+    """Read entities from a CSV path or, given seed work ids, from a `sqlite:///` / `postgresql://` URL."""
+    if is_db_url(source):
+        if not seed_ids_path:
+            raise ValueError("Reading from a database requires seed work ids (--seed-ids)")
+        return read_db_entities(source, load_seed_ids(seed_ids_path), plan)
+    return read_csv_entities(source, plan)
+
+
+@profiled("csv_write")
 def write_csv_entities(path: str, dataset: DataSet, entities: List[Entity]) -> None:
     # Rebuild rows: replace any row whose id matches entities list with updated intermarc string
     id_to_entity = {e.id_entitelrm: e for e in entities}
     headers = dataset.headers
-    header_map = {h.strip(): i for i, h in enumerate(headers)}
-    def idx(name: str) -> int:
-        if name in header_map:
-            return header_map[name]
-        if name.strip('"') in header_map:
-            return header_map[name.strip('"')]
-        for k, v in header_map.items():
-            if k.strip('"').lower() == name.strip('"').lower():
-                return v
-        raise KeyError(f"Missing column: {name}")
-
-    id_idx = idx("id_entitelrm")
-    int_idx = idx("intermarc")
+    id_idx = _column_index(headers, "id_entitelrm")
+    int_idx = _column_index(headers, "intermarc")
 
     rows_out = []
+    rewritten = 0
     rows_out.append(headers)
     for row in dataset.rows[1:]:
         if not row:
@@ -85,27 +137,182 @@ def write_csv_entities(path: str, dataset: DataSet, entities: List[Entity]) -> N
             new_row = list(row)
             new_row[int_idx] = id_to_entity[rid].intermarc.to_json_string()
             rows_out.append(new_row)
+            rewritten += 1
         else:
             rows_out.append(row)
 
-    with open(path, "w", encoding="utf-8", newline="") as f:
+    with open_text(path, "w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f, delimiter=";", quotechar='"', lineterminator='\n')
         writer.writerows(rows_out)
+    metrics.incr("rows_rewritten", rewritten)
+
+
+def _iter_csv_rows(path: str) -> Tuple[List[str], int, Iterator[StoredRow]]:
+    f = open_text(path, "r", encoding="utf-8", newline="")
+    reader = csv.reader(f, delimiter=";", quotechar='"')
+    headers = next(reader, [])
+    if not headers:
+        f.close()
+        return [], -1, iter(())
+    id_idx = _column_index(headers, "id_entitelrm")
+    typ_idx = _column_index(headers, "type_entite")
+    int_idx = _column_index(headers, "intermarc")
+
+    def rows() -> Iterator[StoredRow]:
+        with f:
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) <= max(id_idx, typ_idx, int_idx):
+                    yield row, None
+                    continue
+                yield row, Entity(id_entitelrm=row[id_idx], type_entite=row[typ_idx], intermarc_raw=row[int_idx])
+
+    return headers, int_idx, rows()
+
+
+def build_entity_store(
+    source: str,
+    db_path: str,
+    seed_ids_path: str | None = None,
+    blocking: BlockingScheme | None = None,
+) -> SQLiteEntityStore:
+    """
+    Stream a CSV export (or the NOEMI hop queries) into an on-disk entity store
+    without materializing the rows. Database rows keep the order they are fetched in.
+    """
+    store = SQLiteEntityStore(db_path)
+    if is_db_url(source):
+        if not seed_ids_path:
+            raise ValueError("Reading from a database requires seed work ids (--seed-ids)")
+        with stage("db_load"):
+            conn = connect(source)
+            try:
+                rows = (
+                    (list(r), Entity(id_entitelrm=r[0], type_entite=r[1], intermarc_raw=r[2]))
+                    for r in stream_db_rows(conn, load_seed_ids(seed_ids_path))
+                )
+                count = store.load(list(HEADERS), HEADERS.index("intermarc"), rows, blocking=blocking)
+            finally:
+                conn.close()
+    else:
+        with stage("csv_load"):
+            headers, int_idx, rows = _iter_csv_rows(source)
+            count = store.load(headers, int_idx, rows, blocking=blocking)
+    LOGGER.info("Entity store %s: %s entities", db_path, count)
+    return store
+
+
+@profiled("csv_write")
+def write_csv_from_store(path: str, store: SQLiteEntityStore) -> None:
+    with open_text(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";", quotechar='"', lineterminator='\n')
+        writer.writerow(store.headers)
+        writer.writerows(store.iter_rows())
+    # Like the in-memory writer: entity rows were re-serialized on load, pass-through rows are not counted.
+    metrics.incr("rows_rewritten", len(store))
+
+
+def _cluster_works(
+    store: EntityStore,
+    manifest_path: str | None,
+    checkpoint_path: str | None = None,
+    resume: bool = False,
+    title_blocker: TitleBlocker | None = None,
+) -> Tuple[Dict[str, Entity], List[ClusterResult]]:
+    checkpoint = ClusteringCheckpoint(checkpoint_path, resume=resume) if checkpoint_path else None
+    try:
+        if manifest_path:
+            anchors, clusters = cluster_incrementally(
+                store, manifest_path, checkpoint=checkpoint, title_blocker=title_blocker
+            )
+        else:
+            anchors, clusters = cluster_work_groups(store, checkpoint=checkpoint, title_blocker=title_blocker)
+    finally:
+        # Also on error or Ctrl-C: whatever groups finished are kept for --resume.
+        if checkpoint is not None:
+            checkpoint.close()
+    return anchors, clusters
 
 
-def run_cluster_operation(input_csv: str, output_csv: str, clusters_json: str | None = None) -> List[ClusterResult]:
-    entities, dataset = read_csv_entities(input_csv)
-    # Only works are considered for this operation
-    works = [e for e in entities if e.type_entite.strip().lower() in {"œuvre", "oeuvre", "oeuvre"}]
-    updated_works, clusters = cluster_works_by_title_responsibilities(works, entities)
+def _discard_checkpoint(checkpoint_path: str | None) -> None:
+    # The output is written; a later --resume must not pick up this run.
+    if checkpoint_path:
+        Path(checkpoint_path).unlink(missing_ok=True)
 
-    # Merge updated works back into full entity list
-    id_to_updated = {e.id_entitelrm: e for e in updated_works}
-    merged_entities: List[Entity] = []
-    for e in entities:
-        merged_entities.append(id_to_updated.get(e.id_entitelrm, e))
 
-    write_csv_entities(output_csv, dataset, merged_entities)
+def run_in_entity_store(
+    input_source: str,
+    output_csv: str,
+    store_path: str,
+    seed_ids_path: str | None = None,
+    with_expressions: bool = False,
+    manifest_path: str | None = None,
+    checkpoint_path: str | None = None,
+    resume: bool = False,
+    title_blocker: TitleBlocker | None = None,
+    blocking: BlockingScheme | None = None,
+) -> Tuple[List[ClusterResult], List[ExpressionClusterResult]]:
+    """Out-of-core variant of the clustering runners: same rule, same output, one group in memory at a time."""
+    store = build_entity_store(input_source, store_path, seed_ids_path, blocking)
+    try:
+        anchors, work_clusters = _cluster_works(store, manifest_path, checkpoint_path, resume, title_blocker)
+        store.update_entities(anchors.values())
+        expression_clusters: List[ExpressionClusterResult] = []
+        if with_expressions and work_clusters:
+            updated, expression_clusters = propagate_expression_clusters(store, work_clusters, blocking)
+            store.update_entities(updated.values())
+        write_csv_from_store(output_csv, store)
+        _discard_checkpoint(checkpoint_path)
+    finally:
+        store.close()
+    return work_clusters, expression_clusters
+
+
+def run_cluster_operation(
+    input_csv: str,
+    output_csv: str,
+    clusters_json: str | None = None,
+    seed_ids_path: str | None = None,
+    entity_store: str | None = None,
+    manifest: str | None = None,
+    checkpoint: str | None = None,
+    resume: bool = False,
+    title_blocker: TitleBlocker | None = None,
+    blocking: BlockingScheme | None = None,
+) -> List[ClusterResult]:
+    if entity_store:
+        clusters, _ = run_in_entity_store(
+            input_csv,
+            output_csv,
+            entity_store,
+            seed_ids_path,
+            manifest_path=manifest,
+            checkpoint_path=checkpoint,
+            resume=resume,
+            title_blocker=title_blocker,
+            blocking=blocking,
+        )
+    else:
+        entities, dataset = load_entities(input_csv, seed_ids_path)
+        # Only works are considered for this operation
+        works = [e for e in entities if e.type_entite.strip().lower() in {"œuvre", "oeuvre", "oeuvre"}]
+        if manifest or checkpoint:
+            anchors, clusters = _cluster_works(
+                InMemoryEntityStore(entities, works=works, blocking=blocking), manifest, checkpoint, resume, title_blocker
+            )
+            updated_works = [anchors.get(w.id_entitelrm, w) for w in works]
+        else:
+            updated_works, clusters = cluster_works_by_title_responsibilities(works, entities, title_blocker, blocking)
+
+        # Merge updated works back into full entity list
+        id_to_updated = {e.id_entitelrm: e for e in updated_works}
+        merged_entities: List[Entity] = []
+        for e in entities:
+            merged_entities.append(id_to_updated.get(e.id_entitelrm, e))
+
+        write_csv_entities(output_csv, dataset, merged_entities)
+        _discard_checkpoint(checkpoint)
 
     if clusters_json:
         import json
@@ -120,24 +327,52 @@ def run_cluster_with_expression_operation(
     output_csv: str,
     works_json: str | None = None,
     expressions_json: str | None = None,
+    seed_ids_path: str | None = None,
+    entity_store: str | None = None,
+    manifest: str | None = None,
+    checkpoint: str | None = None,
+    resume: bool = False,
+    title_blocker: TitleBlocker | None = None,
+    blocking: BlockingScheme | None = None,
 ) -> Tuple[List[ClusterResult], List[ExpressionClusterResult]]:
-    entities, dataset = read_csv_entities(input_csv)
-
-    works = [e for e in entities if e.type_entite.strip().lower() in {"œuvre", "oeuvre", "oeuvre"}]
-    expressions = [e for e in entities if e.type_entite.strip().lower() == "expression"]
-
-    updated_works, work_clusters = cluster_works_by_title_responsibilities(works, entities)
-    updated_expressions, expression_clusters = cluster_expressions_by_051_and_041(expressions, work_clusters)
+    if entity_store:
+        work_clusters, expression_clusters = run_in_entity_store(
+            input_csv,
+            output_csv,
+            entity_store,
+            seed_ids_path,
+            with_expressions=True,
+            manifest_path=manifest,
+            checkpoint_path=checkpoint,
+            resume=resume,
+            title_blocker=title_blocker,
+            blocking=blocking,
+        )
+    else:
+        entities, dataset = load_entities(input_csv, seed_ids_path)
+
+        works = [e for e in entities if e.type_entite.strip().lower() in {"œuvre", "oeuvre", "oeuvre"}]
+        expressions = [e for e in entities if e.type_entite.strip().lower() == "expression"]
+
+        if manifest or checkpoint:
+            anchors, work_clusters = _cluster_works(
+                InMemoryEntityStore(entities, works=works, blocking=blocking), manifest, checkpoint, resume, title_blocker
+            )
+            updated_works = [anchors.get(w.id_entitelrm, w) for w in works]
+        else:
+            updated_works, work_clusters = cluster_works_by_title_responsibilities(works, entities, title_blocker, blocking)
+        updated_expressions, expression_clusters = cluster_expressions_by_051_and_041(expressions, work_clusters, blocking)
 
-    id_to_updated: Dict[str, Entity] = {}
-    id_to_updated.update({e.id_entitelrm: e for e in updated_works})
-    id_to_updated.update({e.id_entitelrm: e for e in updated_expressions})
+        id_to_updated: Dict[str, Entity] = {}
+        id_to_updated.update({e.id_entitelrm: e for e in updated_works})
+        id_to_updated.update({e.id_entitelrm: e for e in updated_expressions})
 
-    merged_entities: List[Entity] = []
-    for e in entities:
-        merged_entities.append(id_to_updated.get(e.id_entitelrm, e))
+        merged_entities: List[Entity] = []
+        for e in entities:
+            merged_entities.append(id_to_updated.get(e.id_entitelrm, e))
 
-    write_csv_entities(output_csv, dataset, merged_entities)
+        write_csv_entities(output_csv, dataset, merged_entities)
+        _discard_checkpoint(checkpoint)
 
     if works_json or expressions_json:
         import json
@@ -151,3 +386,18 @@ def run_cluster_with_expression_operation(
             json.dump([asdict(c) for c in expression_clusters], jf, ensure_ascii=False, indent=2)
 
     return work_clusters, expression_clusters
+
+
+def run_blocking_report(
+    input_source: str,
+    output_json: str,
+    seed_ids_path: str | None = None,
+    blocking: BlockingScheme | None = None,
+    top: int = DEFAULT_TOP_BLOCKS,
+) -> Dict[str, Any]:
+    """Block-size distributions of `blocking` over the input, parsing only the zones its keys read."""
+    blocking = blocking or DEFAULT_BLOCKING
+    entities, _ = load_entities(input_source, seed_ids_path, blocking.load_plan())
+    report = block_size_report(entities, blocking, top)
+    write_block_report(output_json, report)
+    return report
@@ -0,0 +1,124 @@
+"""Curation operations and the data each one reads.
+
+An operation declares, per entity kind (as returned by `entity_kind`: "work",
+"expression", "personne", ...), the Intermarc zones it reads, and the kinds
+whose records it rewrites. The loader turns the declarations of a run into a
+`LoadPlan`: rewritten kinds are parsed whole, kinds that are only read keep
+just the declared zones, and every other record stays raw CSV text that is
+written back untouched.
+
+New operations register themselves with `register_operation` and become
+available to `cli.py run --operations` with their own arguments::
+
+    @register_operation(
+        "list-titles",
+        help="Dump work titles",
+        reads={"work": {"001", "150"}},
+        required=("titles_json",),
+        add_arguments=lambda p: p.add_argument("--titles-json"),
+    )
+    def list_titles(context, options):
+        ...
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from scripts.curation.single_pass import CurationContext
+
+
+OperationRunner = Callable[["CurationContext", Mapping[str, Any]], Any]
+
+
+@dataclass(frozen=True)
+class Operation:
+    name: str
+    help: str
+    run: OperationRunner
+    reads: Mapping[str, FrozenSet[str]] = field(default_factory=dict)
+    rewrites: FrozenSet[str] = frozenset()
+    required: Tuple[str, ...] = ()
+    add_arguments: Callable[[argparse.ArgumentParser], None] | None = None
+
+
+@dataclass(frozen=True)
+class LoadPlan:
+    """Entity kind -> zones to keep (None: the whole record); kinds absent are not parsed."""
+
+    zones: Mapping[str, FrozenSet[str] | None]
+
+    def wants(self, kind: str) -> bool:
+        return kind in self.zones
+
+    def zones_for(self, kind: str) -> FrozenSet[str] | None:
+        return self.zones.get(kind)
+
+
+_REGISTRY: Dict[str, Operation] = {}
+
+
+def register_operation(
+    name: str,
+    *,
+    help: str,
+    reads: Mapping[str, Iterable[str]] | None = None,
+    rewrites: Iterable[str] = (),
+    required: Iterable[str] = (),
+    add_arguments: Callable[[argparse.ArgumentParser], None] | None = None,
+) -> Callable[[OperationRunner], OperationRunner]:
+    """Decorator registering `run(context, options)` under `name`."""
+
+    def decorator(run: OperationRunner) -> OperationRunner:
+        if name in _REGISTRY:
+            raise ValueError(f"Operation {name!r} is already registered")
+        _REGISTRY[name] = Operation(
+            name=name,
+            help=help,
+            run=run,
+            reads={kind: frozenset(zones) for kind, zones in (reads or {}).items()},
+            rewrites=frozenset(rewrites),
+            required=tuple(required),
+            add_arguments=add_arguments,
+        )
+        return run
+
+    return decorator
+
+
+def get_operation(name: str) -> Operation:
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown operation {name!r}; expected one of {', '.join(_REGISTRY)}") from None
+
+
+def registered_operations() -> List[Operation]:
+    return list(_REGISTRY.values())
+
+
+def load_plan(operations: Sequence[Operation]) -> LoadPlan:
+    zones: Dict[str, FrozenSet[str] | None] = {}
+    for operation in operations:
+        for kind in operation.rewrites:
+            zones[kind] = None
+    for operation in operations:
+        for kind, read in operation.reads.items():
+            current = zones.get(kind, frozenset())
+            if current is not None:
+                zones[kind] = current | read
+    return LoadPlan(zones)
+
+
+def _flag(option: str) -> str:
+    return "--" + option.replace("_", "-")
+
+
+def check_options(operations: Iterable[Operation], options: Mapping[str, Any]) -> None:
+    for operation in operations:
+        missing = [_flag(option) for option in operation.required if not options.get(option)]
+        if missing:
+            raise ValueError(f"{operation.name} needs {', '.join(missing)}")
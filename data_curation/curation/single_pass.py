@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from dataclasses import asdict
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from scripts.authority.nes_service import NameExpansionService
+from scripts.curation.blocking import BlockingScheme
+from scripts.curation.entity_store import InMemoryEntityStore, entity_kind
+from scripts.curation.operations import (
+    ClusterResult,
+    ExpressionClusterResult,
+    cluster_work_groups,
+    propagate_expression_clusters,
+)
+from scripts.curation.pipeline import DataSet, load_entities, write_csv_entities
+from scripts.curation.registry import LoadPlan, check_options, get_operation, load_plan, register_operation
+from scripts.curation.title_blocking import TitleBlocker
+from scripts.models import Entity
+from scripts.pipeline_title_contamination import DetectionRecord, detect_title_contamination, write_detections
+from scripts.utils.title_cleaner import RESPONSIBILITY_ZONES
+
+
+LOGGER = logging.getLogger(__name__)
+
+# What the built-in operations read: 001 is the ARK of every kind, agents
+# only contribute their 100/400 name forms to NES.
+WORK_ZONES = frozenset({"001", "015", "150", *RESPONSIBILITY_ZONES})
+EXPRESSION_ZONES = frozenset({"001", "041", "051", "140", "750", "90F"})
+# NOEMI person records, with or without the accent.
+AGENT_TYPES = ("Identité publique de personne", "Identite publique de personne")
+AGENT_READS = {entity_kind(type_entite): frozenset({"001", "100", "400"}) for type_entite in AGENT_TYPES}
+
+
+class CurationContext:
+    """
+    What operations of one pass share: the loaded entities, one in-memory
+    store (and its ARK index), one NES service, the cleaned and normalized
+    titles, and the work clusters once computed.
+    """
+
+    def __init__(
+        self,
+        entities: List[Entity],
+        dataset: DataSet,
+        title_blocker: TitleBlocker | None = None,
+        blocking: BlockingScheme | None = None,
+    ):
+        self.entities = entities
+        self.dataset = dataset
+        self.works = [e for e in entities if entity_kind(e.type_entite) == "work"]
+        self.expressions = [e for e in entities if entity_kind(e.type_entite) == "expression"]
+        self.store = InMemoryEntityStore(entities, works=self.works, expressions=self.expressions, blocking=blocking)
+        self.nes = NameExpansionService(local_entities_by_ark=self.store.entities_by_ark())
+        self.cleaned_titles: Dict[str, str] = {}
+        self.title_keys: Dict[str, str] = {}
+        self.title_blocker = title_blocker
+        self.blocking = blocking
+        self._work_clusters: Tuple[Dict[str, Entity], List[ClusterResult]] | None = None
+        self._expression_clusters: Tuple[Dict[str, Entity], List[ExpressionClusterResult]] | None = None
+
+    @classmethod
+    def load(
+        cls,
+        source: str,
+        seed_ids_path: str | None = None,
+        plan: LoadPlan | None = None,
+        title_blocker: TitleBlocker | None = None,
+        blocking: BlockingScheme | None = None,
+    ) -> "CurationContext":
+        entities, dataset = load_entities(source, seed_ids_path, plan)
+        return cls(entities, dataset, title_blocker, blocking)
+
+    def work_clusters(self) -> Tuple[Dict[str, Entity], List[ClusterResult]]:
+        if self._work_clusters is None:
+            self._work_clusters = cluster_work_groups(
+                self.store,
+                title_keys=self.title_keys,
+                nes=self.nes,
+                cleaned_titles=self.cleaned_titles,
+                title_blocker=self.title_blocker,
+            )
+        return self._work_clusters
+
+    def expression_clusters(self) -> Tuple[Dict[str, Entity], List[ExpressionClusterResult]]:
+        if self._expression_clusters is None:
+            _, work_clusters = self.work_clusters()
+            if work_clusters and self.expressions:
+                self._expression_clusters = propagate_expression_clusters(self.store, work_clusters, self.blocking)
+            else:
+                self._expression_clusters = ({}, [])
+        return self._expression_clusters
+
+    def detections(self, tau_hi: float = 0.85, tau_lo: float = 0.65) -> List[DetectionRecord]:
+        return detect_title_contamination(
+            self.works,
+            self.nes,
+            tau_hi=tau_hi,
+            tau_lo=tau_lo,
+            cleaned_titles=self.cleaned_titles,
+        )
+
+    def write_curated(self, path: str, *updated: Dict[str, Entity]) -> None:
+        """
+        Write the input rows back, re-serializing only the `updated` records (by
+        id); the other rows are copied as read, not re-serialized like the
+        standalone commands do.
+        """
+        replacements: Dict[str, Entity] = {}
+        for batch in updated:
+            replacements.update(batch)
+        write_csv_entities(path, self.dataset, list(replacements.values()))
+
+    def close(self) -> None:
+        self.nes.close()
+
+
+def _dump_json(path: str, records: Sequence[Any]) -> None:
+    with open(path, "w", encoding="utf-8") as jf:
+        json.dump([asdict(r) for r in records], jf, ensure_ascii=False, indent=2)
+
+
+def _cluster_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--cluster-output", help="Curated CSV of the cluster operation")
+    parser.add_argument("--clusters-json", help="Optional clusters summary JSON of the cluster operation")
+
+
+@register_operation(
+    "cluster",
+    help="Cluster works sharing (015$c, 700$3) and a cleaned title",
+    reads={"work": WORK_ZONES, **AGENT_READS},
+    rewrites={"work"},
+    required=("cluster_output",),
+    add_arguments=_cluster_arguments,
+)
+def run_cluster(context: CurationContext, options: Mapping[str, Any]) -> List[ClusterResult]:
+    anchors, clusters = context.work_clusters()
+    context.write_curated(options["cluster_output"], anchors)
+    if options.get("clusters_json"):
+        _dump_json(options["clusters_json"], clusters)
+    return clusters
+
+
+def _expression_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--expressions-output", help="Curated CSV of the cluster-with-expressions operation")
+    parser.add_argument("--work-clusters-json", help="Optional works clusters summary JSON")
+    parser.add_argument("--expression-clusters-json", help="Optional expressions clusters summary JSON")
+
+
+@register_operation(
+    "cluster-with-expressions",
+    help="Cluster works, then propagate to their expressions by (051$a, 041$a)",
+    reads={"work": WORK_ZONES, "expression": EXPRESSION_ZONES, **AGENT_READS},
+    rewrites={"work", "expression"},
+    required=("expressions_output",),
+    add_arguments=_expression_arguments,
+)
+def run_cluster_with_expressions(
+    context: CurationContext,
+    options: Mapping[str, Any],
+) -> List[ExpressionClusterResult]:
+    anchors, work_clusters = context.work_clusters()
+    updated_expressions, expression_clusters = context.expression_clusters()
+    context.write_curated(options["expressions_output"], anchors, updated_expressions)
+    if options.get("work_clusters_json"):
+        _dump_json(options["work_clusters_json"], work_clusters)
+    if options.get("expression_clusters_json"):
+        _dump_json(options["expression_clusters_json"], expression_clusters)
+    return expression_clusters
+
+
+def _detection_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--out-json", help="Detections JSON of the detect-contamination operation")
+    parser.add_argument("--tau-hi", type=float, default=0.85, help="High-confidence threshold")
+    parser.add_argument("--tau-lo", type=float, default=0.65, help="Medium-confidence threshold")
+
+
+@register_operation(
+    "detect-contamination",
+    help="Detect titles contaminated with author names",
+    reads={"work": {"001", "150", *RESPONSIBILITY_ZONES}, **AGENT_READS},
+    required=("out_json",),
+    add_arguments=_detection_arguments,
+)
+def run_detection(context: CurationContext, options: Mapping[str, Any]) -> List[DetectionRecord]:
+    detections = context.detections(options.get("tau_hi", 0.85), options.get("tau_lo", 0.65))
+    write_detections(options["out_json"], detections)
+    return detections
+
+
+def run_operations(
+    input_source: str,
+    operations: Sequence[str],
+    options: Mapping[str, Any],
+    seed_ids_path: str | None = None,
+    title_blocker: TitleBlocker | None = None,
+    blocking: BlockingScheme | None = None,
+) -> Dict[str, Any]:
+    """
+    Load the input once, parsing only what the requested operations declare
+    they read, and run each of them on it; returns every operation's result
+    by name. Work clustering runs once even when both clustering operations
+    are requested, and titles cleaned for detection are not cleaned again for
+    clustering (or the reverse).
+    """
+    requested = [get_operation(name) for name in operations]
+    check_options(requested, options)
+    plan = load_plan(requested)
+    LOGGER.debug("Load plan: %s", {kind: sorted(zones) if zones else "all" for kind, zones in plan.zones.items()})
+    context = CurationContext.load(input_source, seed_ids_path, plan, title_blocker, blocking)
+    results: Dict[str, Any] = {}
+    try:
+        for operation in requested:
+            results[operation.name] = operation.run(context, options)
+    finally:
+        context.close()
+    return results
@@ -0,0 +1,218 @@
+"""How works of one (015$c, 700$3) group are split by normalized title.
+
+A title blocker receives the group's works with their normalized titles, in
+group order, and returns the blocks of works to cluster together (two or more
+each). Blocks come out in order of their first member and members keep group
+order, so anchor choice and output order stay deterministic whatever the mode.
+"""
+
+from __future__ import annotations
+
+import random
+import zlib
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Protocol, Sequence, Tuple
+
+from scripts.curation.blocking import UnionFind
+from scripts.models import Entity
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - installed with spaCy
+    np = None  # type: ignore[assignment]
+
+
+KeyedWork = Tuple[Entity, str]
+
+DEFAULT_MIN_PREFIX_TOKENS = 2
+DEFAULT_JACCARD_THRESHOLD = 0.8
+DEFAULT_MINHASH_PERMUTATIONS = 128
+SHINGLE_SIZE = 3
+# Fixed so signatures, hence clusters, are identical from one run to the next.
+_MINHASH_SEED = 20240601
+_PRIME = (1 << 31) - 1
+
+
+class TitleBlocker(Protocol):
+    description: str
+
+    def __call__(self, keyed: Sequence[KeyedWork]) -> List[List[Entity]]:
+        ...
+
+
+class ExactTitleBlocker:
+    """Works whose normalized titles are equal."""
+
+    description = "exact"
+
+    def __call__(self, keyed: Sequence[KeyedWork]) -> List[List[Entity]]:
+        by_title: Dict[str, List[Entity]] = {}
+        for work, key in keyed:
+            if key:
+                by_title.setdefault(key, []).append(work)
+        return [members for members in by_title.values() if len(members) >= 2]
+
+
+def _blocks_from_components(keyed: Sequence[KeyedWork], component_of: Dict[str, int]) -> List[List[Entity]]:
+    blocks: Dict[int, List[Entity]] = {}
+    for work, key in keyed:
+        if key in component_of:
+            blocks.setdefault(component_of[key], []).append(work)
+    return [members for members in blocks.values() if len(members) >= 2]
+
+
+class PrefixTitleBlocker:
+    """
+    Works whose normalized titles are equal, or where one title is a prefix of
+    the other on a token boundary ("les malheurs de sophie" and "les malheurs
+    de sophie suivi de ..."), the shorter title having at least
+    `min_prefix_tokens` tokens. Blocks are the connected components of that
+    relation, so two sequels of one base title end up together.
+
+    Titles are sorted as token tuples: every extension of a title follows it
+    directly, so a stack of open prefixes yields each title's longest proper
+    prefix in one pass (O(n log n) in the group size, no pairwise comparison).
+    """
+
+    def __init__(self, min_prefix_tokens: int = DEFAULT_MIN_PREFIX_TOKENS):
+        if min_prefix_tokens < 1:
+            raise ValueError("min_prefix_tokens must be at least 1")
+        self.min_prefix_tokens = min_prefix_tokens
+        self.description = f"prefix:{min_prefix_tokens}"
+
+    def __call__(self, keyed: Sequence[KeyedWork]) -> List[List[Entity]]:
+        titles = sorted({tuple(key.split(" ")) for _, key in keyed if key})
+        components = UnionFind(len(titles))
+        open_prefixes: List[int] = []
+        for index, tokens in enumerate(titles):
+            while open_prefixes and titles[open_prefixes[-1]] != tokens[: len(titles[open_prefixes[-1]])]:
+                open_prefixes.pop()
+            if open_prefixes and len(titles[open_prefixes[-1]]) >= self.min_prefix_tokens:
+                components.union(open_prefixes[-1], index)
+            open_prefixes.append(index)
+        component_of = {" ".join(tokens): components.find(i) for i, tokens in enumerate(titles)}
+        return _blocks_from_components(keyed, component_of)
+
+
+def title_shingles(title: str, size: int = SHINGLE_SIZE) -> FrozenSet[str]:
+    """
+    Character `size`-grams of each token, padded with spaces: a typo only
+    touches the shingles around it, and word order does not matter.
+    """
+    shingles = set()
+    for token in title.split():
+        padded = f" {token} "
+        if len(padded) <= size:
+            shingles.add(padded)
+        else:
+            shingles.update(padded[i : i + size] for i in range(len(padded) - size + 1))
+    return frozenset(shingles)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_bands(threshold: float, permutations: int) -> Tuple[int, int]:
+    """
+    (bands, rows) splitting `permutations`, whose LSH threshold (1/b)^(1/r) is
+    the highest not above `threshold`: candidates err on the side of recall and
+    the exact Jaccard check removes the extra pairs.
+
+    Raises ValueError when only single-row bands divide `permutations` (a
+    prime count, say) although bands of several rows would suit `threshold`:
+    one row per band makes nearly every pair a candidate.
+    """
+    best = (permutations, 1)
+    for rows in range(1, permutations + 1):
+        if permutations % rows:
+            continue
+        bands = permutations // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    # Two-row bands, the last one possibly short, would fit the threshold.
+    if best[1] == 1 and permutations > 1 and (1 / ((permutations + 1) // 2)) ** 0.5 <= threshold:
+        raise ValueError(
+            f"{permutations} permutations only split into single-row bands at threshold {threshold}; "
+            f"use a count with more divisors, e.g. {DEFAULT_MINHASH_PERMUTATIONS}"
+        )
+    return best
+
+
+class MinHashTitleBlocker:
+    """
+    Near-duplicate titles: works whose title shingle sets have a Jaccard
+    similarity of at least `threshold` (typos, word order, leftover
+    responsibility fragments), joined transitively.
+
+    Each distinct title gets a MinHash signature; titles sharing a band of it
+    are candidates, and only candidates are compared exactly, so a group of
+    thousands of works costs about linear time instead of all pairs.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_JACCARD_THRESHOLD,
+        permutations: int = DEFAULT_MINHASH_PERMUTATIONS,
+    ):
+        if np is None:
+            raise RuntimeError("numpy is required for --title-match minhash")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if permutations < 1:
+            raise ValueError("permutations must be positive")
+        self.threshold = threshold
+        self.permutations = permutations
+        self.bands, self.rows = lsh_bands(threshold, permutations)
+        rng = random.Random(_MINHASH_SEED)
+        self._a = np.array([rng.randrange(1, _PRIME) for _ in range(permutations)], dtype=np.uint64)
+        self._b = np.array([rng.randrange(0, _PRIME) for _ in range(permutations)], dtype=np.uint64)
+        self.description = f"minhash:{threshold}:{permutations}"
+
+    def signature(self, shingles: FrozenSet[str]) -> "np.ndarray":
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) % _PRIME for s in sorted(shingles)], dtype=np.uint64)
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def __call__(self, keyed: Sequence[KeyedWork]) -> List[List[Entity]]:
+        titles = sorted({key for _, key in keyed if key})
+        shingles = [title_shingles(title) for title in titles]
+        components = UnionFind(len(titles))
+
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        for index, title_shingle_set in enumerate(shingles):
+            if not title_shingle_set:
+                continue
+            signature = self.signature(title_shingle_set)
+            for band in range(self.bands):
+                chunk = signature[band * self.rows : (band + 1) * self.rows].tobytes()
+                buckets.setdefault((band, chunk), []).append(index)
+
+        for members in buckets.values():
+            for i, j in combinations(members, 2):
+                if components.find(i) == components.find(j):
+                    continue
+                if jaccard(shingles[i], shingles[j]) >= self.threshold:
+                    components.union(i, j)
+
+        component_of = {title: components.find(i) for i, title in enumerate(titles)}
+        return _blocks_from_components(keyed, component_of)
+
+
+TITLE_MATCH_MODES = ("exact", "prefix", "minhash")
+
+
+def make_title_blocker(
+    mode: str = "exact",
+    min_prefix_tokens: int = DEFAULT_MIN_PREFIX_TOKENS,
+    jaccard_threshold: float = DEFAULT_JACCARD_THRESHOLD,
+    permutations: int = DEFAULT_MINHASH_PERMUTATIONS,
+) -> TitleBlocker:
+    if mode == "exact":
+        return ExactTitleBlocker()
+    if mode == "prefix":
+        return PrefixTitleBlocker(min_prefix_tokens)
+    if mode == "minhash":
+        return MinHashTitleBlocker(jaccard_threshold, permutations)
+    raise ValueError(f"Unknown title match mode {mode!r}; expected one of {', '.join(TITLE_MATCH_MODES)}")
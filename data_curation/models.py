@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import AbstractSet, Any, Dict, FrozenSet, List, Optional, Tuple
 import json
 
 from scripts.utils.title_cleaner import normalize_title_for_clustering
@@ -41,9 +41,10 @@ class Intermarc:
     zones: List[Zone] = field(default_factory=list)
 
     @staticmethod
-    def from_json_string(s: str) -> "Intermarc":
+    def from_json_string(s: str, keep: AbstractSet[str] | None = None) -> "Intermarc":
+        """Parse a record; with `keep`, only zones whose code is in it are built."""
         data = json.loads(s)
-        zones = [Zone.from_dict(z) for z in data.get("zones", [])]
+        zones = [Zone.from_dict(z) for z in data.get("zones", []) if keep is None or z.get("code") in keep]
         return Intermarc(zones=zones)
 
     def to_json_string(self) -> str:
@@ -70,9 +71,11 @@ class Entity:
     type_entite: str
     intermarc_raw: str
     intermarc: Intermarc = field(init=False)
+    # Zones parsed into `intermarc` (None: all); a partial entity must not be written back.
+    zones: Optional[FrozenSet[str]] = field(default=None, repr=False, compare=False)
 
     def __post_init__(self) -> None:
-        self.intermarc = Intermarc.from_json_string(self.intermarc_raw)
+        self.intermarc = Intermarc.from_json_string(self.intermarc_raw, self.zones)
 
     def ark(self) -> Optional[str]:
         vals = self.intermarc.get_subfield_values("001", "a")
@@ -2,20 +2,15 @@
 from __future__ import annotations
 import logging
 from dataclasses import dataclass, asdict
-from typing import Dict, List
+from typing import Dict, List, MutableMapping, Sequence
 import json
 
 from scripts.models import Entity  # réutilise vos classes
-from scripts.curation.pipeline import read_csv_entities  # I/O CSV existant
+from scripts.curation.pipeline import load_entities  # I/O CSV / base existant
 from scripts.authority.nes_service import NameExpansionService
+from scripts.curation.operations import clean_work_title
 from scripts.matching.detector import detect_in_title, Hit
-from scripts.utils.title_cleaner import (
-    clean_title_text,
-    contains_illustration_trigger,
-    debug_match_targets,
-    extract_responsible_person_arks,
-    match_variants_in_title,
-)
+from scripts.utils.title_cleaner import extract_responsible_person_arks
 
 LOGGER = logging.getLogger(__name__)
 
@@ -32,8 +27,14 @@ class DetectionRecord:
     snippet: str
     confidence: str  # "high" / "medium"
 
-def run_title_contamination_detection(input_csv: str, out_json: str, tau_hi: float = 0.85, tau_lo: float = 0.65) -> List[DetectionRecord]:
-    entities, _dataset = read_csv_entities(input_csv)
+def run_title_contamination_detection(
+    input_csv: str,
+    out_json: str,
+    tau_hi: float = 0.85,
+    tau_lo: float = 0.65,
+    seed_ids_path: str | None = None,
+) -> List[DetectionRecord]:
+    entities, _dataset = load_entities(input_csv, seed_ids_path)
     works = [e for e in entities if e.type_entite.strip().lower() in {"œuvre", "oeuvre", "oeuvre"}]
 
     ark_index = {
@@ -43,6 +44,39 @@ def run_title_contamination_detection(input_csv: str, out_json: str, tau_hi: flo
     }
 
     nes = NameExpansionService(local_entities_by_ark=ark_index)
+    try:
+        results = detect_title_contamination(works, nes, tau_hi=tau_hi, tau_lo=tau_lo)
+    finally:
+        nes.close()
+
+    write_detections(out_json, results)
+    return results
+
+
+def write_detections(out_json: str, results: List[DetectionRecord]) -> None:
+    # Ecriture JSON
+    with open(out_json, "w", encoding="utf-8") as f:
+        json.dump([asdict(r) for r in results], f, ensure_ascii=False, indent=2)
+
+
+def detect_title_contamination(
+    works: Sequence[Entity],
+    nes: NameExpansionService,
+    tau_hi: float = 0.85,
+    tau_lo: float = 0.65,
+    cleaned_titles: MutableMapping[str, str] | None = None,
+) -> List[DetectionRecord]:
+    """
+    Detection over already loaded works with a caller-owned NES service.
+    `cleaned_titles` (work id -> cleaned title) is read and filled, so the
+    clustering of the same pass does not clean a title twice.
+    """
+    nes.prefetch(
+        ark
+        for e in works
+        if e.title_main()
+        for ark in extract_responsible_person_arks(e)
+    )
 
     results: List[DetectionRecord] = []
 
@@ -59,18 +93,14 @@ def run_title_contamination_detection(input_csv: str, out_json: str, tau_hi: flo
             if variants:
                 ark2variants[a] = variants
 
-        debug_match_targets(e.id_entitelrm, title, ark2variants)
-
         hi, mid = detect_in_title(title, ark2variants, tau_hi=tau_hi, tau_lo=tau_lo)
 
-        variant_strings = [v for variants in ark2variants.values() for v in variants]
-        person_spans = match_variants_in_title(title, variant_strings)
-        remove_illustrations = contains_illustration_trigger(title)
-        cleaned_title = clean_title_text(
-            title,
-            person_spans=person_spans,
-            remove_illustration_groups=remove_illustrations,
-        )
+        if cleaned_titles is not None and e.id_entitelrm in cleaned_titles:
+            cleaned_title = cleaned_titles[e.id_entitelrm]
+        else:
+            cleaned_title = clean_work_title(e, nes)
+            if cleaned_titles is not None:
+                cleaned_titles[e.id_entitelrm] = cleaned_title
 
         if cleaned_title != title:
             LOGGER.info(
@@ -97,8 +127,4 @@ def run_title_contamination_detection(input_csv: str, out_json: str, tau_hi: flo
         results.extend(to_rec(h, "high") for h in hi)
         results.extend(to_rec(h, "medium") for h in mid)
 
-    # Ecriture JSON
-    with open(out_json, "w", encoding="utf-8") as f:
-        json.dump([asdict(r) for r in results], f, ensure_ascii=False, indent=2)
-
     return results
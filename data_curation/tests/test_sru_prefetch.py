@@ -0,0 +1,112 @@
+"""SRU prefetch against a local stub of the catalogue.bnf.fr searchRetrieve API."""
+
+from __future__ import annotations
+
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import pytest
+
+from scripts.authority.nes_service import NameExpansionService
+from scripts.authority.nes_store import NESStore
+from scripts.authority.sru_client import get_person_variants
+from scripts.authority.sru_prefetch import prefetch_person_variants
+
+# Records per response page, below the batch size so pagination is exercised.
+PAGE_SIZE = 2
+KNOWN = {
+    "ark:/12148/cb1": ("Ségur", "Comtesse de Ségur"),
+    "ark:/12148/cb2": ("Verne", "J. Verne"),
+    "ark:/12148/cb3": ("Sand", "Aurore Dupin"),
+}
+RECORD = (
+    '<mxc:record xmlns:mxc="info:lc/xmlns/marcxchange-v2" id="{ark}">'
+    '<mxc:datafield tag="200"><mxc:subfield code="a">{accepted}</mxc:subfield></mxc:datafield>'
+    '<mxc:datafield tag="400"><mxc:subfield code="a">{rejected}</mxc:subfield></mxc:datafield>'
+    "</mxc:record>"
+)
+
+
+class _StubSRU(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests: List[str] = []
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        self.requests.append(url.path)
+        query = urllib.parse.parse_qs(url.query)
+        arks = [ark for ark in re.findall(r'"([^"]+)"', query["query"][0]) if ark in KNOWN]
+        start = int(query.get("startRecord", ["1"])[0])
+        page = arks[start - 1 : start - 1 + PAGE_SIZE]
+        records = "".join(
+            f"<srw:record><srw:recordData>{RECORD.format(ark=ark, accepted=KNOWN[ark][0], rejected=KNOWN[ark][1])}"
+            "</srw:recordData></srw:record>"
+            for ark in page
+        )
+        following = start + PAGE_SIZE
+        next_position = f"<srw:nextRecordPosition>{following}</srw:nextRecordPosition>" if following <= len(arks) else ""
+        body = (
+            '<srw:searchRetrieveResponse xmlns:srw="http://www.loc.gov/zing/srw/">'
+            f"<srw:numberOfRecords>{len(arks)}</srw:numberOfRecords><srw:records>{records}</srw:records>"
+            f"{next_position}</srw:searchRetrieveResponse>"
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def sru_url() -> Iterator[str]:
+    _StubSRU.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubSRU)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/api/SRU"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_prefetch_batches_and_follows_pages(sru_url: str) -> None:
+    report = prefetch_person_variants(
+        [*KNOWN, "ark:/12148/cb404"],
+        base_url=sru_url,
+        workers=2,
+        requests_per_second=None,
+        batch_size=4,
+    )
+
+    assert report.failed == {}
+    assert report.resolved == {**{ark: list(forms) for ark, forms in KNOWN.items()}, "ark:/12148/cb404": []}
+    # One batch of four ARKs, three of them known: two pages of PAGE_SIZE records.
+    assert report.requests == 2
+    assert _StubSRU.requests == ["/api/SRU", "/api/SRU"]
+
+
+def test_single_ark_fetch_uses_base_url(sru_url: str) -> None:
+    assert get_person_variants("ark:/12148/cb2", base_url=sru_url) == ["Verne", "J. Verne"]
+    assert _StubSRU.requests == ["/api/SRU"]
+
+
+def test_nes_prefetch_fills_the_store(sru_url: str, tmp_path) -> None:
+    store = NESStore(str(tmp_path / "nes.sqlite"))
+    nes = NameExpansionService(store=store, sru_base_url=sru_url)
+    try:
+        report = nes.prefetch(["ark:/12148/cb1", "ark:/12148/cb3"], requests_per_second=None)
+        assert sorted(report.resolved) == ["ark:/12148/cb1", "ark:/12148/cb3"]
+        requests = len(_StubSRU.requests)
+        assert "Comtesse de Ségur" in nes.ensure_variants("ark:/12148/cb1")
+        assert len(_StubSRU.requests) == requests
+        # Not prefetched: resolved one by one, against the same server.
+        assert "J. Verne" in nes.ensure_variants("ark:/12148/cb2")
+        assert len(_StubSRU.requests) == requests + 1
+    finally:
+        nes.close()
@@ -0,0 +1,35 @@
+# scripts/utils/compressed_io.py
+from __future__ import annotations
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO, Any, Callable, Dict
+
+# Chosen by file extension; everything else is opened as a plain file.
+_OPENERS: Dict[str, Callable[..., Any]] = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def open_text(
+    path: str | Path,
+    mode: str = "r",
+    encoding: str = "utf-8",
+    newline: str | None = None,
+) -> IO[str]:
+    """Open a text stream, (de)compressing `.gz`/`.bz2`/`.xz` on the fly."""
+    opener = _OPENERS.get(Path(path).suffix.lower())
+    if opener is None:
+        return open(path, mode, encoding=encoding, newline=newline)
+    return opener(path, mode + "t", encoding=encoding, newline=newline)
+
+
+def open_binary(path: str | Path, mode: str = "rb") -> IO[bytes]:
+    """Binary counterpart of `open_text`."""
+    opener = _OPENERS.get(Path(path).suffix.lower())
+    if opener is None:
+        return open(path, mode)
+    return opener(path, mode)
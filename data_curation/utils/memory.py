@@ -0,0 +1,153 @@
+# scripts/utils/memory.py
+from __future__ import annotations
+import json
+import sys
+import sysconfig
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+# Snapshots are taken when one of these closes; per-title stages (spaCy,
+# NES, matching) run thousands of times and would make snapshots dominate.
+MEMORY_STAGES = frozenset({
+    "csv_load",
+    "db_load",
+    "intermarc_parse",
+    "clustering",
+    "expression_propagation",
+    "csv_write",
+})
+DEFAULT_TOP = 15
+DEFAULT_FRAMES = 1
+
+_PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+_STDLIB = Path(sysconfig.get_paths()["stdlib"]).resolve()
+_MB = 1024 * 1024
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / _MB if sys.platform == "darwin" else peak / 1024
+
+
+def module_of(filename: str) -> str:
+    """
+    Attribute a source file to a readable owner: a path inside the package
+    (`models.py`, `utils/title_cleaner.py`), an installed distribution
+    (`spacy`, `thinc`), a standard library path (`json/decoder.py`), or the
+    bare file name.
+    """
+    path = Path(filename)
+    parts = path.parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            idx = parts.index(marker)
+            if idx + 1 < len(parts):
+                return parts[idx + 1].removesuffix(".py")
+    for root in (_PACKAGE_ROOT, _STDLIB):
+        try:
+            return path.resolve().relative_to(root).as_posix()
+        except (OSError, ValueError):
+            continue
+    return path.name
+
+
+@dataclass
+class StageMemory:
+    stage: str
+    traced_current_mb: float
+    traced_peak_mb: float
+    rss_peak_mb: float | None
+    top_modules: List[Dict[str, Any]] = field(default_factory=list)
+    top_lines: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class MemoryTracker:
+    """
+    Snapshot tracemalloc and peak RSS whenever a coarse stage closes.
+
+    `traced_peak_mb` is the peak since the previous boundary, so each entry
+    shows what that stage itself pushed the heap to; `top_modules` groups the
+    live allocations at the boundary by owning module.
+    """
+
+    def __init__(self, top: int = DEFAULT_TOP, frames: int = DEFAULT_FRAMES):
+        self.top = top
+        self.frames = frames
+        self.boundaries: List[StageMemory] = []
+        self._started_here = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+        tracemalloc.reset_peak()
+
+    def stop(self) -> None:
+        if self._started_here:
+            tracemalloc.stop()
+            self._started_here = False
+
+    def on_stage_end(self, name: str) -> None:
+        if name in MEMORY_STAGES and tracemalloc.is_tracing():
+            self.boundaries.append(self.capture(name))
+
+    def capture(self, name: str) -> StageMemory:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        tracemalloc.reset_peak()
+
+        by_module: Dict[str, List[int]] = {}
+        for stat in snapshot.statistics("filename"):
+            totals = by_module.setdefault(module_of(stat.traceback[0].filename), [0, 0])
+            totals[0] += stat.size
+            totals[1] += stat.count
+        top_modules = [
+            {"module": module, "size_mb": round(size / _MB, 3), "count": count}
+            for module, (size, count) in sorted(by_module.items(), key=lambda kv: kv[1][0], reverse=True)[: self.top]
+        ]
+        top_lines = [
+            {
+                "location": f"{module_of(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_mb": round(stat.size / _MB, 3),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[: self.top]
+        ]
+        rss = peak_rss_mb()
+        return StageMemory(
+            stage=name,
+            traced_current_mb=round(current / _MB, 3),
+            traced_peak_mb=round(peak / _MB, 3),
+            rss_peak_mb=round(rss, 3) if rss is not None else None,
+            top_modules=top_modules,
+            top_lines=top_lines,
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        rss = peak_rss_mb()
+        return {
+            "rss_peak_mb": round(rss, 3) if rss is not None else None,
+            "traced_peak_mb": max((b.traced_peak_mb for b in self.boundaries), default=0.0),
+            "stages": [asdict(b) for b in self.boundaries],
+        }
+
+    def write_report(self, path: str | Path) -> Dict[str, Any]:
+        summary = self.summary()
+        with Path(path).open("w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
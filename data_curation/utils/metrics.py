@@ -0,0 +1,83 @@
+# scripts/utils/metrics.py
+from __future__ import annotations
+import json
+import os
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+PROMETHEUS_PREFIX = "vendange_"
+
+# Every counter the pipeline increments, with the HELP line exported to Prometheus.
+COUNTERS: Dict[str, str] = {
+    "spacy_calls": "Titles parsed by spaCy",
+    "spacy_tokens": "Tokens produced by spaCy",
+    "nes_cache_hits": "NES variant lookups served by the in-process LRU",
+    "nes_resolved_local": "NES resolutions from local 100/400 records",
+    "nes_resolved_sqlite": "NES resolutions from the SQLite cache",
+    "nes_resolved_sru": "NES resolutions fetched one by one from SRU",
+    "nes_prefetched_sru": "ARKs resolved by the batched SRU prefetch",
+    "variant_match_calls": "Calls to match_variants_in_title",
+    "variant_matches": "Title spans matched by a person variant",
+    "zones_90f_emitted": "90F zones added to anchors (works and expressions)",
+    "rows_rewritten": "CSV rows whose intermarc was re-serialized",
+    "manifest_titles_reused": "Normalized titles reused from the run manifest",
+    "manifest_titles_recomputed": "Normalized titles the run manifest could not vouch for",
+    "manifest_groups_touched": "Work groups with at least one recomputed title",
+    "records_left_raw": "Records a load plan kept as raw text (no operation reads them)",
+}
+
+_counts: Counter[str] = Counter()
+
+
+def incr(name: str, value: int = 1) -> None:
+    _counts[name] += value
+
+
+def snapshot() -> Dict[str, int]:
+    """Every known counter (zero when untouched), plus any ad-hoc ones."""
+    values = {name: 0 for name in COUNTERS}
+    values.update(_counts)
+    return values
+
+
+def reset() -> None:
+    _counts.clear()
+
+
+def to_prometheus(values: Dict[str, int] | None = None) -> str:
+    values = snapshot() if values is None else values
+    lines = []
+    for name, value in values.items():
+        metric = f"{PROMETHEUS_PREFIX}{name}_total"
+        if name in COUNTERS:
+            lines.append(f"# HELP {metric} {COUNTERS[name]}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str | Path, fmt: str | None = None) -> None:
+    """
+    Write counters as JSON, or as a Prometheus textfile when `fmt` is "prometheus"
+    or the path ends in `.prom`. The file is replaced atomically so a collector
+    never scrapes a half-written export.
+    """
+    path = Path(path)
+    fmt = fmt or ("prometheus" if path.suffix == ".prom" else "json")
+    if fmt == "prometheus":
+        payload = to_prometheus()
+    elif fmt == "json":
+        payload = json.dumps(snapshot(), indent=2) + "\n"
+    else:
+        raise ValueError(f"Unknown metrics format: {fmt}")
+
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent or Path("."), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,156 @@
+# scripts/utils/profiling.py
+from __future__ import annotations
+import cProfile
+import io
+import json
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, TypeVar
+
+# Stage names recorded by the pipeline. Timings are inclusive: "clustering"
+# also contains the NES, matching and spaCy time spent inside it.
+STAGES = (
+    "csv_load",
+    "db_load",
+    "intermarc_parse",
+    "nes_resolution",
+    "variant_matching",
+    "spacy_parsing",
+    "clustering",
+    "expression_propagation",
+    "csv_write",
+)
+TOP_FUNCTIONS = 40
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class StageTiming:
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+
+
+class StageProfiler:
+    """
+    Accumulates wall and CPU time per stage, and optionally runs cProfile
+    while `cprofile_stage` is active. Re-entering a stage that is already
+    open (recursion, nested helpers) is counted once. Callbacks in
+    `on_stage_end` run with the stage name each time a stage closes.
+    """
+
+    def __init__(self, cprofile_stage: str | None = None):
+        self.timings: Dict[str, StageTiming] = {}
+        self.cprofile_stage = cprofile_stage
+        self._cprofile = cProfile.Profile() if cprofile_stage else None
+        self._open: Dict[str, int] = {}
+        self.on_stage_end: List[Callable[[str], None]] = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        depth = self._open.get(name, 0)
+        self._open[name] = depth + 1
+        if depth:
+            try:
+                yield
+            finally:
+                self._open[name] -= 1
+            return
+
+        profile = self._cprofile if name == self.cprofile_stage else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            timing = self.timings.setdefault(name, StageTiming())
+            timing.calls += 1
+            timing.wall_seconds += time.perf_counter() - wall
+            timing.cpu_seconds += time.process_time() - cpu
+            self._open[name] -= 1
+            for callback in self.on_stage_end:
+                callback(name)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "total_wall_seconds": round(time.perf_counter() - self._started, 6),
+            "stages": {
+                name: {k: round(v, 6) if isinstance(v, float) else v for k, v in asdict(timing).items()}
+                for name, timing in self.timings.items()
+            },
+        }
+
+    def write_report(self, path: str | Path) -> Dict[str, Any]:
+        """Write the JSON report; the cProfile dump goes next to it as `<report>.<stage>.prof`."""
+        path = Path(path)
+        report = self.report()
+        if self._cprofile is not None and self.cprofile_stage:
+            stats_path = path.with_name(f"{path.stem}.{self.cprofile_stage}.prof")
+            self._cprofile.dump_stats(str(stats_path))
+            buffer = io.StringIO()
+            try:
+                pstats.Stats(self._cprofile, stream=buffer).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            except TypeError:
+                # The stage never ran, so there is nothing to sort.
+                buffer.write("(no samples)")
+            report["cprofile"] = {
+                "stage": self.cprofile_stage,
+                "stats_file": str(stats_path),
+                "top_cumulative": buffer.getvalue(),
+            }
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+
+_ACTIVE: StageProfiler | None = None
+_DISABLED: ContextManager[None] = nullcontext()
+
+
+def enable_profiling(cprofile_stage: str | None = None) -> StageProfiler:
+    global _ACTIVE
+    _ACTIVE = StageProfiler(cprofile_stage)
+    return _ACTIVE
+
+
+def disable_profiling() -> StageProfiler | None:
+    global _ACTIVE
+    profiler, _ACTIVE = _ACTIVE, None
+    return profiler
+
+
+def active_profiler() -> StageProfiler | None:
+    return _ACTIVE
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Time a block under `name`; a shared no-op context when profiling is off."""
+    if _ACTIVE is None:
+        return _DISABLED
+    return _ACTIVE.stage(name)
+
+
+def profiled(name: str) -> Callable[[F], F]:
+    """Decorator form of `stage`; costs one global lookup per call when profiling is off."""
+
+    def decorate(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            profiler = _ACTIVE
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
@@ -25,6 +25,8 @@ from rich.syntax import Syntax
 from rich.table import Table
 
 from scripts.matching.triggers import RESP_TERMS_ILL
+from scripts.utils import metrics
+from scripts.utils.profiling import profiled, stage
 from scripts.utils.text_norm import build_folded_with_map, normalize_for_match
 
 if TYPE_CHECKING:  # pragma: no cover - import only for static type checking
@@ -56,6 +58,7 @@ RIGHT_STRIPPABLE_LOWER = {"et", "ou", "avec"}
 BOUNDARY_PUNCT = {",", ";", ":", "-", "–", "—", "|"}
 
 DEBUGGER_ENV = "TITLE_MATCH_DEBUGGER"
+RESPONSIBILITY_ZONES = ("700", "701", "702", "710", "711", "712")
 
 
 @lru_cache(maxsize=1)
@@ -271,8 +274,11 @@ def clean_title_text(
     if not should_process:
         return title
 
-    model = get_nlp()
-    doc = model(title)
+    with stage("spacy_parsing"):
+        model = get_nlp()
+        doc = model(title)
+    metrics.incr("spacy_calls")
+    metrics.incr("spacy_tokens", len(doc))
     graph_path = _render_dependency_graph(doc, f"Title: {title}")
 
     ranges: List[Tuple[int, int]] = []
@@ -481,9 +487,11 @@ def _render_cleaning_summary(
     return _export_rich(composite)
 
 
+@profiled("variant_matching")
 def match_variants_in_title(title: str, variants: Sequence[str]) -> List[Tuple[int, int]]:
     """Return spans in the original title that match any of the provided variants."""
 
+    metrics.incr("variant_match_calls")
     if not title or not variants:
         return []
 
@@ -512,6 +520,7 @@ def match_variants_in_title(title: str, variants: Sequence[str]) -> List[Tuple[i
             start = idx + len(normalized_variant)
 
     spans.sort()
+    metrics.incr("variant_matches", len(spans))
     return spans
 
 
@@ -546,7 +555,7 @@ def extract_responsible_person_arks(ent: "Entity") -> List[str]:
     """Return unique responsibility ARKs referenced by the entity."""
 
     arks: List[str] = []
-    for zone_code in ("700", "701", "702", "710", "711", "712"):
+    for zone_code in RESPONSIBILITY_ZONES:
         for zone in ent.intermarc.get_zone(zone_code):
             for subfield in zone.sousZones:
                 value = (subfield.valeur or "").strip()